@@ -0,0 +1,99 @@
+"""
+Import-time profile of the app's cold start.
+
+Runs each target module in a fresh interpreter with `python -X importtime`,
+then prints the slowest imports, a per-package rollup and which heavy
+libraries were pulled in. Imports that `import streamlit` makes by itself
+are profiled once as a baseline and reported apart from the app's own, and
+the in-app warm-up (H2C2_BACKGROUND) is switched off, so the numbers are the
+cold-start path. Use it to check that a change keeps Plotly and friends off
+the home-page path:
+
+    python profile_startup.py                       # home page (main.py)
+    python profile_startup.py analytics_page --top 30
+    python profile_startup.py main forecast_page    # compare entry points
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# Libraries the home page should not need; reported as loaded / deferred
+HEAVY_LIBS = ['plotly', 'requests', 'xgboost', 'prophet', 'sklearn', 'pyarrow', 'pyspark']
+
+# Importing main.py outside `streamlit run` logs bare-mode warnings on stderr;
+# the bootstrap silences Streamlit's logger so only importtime lines remain.
+_BOOTSTRAP = (
+    "import logging, sys; sys.path.insert(0, {src!r}); "
+    "logging.getLogger('streamlit').setLevel(logging.CRITICAL); "
+    "import {module}"
+)
+
+
+def profile_module(module):
+    """Return [(depth, self_us, cumulative_us, name)] for one cold import."""
+    code = _BOOTSTRAP.format(src=SRC_DIR, module=module)
+    env = {k: v for k, v in os.environ.items() if k != 'H2C2_BACKGROUND'}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=SRC_DIR, env=env,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line.split(':', 1)[1].split('|', 2)
+        # importtime indents nested imports by two spaces per level after one pad
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((depth, int(self_us), int(cum_us), name.strip()))
+    if proc.returncode != 0 and not rows:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return rows
+
+
+def print_report(module, rows, top, baseline=frozenset()):
+    total_us = sum(r[1] for r in rows)
+    names = {r[3] for r in rows}
+    own = [r for r in rows if r[3] not in baseline]
+
+    print(f"\n== import {module} — {total_us / 1e3:,.0f} ms across {len(rows)} modules; "
+          f"{sum(r[1] for r in own) / 1e3:,.0f} ms in {len(own)} modules beyond `import streamlit`")
+
+    print(f"\n  Top {top} by cumulative time")
+    for depth, _, cum_us, name in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"  {cum_us / 1e3:9.1f} ms  {'  ' * min(depth, 6)}{name}")
+
+    by_pkg = defaultdict(int)
+    for _, self_us, _, name in rows:
+        by_pkg[name.split('.')[0]] += self_us
+    print(f"\n  Top {top} packages by self time")
+    for pkg, self_us in sorted(by_pkg.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {pkg}  ({self_us / max(total_us, 1):.0%})")
+
+    by_streamlit = [lib for lib in HEAVY_LIBS if lib in baseline]
+    loaded       = [lib for lib in HEAVY_LIBS if lib in names and lib not in baseline]
+    deferred     = [lib for lib in HEAVY_LIBS if lib not in names]
+    print(f"\n  Heavy libraries loaded:   {', '.join(loaded) or '—'}")
+    print(f"  Heavy libraries deferred: {', '.join(deferred) or '—'}")
+    if by_streamlit:
+        print(f"  Loaded by streamlit itself: {', '.join(by_streamlit)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=['main'],
+                        help='modules under src/ to profile (default: main)')
+    parser.add_argument('--top', type=int, default=15, help='rows per section')
+    args = parser.parse_args()
+
+    baseline = frozenset(r[3] for r in profile_module('streamlit'))
+    for module in args.modules:
+        print_report(module, profile_module(module), args.top, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Production launcher: `streamlit run src/main.py` plus cache warm-up at boot.
+
+The warm-up thread starts as soon as the Streamlit runtime exists — before
+any browser connects — and an optional readiness endpoint returns 503 until
+it finishes, so the load balancer only routes traffic to warmed replicas.
+
+    python serve.py --ready-port 8502 -- --server.port 8501 --server.headless true
+
+GET http://<host>:8502/ready  → 200 {"state": "ready", ...} once warm, 503 before.
+Alternatively set H2C2_READY_FILE=/tmp/h2c2-ready and probe for the file.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+sys.path.insert(0, SRC_DIR)
+
+
+class _ReadinessHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        import warmup
+
+        status = warmup.warmup_status()
+        body = json.dumps(status).encode('utf-8')
+        self.send_response(200 if warmup.is_ready() else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _warm_when_runtime_exists():
+    # st.cache_data only shares entries with sessions once the server Runtime
+    # owns the cache storage, so wait for it before populating anything.
+    from streamlit.runtime import Runtime
+    import data_watch
+    import warmup
+
+    while not Runtime.exists():
+        time.sleep(0.05)
+    warmup.start_warmup()
+    data_watch.start_watcher()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the app with cache warm-up at boot.')
+    parser.add_argument('--ready-port', type=int, default=int(os.environ.get('H2C2_READY_PORT', 0)),
+                        help='serve GET /ready on this port (0 = disabled)')
+    parser.add_argument('streamlit_args', nargs='*', help='extra `streamlit run` arguments (after --)')
+    args = parser.parse_args()
+
+    if args.ready_port:
+        server = ThreadingHTTPServer(('0.0.0.0', args.ready_port), _ReadinessHandler)
+        threading.Thread(target=server.serve_forever, name='h2c2-ready', daemon=True).start()
+    threading.Thread(target=_warm_when_runtime_exists, name='h2c2-warmup-boot', daemon=True).start()
+
+    from streamlit.web import cli as stcli
+
+    sys.argv = ['streamlit', 'run', os.path.join(SRC_DIR, 'main.py'), *args.streamlit_args]
+    sys.exit(stcli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import streamlit.components.v1 as components
 
 from styles import get_about_css
+from utils import load_high_risk_data
 
 
 def render_about_page(theme_colors):
@@ -30,7 +31,7 @@ def render_about_page(theme_colors):
       </p>
       <div class="stat-row">
         <div class="stat">
-          <div class="stat-value">706</div>
+          <div class="stat-value">{len(load_high_risk_data())}</div>
           <div class="stat-label">High-neglect country-year instances identified</div>
         </div>
         <div class="stat">
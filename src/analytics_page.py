@@ -1,12 +1,25 @@
 import streamlit as st
+import numpy as np
 import plotly.graph_objects as go
 
+from data_versions import KEEP_VERSIONS, versioned
+from filter_index import BitmapIndex
 from utils import (
-    SEVERITY_ORDER, SEVERITY_COLORS,
+    ISO3_TO_REGION, SEVERITY_ORDER, SEVERITY_COLORS,
     _AXIS_BASE, _chart_layout,
-    chart_caption, section_header,
-    load_country_metrics, load_sector_benchmarking,
+    chart_caption, filter_panel, section_header,
+    load_country_metrics, load_high_risk_data, load_sector_benchmarking, load_sector_matrix,
+    load_flagged_regions, load_year_cubes, year_metrics,
 )
+from outliers import Z_THRESHOLD
+from scenarios import OTHER_REGION
+from sector_matrix import UNDERPERFORMING_RATIO
+from year_cubes import default_year
+
+HEATMAP_COUNTRIES = 20
+COUNTRY_FACETS = ['Severity Quartile', 'Region', 'Neglect Risk', 'Plan Years', 'Sector']
+
+_fragment = getattr(st, 'fragment', lambda func: func)
 
 
 # ── Chart builders ─────────────────────────────────────────────────────────────
@@ -183,11 +196,300 @@ def _build_chart_c(sector_df):
     return fig
 
 
+def _build_chart_d(matrix_df):
+    """Coverage heatmap: countries with the most people in need × sectors by global need."""
+    countries = (matrix_df.groupby('Country Name')['In Need'].sum()
+                 .nlargest(HEATMAP_COUNTRIES).index[::-1])
+    sectors = matrix_df.groupby('Sector Name')['In Need'].sum().sort_values(ascending=False).index
+    cells = matrix_df[matrix_df['Country Name'].isin(countries)]
+    coverage = cells.pivot(index='Country Name', columns='Sector Name', values='Coverage').reindex(
+        index=countries, columns=sectors)
+    ratio = cells.pivot(index='Country Name', columns='Sector Name', values='Benchmark Ratio').reindex(
+        index=countries, columns=sectors)
+    need = cells.pivot(index='Country Name', columns='Sector Name', values='In Need').reindex(
+        index=countries, columns=sectors)
+
+    hover = [
+        [
+            f"<b>{c} — {k}</b><br>People in Need: {int(n):,}<br>Coverage: {cv:.0%}<br>"
+            f"Benchmark Ratio: {r:.2f}" if n == n else f"<b>{c} — {k}</b><br>No sector figures"
+            for k, n, cv, r in zip(sectors, need.loc[c], coverage.loc[c], ratio.loc[c])
+        ]
+        for c in countries
+    ]
+
+    fig = go.Figure(go.Heatmap(
+        z=coverage.to_numpy(),
+        x=list(sectors),
+        y=list(countries),
+        zmin=0, zmax=1,
+        colorscale=[[0, '#ef4444'], [0.5, '#f59e0b'], [1, '#4ade80']],
+        colorbar=dict(title='Coverage', tickformat='.0%', outlinewidth=0,
+                      tickfont=dict(family='Space Mono, monospace', color='#64748b', size=10)),
+        hovertemplate='%{customdata}<extra></extra>',
+        customdata=hover,
+        xgap=2, ygap=2,
+    ))
+    layout = _chart_layout(
+        title='Sector Coverage by Country — Share of People in Need Targeted',
+        height=620,
+        xaxis=dict(**_AXIS_BASE, title='', tickangle=-35),
+        yaxis=dict(**{**_AXIS_BASE, 'tickfont': dict(family='Space Mono, monospace', color='#e2e8f0', size=11)},
+                   title=''),
+        margin=dict(l=12, r=12, t=52, b=120),
+    )
+    fig.update_layout(**layout)
+    return fig
+
+
+def _build_sector_drilldown(cells, country):
+    """One country's sectors by Benchmark Ratio, underperformers in red."""
+    cells = cells.sort_values('Benchmark Ratio', ascending=True)
+    colors = ['rgba(239,68,68,0.85)' if r < UNDERPERFORMING_RATIO else 'rgba(74,222,128,0.75)'
+              for r in cells['Benchmark Ratio']]
+    hover = [
+        f"<b>{name}</b><br>Benchmark Ratio: {r:.2f}<br>Coverage: {cv:.0%} (sector mean {m:.0%})<br>"
+        f"People in Need: {int(n):,}<br>People Targeted: {int(t):,}"
+        for name, r, cv, m, n, t in zip(cells['Sector Name'], cells['Benchmark Ratio'], cells['Coverage'],
+                                        cells['Cluster Mean Coverage'], cells['In Need'], cells['Targeted'])
+    ]
+    fig = go.Figure(go.Bar(
+        x=cells['Benchmark Ratio'],
+        y=cells['Sector Name'],
+        orientation='h',
+        marker=dict(color=colors, line=dict(width=0)),
+        hovertemplate='%{customdata}<extra></extra>',
+        customdata=hover,
+    ))
+    fig.add_vline(x=1.0, line=dict(color='rgba(148,163,184,0.45)', dash='dot', width=1))
+    fig.add_vline(x=UNDERPERFORMING_RATIO, line=dict(color='rgba(239,68,68,0.5)', dash='dot', width=1))
+    layout = _chart_layout(
+        title=f'{country} — Coverage Relative to the Global Sector Mean',
+        height=max(260, 34 * len(cells) + 90),
+        xaxis=dict(**_AXIS_BASE, title='Benchmark Ratio (1.0 = global sector mean)'),
+        yaxis=dict(**{**_AXIS_BASE, 'tickfont': dict(family='Space Mono, monospace', color='#e2e8f0', size=12)},
+                   title=''),
+    )
+    fig.update_layout(**layout)
+    return fig
+
+
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS, show_spinner=False)
+def get_analytics_figures(data_version=None):
+    """Charts A–D, built once from the cached loaders and shared across sessions."""
+    df = load_country_metrics()
+    sector_df = load_sector_benchmarking()
+    matrix_df = load_sector_matrix()
+    return {
+        'a': _build_chart_a(df), 'b': _build_chart_b(df), 'c': _build_chart_c(sector_df),
+        'd': _build_chart_d(matrix_df) if not matrix_df.empty else None,
+    }
+
+
+@versioned
+@st.cache_data(show_spinner=False)
+def get_sector_drilldown(iso3, data_version=None):
+    """Drill-down chart for one country, cached per country."""
+    matrix_df = load_sector_matrix()
+    cells = matrix_df[matrix_df['Country ISO3'] == iso3]
+    return _build_sector_drilldown(cells, cells['Country Name'].iloc[0]) if not cells.empty else None
+
+
+@versioned
+@st.cache_resource(max_entries=KEEP_VERSIONS, show_spinner=False)
+def get_country_index(data_version=None):
+    """
+    Country metrics with their filter facets, and a BitmapIndex over them
+    (Mismatch Score presorted). Shared read-only across sessions.
+    """
+    df = load_country_metrics().reset_index(drop=True)
+    df['Region'] = df['Country ISO3'].map(ISO3_TO_REGION).fillna(OTHER_REGION)
+    at_risk = set(load_high_risk_data()['iso3'])
+    df['Neglect Risk'] = df['Country ISO3'].isin(at_risk).map({True: 'At risk 2026–2030', False: 'Not flagged'})
+
+    iso3 = df['Country ISO3'].to_numpy()
+    cubes = load_year_cubes()
+    column = {code: i for i, code in enumerate(cubes['iso3'])}
+    cols = np.array([column.get(code, -1) for code in iso3], dtype=int)
+    # Countries outside the cubes had no plan in any year
+    planned = (cubes['severity'][:, cols] >= 0) & (cols >= 0)
+    matrix_df = load_sector_matrix()
+    multi = {
+        'Plan Years': {int(year): planned[i] for i, year in enumerate(cubes['years'])},
+        'Sector': {sector: df['Country ISO3'].isin(group['Country ISO3']).to_numpy()
+                   for sector, group in matrix_df.groupby('Sector Name')},
+    }
+    index = BitmapIndex(df, facets=['Severity Quartile', 'Region', 'Neglect Risk'], multi=multi,
+                        order_by=['Mismatch Score'])
+    return df, index
+
+
+@versioned
+@st.cache_data(show_spinner=False)
+def get_year_figures(year, data_version=None):
+    """Charts A and B for one plan year, cached per year so scrubbing back is free."""
+    df = year_metrics(year)
+    return {'a': _build_chart_a(df), 'b': _build_chart_b(df)} if len(df) > 1 else None
+
+
 # ── Page renderer ──────────────────────────────────────────────────────────────
 
+def _render_flagged_regions(flagged):
+    section_header(
+        'OUTLIER SCREEN — FLAGGED REGIONS',
+        'Which Figures Stand Out From Their Peers?',
+        'Cost per beneficiary, budget per person in need and targeting efficiency are compared with peer '
+        'regions: admin 1 areas with the rest of their country, countries with each other, and country '
+        'sectors with the same sector elsewhere. A figure is flagged when its robust z-score (median and '
+        'MAD) or the interquartile-range fences mark it as unusual.',
+    )
+    levels = list(dict.fromkeys(flagged['Level']))
+    counts = flagged['Level'].value_counts()
+    level = st.radio('Level', levels, horizontal=True, key='flagged_level',
+                     format_func=lambda name: f'{name} ({counts[name]})')
+    rows = flagged[flagged['Level'] == level]
+    st.dataframe(
+        rows[['Country Name', 'Region Name', 'Metric', 'Value', 'Group Median', 'Robust Z',
+              'IQR Low', 'IQR High', 'Rule', 'Source Flag']],
+        use_container_width=True, hide_index=True, height=min(420, 36 * len(rows) + 40),
+        column_config={
+            'Country Name': st.column_config.TextColumn('Country'),
+            'Region Name': st.column_config.TextColumn('Region'),
+            'Value': st.column_config.NumberColumn(format='%.3f'),
+            'Group Median': st.column_config.NumberColumn(format='%.3f'),
+            'Robust Z': st.column_config.NumberColumn(format='%.1f'),
+            'IQR Low': st.column_config.NumberColumn(format='%.3f'),
+            'IQR High': st.column_config.NumberColumn(format='%.3f'),
+            'Source Flag': st.column_config.NumberColumn('Published Flag', format='%d'),
+        },
+    )
+    chart_caption(
+        f'Robust z = 0.6745 × (value − group median) ÷ MAD, flagged beyond ±{Z_THRESHOLD}; IQR fences at '
+        '1.5 × IQR beyond the quartiles. Groups with fewer than five regions are not scored. '
+        'Published Flag is the precomputed Outlier_Flag of the source file, for comparison.'
+    )
+
+
+@_fragment
+def _render_country_analysis(figures):
+    df, index = get_country_index()
+    with st.expander('▸  FILTER COUNTRIES', expanded=False):
+        filters = filter_panel(index, 'country_filter', COUNTRY_FACETS, ranges=('Plan Years',))
+    if any(filters.values()):
+        words = index.select(filters)
+        selected = df.iloc[index.rows(words)]
+        if selected.empty:
+            chart_caption('No country matches these filters.')
+            return
+        fig_a = _build_chart_a(df.iloc[index.top(words, 'Mismatch Score', 10)])
+        fig_b = _build_chart_b(selected)
+        shown = f'{index.count(words)} of {len(df)} countries match the filters. '
+    else:
+        fig_a, fig_b, shown = figures['a'], figures['b'], ''
+
+    col_a, col_b = st.columns(2, gap='medium')
+    with col_a:
+        st.plotly_chart(fig_a, use_container_width=True, config={'displayModeBar': False})
+        chart_caption(
+            f'{shown}Bars represent Mismatch Score (0–1 scale). '
+            'Color indicates Severity Quartile. Hover over a bar for full details.'
+        )
+    with col_b:
+        st.plotly_chart(fig_b, use_container_width=True, config={'displayModeBar': False})
+        chart_caption(
+            'Each dot is a country. Dotted lines divide the space into four quadrants. '
+            'Top-5 most overlooked countries are labeled. Hover for country name and scores.'
+        )
+
+
+@_fragment
+def _render_time_machine():
+    section_header(
+        'TIME MACHINE — 2000 TO TODAY',
+        'Who Was Overlooked in Past Years?',
+        'The same Mismatch Score, year by year: each plan year\'s requirements against the people in need of '
+        'the countries that had a plan that year. Severity quartiles and the 0–1 scaling are recomputed among '
+        'those countries only.',
+    )
+    cubes = load_year_cubes()
+    years = [int(y) for y in cubes['years']]
+    year = st.select_slider('Plan year', options=years, value=default_year(cubes), key='analytics_year')
+    df = year_metrics(year)
+    figures = get_year_figures(year)
+
+    s1, s2, s3, s4 = st.columns(4)
+    worst = df.loc[df['Mismatch Score'].idxmax(), 'Country Name'] if df['Mismatch Score'].notna().any() else '—'
+    for col, label, value, sub in [
+        (s1, 'COUNTRIES WITH A PLAN', str(len(df)), f'in {year}'),
+        (s2, 'REQUIREMENTS', f"${df['revisedRequirements'].sum() / 1e9:.1f}B", 'allocated to these countries'),
+        (s3, 'CRITICAL SEVERITY', str((df['Severity Quartile'] == 'Critical').sum()), 'top need-prevalence quartile'),
+        (s4, 'MOST OVERLOOKED', worst, 'highest mismatch that year'),
+    ]:
+        col.markdown(f"""
+        <div style="background:rgba(15,23,42,0.7); border:1px solid rgba(148,163,184,0.1);
+                    border-radius:6px; padding:1.1rem 1.3rem; border-left:2px solid rgba(74,222,128,0.5);">
+            <p style="color:#4ade80; font-family:'Space Mono', monospace; font-size:0.67rem;
+                      letter-spacing:0.15em; text-transform:uppercase; margin:0 0 0.35rem 0;">{label}</p>
+            <p style="color:#ffffff; font-size:1.8rem; font-weight:300; margin:0 0 0.2rem 0; line-height:1.1;">{value}</p>
+            <p style="color:#475569; font-size:0.76rem; margin:0; font-family:'Space Mono', monospace;">{sub}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    if figures is None:
+        chart_caption(f'Fewer than two countries had a plan in {year}; there is nothing to compare.')
+        return
+    col_a, col_b = st.columns(2, gap='medium')
+    with col_a:
+        st.plotly_chart(figures['a'], use_container_width=True, config={'displayModeBar': False})
+    with col_b:
+        st.plotly_chart(figures['b'], use_container_width=True, config={'displayModeBar': False})
+    chart_caption(
+        'Requirements are the plan year\'s amounts, with regional plans shared among their countries. '
+        'People in need and population have no history in the data, so the latest figures are used for every year.'
+    )
+
+
+def _render_sector_matrix(heatmap):
+    section_header(
+        'CHART D — COUNTRY × SECTOR',
+        'Which Country Sectors Fall Furthest Behind?',
+        'Sector totals hide large differences between countries. Each cell shows the share of people in need '
+        'that a country\'s sector response targets. The drill-down compares every sector of one country with '
+        'the average coverage of that sector worldwide — the <em>Benchmark Ratio</em>.',
+    )
+    if heatmap is None:
+        chart_caption(
+            'No sector matrix yet: data/humanitarian_analysis_sector_matrix.csv is built from the HNO cluster '
+            'file data/hpc_hno_2025.csv, which is not in this deployment. Run '
+            '<code>python src/validation.py --fetch-hno</code> to download it and build the matrix; the chart, '
+            'the drill-down and the Sector filters appear once it exists.'
+        )
+        return
+    st.plotly_chart(heatmap, use_container_width=True, config={'displayModeBar': False})
+    chart_caption(
+        f'Top {HEATMAP_COUNTRIES} countries by people in need; sectors ordered by global need. '
+        'Red = little of the need is targeted, green = most of it is. Blank cells: no sector figures.'
+    )
+
+    matrix_df = load_sector_matrix()
+    options = (matrix_df.groupby(['Country ISO3', 'Country Name'])['In Need'].sum()
+               .sort_values(ascending=False).reset_index())
+    labels = dict(zip(options['Country ISO3'], options['Country Name']))
+    iso3 = st.selectbox('Drill down into a country', options['Country ISO3'].tolist(),
+                        format_func=labels.get, key='sector_drilldown')
+    drilldown = get_sector_drilldown(iso3)
+    if drilldown is not None:
+        st.plotly_chart(drilldown, use_container_width=True, config={'displayModeBar': False})
+        chart_caption(
+            f'Benchmark Ratio = country coverage ÷ global mean coverage of the sector. Red bars are below '
+            f'{UNDERPERFORMING_RATIO} — less than half the typical coverage for that sector.'
+        )
+
+
 def render_analytics_page():
     df = load_country_metrics()
-    sector_df = load_sector_benchmarking()
+    figures = get_analytics_figures()
 
     st.markdown("""
     <div style="padding: 1.2rem 0 0.75rem 0;">
@@ -300,19 +602,9 @@ def render_analytics_page():
         'quadrants: countries in the <strong style="color:#ef4444;">top-left</strong> have critical needs '
         'but very little funding and deserve the most advocacy attention.',
     )
-    col_a, col_b = st.columns(2, gap='medium')
-    with col_a:
-        st.plotly_chart(_build_chart_a(df), use_container_width=True, config={'displayModeBar': False})
-        chart_caption(
-            'Bars represent Mismatch Score (0–1 scale). '
-            'Color indicates Severity Quartile. Hover over a bar for full details.'
-        )
-    with col_b:
-        st.plotly_chart(_build_chart_b(df), use_container_width=True, config={'displayModeBar': False})
-        chart_caption(
-            'Each dot is a country. Dotted lines divide the space into four quadrants. '
-            'Top-5 most overlooked countries are labeled. Hover for country name and scores.'
-        )
+    _render_country_analysis(figures)
+
+    _render_time_machine()
 
     section_header(
         'CHART C — SECTOR ANALYSIS',
@@ -322,13 +614,19 @@ def render_analytics_page():
         'are actually <em>targeted</em> for aid. A large red bar with a small green bar signals a critical '
         'gap — the sector is overwhelmed and under-resourced.',
     )
-    st.plotly_chart(_build_chart_c(sector_df), use_container_width=True, config={'displayModeBar': False})
+    st.plotly_chart(figures['c'], use_container_width=True, config={'displayModeBar': False})
     chart_caption(
         'Top 10 sectors by total people in need, sorted largest to smallest. '
         'Red = total people requiring assistance. Green = people actually targeted by response plans. '
         'Hover for exact numbers and coverage percentage.'
     )
 
+    _render_sector_matrix(figures['d'])
+
+    flagged = load_flagged_regions()
+    if not flagged.empty:
+        _render_flagged_regions(flagged)
+
     st.markdown("""
     <div style="border-top:1px solid rgba(148,163,184,0.1); margin-top:1.5rem; padding:1.5rem 0 0.5rem 0;">
         <p style="color:#4ade80; font-family:'Space Mono', monospace; font-size:0.67rem;
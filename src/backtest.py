@@ -0,0 +1,334 @@
+"""
+Rolling-origin (walk-forward) backtests for both forecasting stages.
+
+For every cutoff year, each engine is fitted only on data up to the cutoff
+and scored on the following `horizon` years that have actuals:
+
+    linear / damped   funding trends (trend_engine), all countries per task
+    prophet           the notebook's Prophet, one task per (cutoff, country chunk)
+    xgboost           needs/requirements models (forecast_model) on the feature
+                      store's snapshot as of the cutoff, so nothing leaks backwards
+
+Tasks run in a process pool. Expensive fits are cached on disk, keyed by
+their exact training input plus the engine's fit version (model parameters,
+library version and the source of the fit functions): Prophet per (country,
+cutoff) and XGBoost per cutoff (model JSON plus its predictions). Re-running
+after a feature tweak therefore refits only the XGBoost models, an upgrade or
+a parameter change refits that engine, and an unchanged run is served from
+cache.
+
+    python src/backtest.py                       # all engines, cutoffs 2016–2024
+    python src/backtest.py --engines linear xgboost --cutoffs 2018 2022 --workers 4
+
+Outputs, written to models/backtest/: backtest_errors.csv (one row per
+engine × target × country × cutoff × year), backtest_summary.csv and
+backtest_report.md.
+"""
+
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_store import ensure_store, load_features
+from forecast_features import TARGETS, build_features
+from forecast_model import (XGB_PARAMS, fit_needs_models, future_design, latest_rows, load_training_panel,
+                            score_horizon)
+from trend_engine import MIN_POINTS, forecast_funding
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+OUTPUT_DIR = os.path.join(MODELS_DIR, 'backtest')
+CACHE_DIR = os.path.join(OUTPUT_DIR, 'cache')
+
+ENGINES = ('linear', 'damped', 'prophet', 'xgboost')
+CUTOFFS = list(range(2016, 2025))
+HORIZON_YEARS = 3
+LAST_ACTUAL_YEAR = 2025
+PROPHET_CHUNK = 8   # countries per Prophet task
+
+# Engine → target it forecasts (trend engines forecast yearly requirement totals)
+FUNDING_TARGET = 'revisedRequirements'
+
+
+# ── Disk cache ───────────────────────────────────────────────────────────────
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            h.update(','.join(map(str, part.columns)).encode())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:24]
+
+
+def _library_version(name) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return 'missing'
+
+
+@functools.lru_cache(maxsize=None)
+def _fit_version(engine) -> str:
+    """Parameters, library version and fit-code hash that a cached `engine` fit depends on."""
+    if engine == 'xgboost':
+        parts = {'params': XGB_PARAMS, 'xgboost': _library_version('xgboost'),
+                 'code': [inspect.getsource(f) for f in (fit_needs_models, score_horizon, future_design, latest_rows)]}
+    elif engine == 'prophet':
+        from trend_engine import _prophet_forecast
+
+        parts = {'prophet': _library_version('prophet'), 'code': [inspect.getsource(_prophet_forecast)]}
+    else:
+        raise ValueError(f"no cached fits for engine {engine!r}")
+    return _digest(parts)
+
+
+def _cache_path(cache_dir, kind, key, ext='pkl'):
+    return os.path.join(cache_dir, kind, f'{key}.{ext}')
+
+
+def _cache_get(cache_dir, kind, key):
+    if not cache_dir:
+        return None
+    path = _cache_path(cache_dir, kind, key)
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+
+def _cache_put(cache_dir, kind, key, df):
+    if not cache_dir:
+        return
+    path = _cache_path(cache_dir, kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+# ── Tasks (module level so the process pool can pickle them) ─────────────────
+
+def _trend_task(engine, yearly, cutoff, years):
+    pred = forecast_funding(yearly, engine, years=years, train_end=cutoff)
+    pred = pred.rename(columns={'Predicted_Funding': 'Predicted'})[['iso3', 'year', 'Predicted']]
+    return pred.assign(engine=engine, target=FUNDING_TARGET, cutoff=cutoff), 0
+
+
+def _prophet_task(series_by_country, cutoff, years, cache_dir):
+    from trend_engine import _prophet_forecast
+
+    out, fitted = [], 0
+    for iso, series in series_by_country:
+        train = series[series['year'] <= cutoff]
+        if len(train) < MIN_POINTS:
+            continue
+        key = _digest('prophet', _fit_version('prophet'), iso, cutoff, years, train)
+        pred = _cache_get(cache_dir, 'prophet', key)
+        if pred is None:
+            pred = _prophet_forecast(train, years, train_end=cutoff)
+            _cache_put(cache_dir, 'prophet', key, pred)
+            fitted += 1
+        out.append(pred)
+    frame = pd.concat(out, ignore_index=True) if out else pd.DataFrame(columns=['iso3', 'year', 'Predicted_Funding'])
+    frame = frame.rename(columns={'Predicted_Funding': 'Predicted'})[['iso3', 'year', 'Predicted']]
+    return frame.assign(engine='prophet', target=FUNDING_TARGET, cutoff=cutoff), fitted
+
+
+def _xgboost_task(features_df, cutoff, years, cache_dir):
+    key = _digest('xgboost', _fit_version('xgboost'), cutoff, years, features_df)
+    pred = _cache_get(cache_dir, 'xgboost', key)
+    fitted = 0
+    if pred is None:
+        models = fit_needs_models(features_df)
+        scored = score_horizon(models, features_df, years=years)
+        pred = pd.concat([
+            scored[['iso3', 'year']].assign(target='In Need', Predicted=scored['Predicted_In_Need']),
+            scored[['iso3', 'year']].assign(target='revisedRequirements',
+                                            Predicted=scored['Predicted_Requirements']),
+        ], ignore_index=True)
+        if cache_dir:
+            for target, model in models.items():
+                path = _cache_path(cache_dir, 'xgboost', f'{key}-{target.replace(" ", "_")}', 'json')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                model.save_model(path)
+        _cache_put(cache_dir, 'xgboost', key, pred)
+        fitted = len(TARGETS)
+    return pred.assign(engine='xgboost', cutoff=cutoff), fitted
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+def _actuals(panel):
+    """
+    Yearly requirement totals for the trend engines (what they model) and
+    plan-level means for XGBoost (which is fitted on plan rows).
+    """
+    valid = panel[panel['iso3'].notna() & (panel['year'] <= LAST_ACTUAL_YEAR)]
+    totals = (valid[valid[FUNDING_TARGET].fillna(0) > 0]
+              .groupby(['iso3', 'year'], as_index=False)[FUNDING_TARGET].sum()
+              .rename(columns={FUNDING_TARGET: 'Actual'}).assign(target=FUNDING_TARGET, basis='total'))
+    means = []
+    for target in TARGETS:
+        rows = valid[pd.to_numeric(valid[target], errors='coerce').fillna(0) > 0]
+        means.append(rows.groupby(['iso3', 'year'], as_index=False)[target].mean()
+                     .rename(columns={target: 'Actual'}).assign(target=target, basis='mean'))
+    return totals, pd.concat(means, ignore_index=True)
+
+
+def _cutoff_features(panel, cutoff, use_store):
+    """Features as of `cutoff`: the feature store snapshot, or rebuilt from an explicit panel."""
+    if use_store:
+        return load_features(cutoff)
+    return build_features(panel[panel['year'] <= cutoff])
+
+
+def _build_tasks(panel, engines, cutoffs, horizon, cache_dir, use_store=False):
+    yearly = (panel[panel[FUNDING_TARGET].notna() & panel['iso3'].notna()]
+              .groupby(['iso3', 'year'], as_index=False)[FUNDING_TARGET].sum())
+    series = list(yearly.groupby('iso3', sort=True))
+    tasks = []
+    for cutoff in cutoffs:
+        years = [y for y in range(cutoff + 1, cutoff + horizon + 1) if y <= LAST_ACTUAL_YEAR]
+        if not years:
+            continue
+        for engine in engines:
+            if engine in ('linear', 'damped'):
+                tasks.append((_trend_task, (engine, yearly, cutoff, years)))
+            elif engine == 'prophet':
+                for i in range(0, len(series), PROPHET_CHUNK):
+                    tasks.append((_prophet_task, (series[i:i + PROPHET_CHUNK], cutoff, years, cache_dir)))
+            elif engine == 'xgboost':
+                tasks.append((_xgboost_task, (_cutoff_features(panel, cutoff, use_store), cutoff, years,
+                                              cache_dir)))
+    return tasks
+
+
+def available_engines(engines=ENGINES) -> tuple:
+    """Engines whose dependencies are importable; missing ones are skipped, not failed."""
+    needs = {'prophet': 'prophet', 'xgboost': 'xgboost'}
+    return tuple(e for e in engines if e not in needs or importlib.util.find_spec(needs[e]))
+
+
+def run_backtest(panel=None, engines=ENGINES, cutoffs=CUTOFFS, horizon=HORIZON_YEARS, workers=None,
+                 cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """
+    Walk-forward errors, one row per engine × target × country × cutoff ×
+    forecast year. `workers=1` runs in-process; `cache_dir=None` disables caching.
+    Without an explicit `panel`, XGBoost reads its point-in-time features from
+    the feature store (built for any missing cutoff first).
+    """
+    use_store = panel is None
+    panel = load_training_panel() if panel is None else panel
+    engines = available_engines(engines)
+    if use_store and 'xgboost' in engines:
+        ensure_store(as_of_years=cutoffs)
+    tasks = _build_tasks(panel, engines, cutoffs, horizon, cache_dir, use_store)
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [func(*args) for func, args in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(func, *args) for func, args in tasks]
+            results = [f.result() for f in futures]
+    fitted = sum(n for _, n in results)
+    preds = pd.concat([r for r, _ in results], ignore_index=True)
+
+    totals, means = _actuals(panel)
+    trend = preds[preds['engine'] != 'xgboost'].merge(totals, on=['iso3', 'year', 'target'])
+    xgb = preds[preds['engine'] == 'xgboost'].merge(means, on=['iso3', 'year', 'target'])
+    errors = pd.concat([trend, xgb], ignore_index=True)
+    errors['horizon'] = errors['year'] - errors['cutoff']
+    errors['error'] = errors['Predicted'] - errors['Actual']
+    errors['abs_pct_error'] = errors['error'].abs() / errors['Actual']
+    errors = errors[['engine', 'target', 'iso3', 'cutoff', 'year', 'horizon', 'Actual', 'Predicted',
+                     'error', 'abs_pct_error']].sort_values(['engine', 'target', 'iso3', 'cutoff', 'year'])
+    errors.attrs.update(seconds=time.perf_counter() - t0, tasks=len(tasks), fitted=fitted,
+                        engines=list(engines))
+    return errors.reset_index(drop=True)
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def summarize(errors) -> pd.DataFrame:
+    """Error metrics per engine × target × horizon."""
+    grouped = errors.groupby(['engine', 'target', 'horizon'])
+    return grouped.agg(
+        points=('error', 'size'),
+        countries=('iso3', 'nunique'),
+        mae=('error', lambda e: e.abs().mean()),
+        rmse=('error', lambda e: float(np.sqrt((e ** 2).mean()))),
+        mdape=('abs_pct_error', 'median'),
+        bias=('error', 'mean'),
+    ).reset_index()
+
+
+def country_errors(errors) -> pd.DataFrame:
+    """Error metrics per engine × target × country, worst first."""
+    table = errors.groupby(['engine', 'target', 'iso3']).agg(
+        points=('error', 'size'),
+        mae=('error', lambda e: e.abs().mean()),
+        mdape=('abs_pct_error', 'median'),
+    ).reset_index()
+    return table.sort_values(['engine', 'target', 'mdape'], ascending=[True, True, False])
+
+
+def write_report(errors, out_dir=OUTPUT_DIR) -> str:
+    """Write the error tables and a markdown summary; returns the report path."""
+    os.makedirs(out_dir, exist_ok=True)
+    summary = summarize(errors)
+    errors.to_csv(os.path.join(out_dir, 'backtest_errors.csv'), index=False)
+    summary.to_csv(os.path.join(out_dir, 'backtest_summary.csv'), index=False)
+    country_errors(errors).to_csv(os.path.join(out_dir, 'backtest_country_errors.csv'), index=False)
+
+    meta = errors.attrs
+    lines = [
+        '# Walk-forward backtest',
+        '',
+        f"Engines: {', '.join(meta.get('engines', sorted(errors['engine'].unique())))}  ",
+        f"Cutoffs: {errors['cutoff'].min()}–{errors['cutoff'].max()}, "
+        f"horizon ≤ {errors['horizon'].max()} years  ",
+        f"Run: {meta.get('tasks', '?')} tasks, {meta.get('fitted', '?')} fresh fits, "
+        f"{meta.get('seconds', float('nan')):.1f}s",
+        '',
+        '| engine | target | horizon | points | countries | MAE | RMSE | MdAPE | bias |',
+        '|---|---|---:|---:|---:|---:|---:|---:|---:|',
+    ]
+    for row in summary.itertuples(index=False):
+        lines.append(f'| {row.engine} | {row.target} | {row.horizon} | {row.points} | {row.countries} '
+                     f'| {row.mae:,.0f} | {row.rmse:,.0f} | {row.mdape:.1%} | {row.bias:,.0f} |')
+    path = os.path.join(out_dir, 'backtest_report.md')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the forecasting engines.')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--cutoffs', nargs='+', type=int, default=CUTOFFS)
+    parser.add_argument('--horizon', type=int, default=HORIZON_YEARS)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (1 = serial)')
+    parser.add_argument('--no-cache', action='store_true', help='refit everything')
+    parser.add_argument('--out', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    skipped = set(args.engines) - set(available_engines(args.engines))
+    if skipped:
+        print(f"skipping {', '.join(sorted(skipped))}: package not installed")
+    result = run_backtest(engines=args.engines, cutoffs=args.cutoffs, horizon=args.horizon,
+                          workers=args.workers, cache_dir=None if args.no_cache else CACHE_DIR)
+    report = write_report(result, args.out)
+    print(summarize(result).to_string(index=False))
+    print(f"\n{result.attrs['tasks']} tasks, {result.attrs['fitted']} fresh fits, "
+          f"{result.attrs['seconds']:.1f}s → {report}")
@@ -0,0 +1,226 @@
+"""
+Data-version registry shared by every cache in the app.
+
+A data version is a content hash. Each input file is hashed the first time a
+cache reads it; each cached function's version hashes the versions of its
+source files and of the caches it is built from, following the dependency
+graph in data_watch (FILE_DEPENDENTS / CACHE_DEPENDENTS):
+
+    current_version('country_metrics')                 # shared table name
+    current_version('analytics_page:get_analytics_figures')
+
+`@versioned` passes that version to the cached function as `data_version`,
+so it is part of every cache key: a new release gets new entries instead of
+clearing old ones, and an entry can never hold data from another version.
+
+The file hashes in use form one generation. When the data watcher reports a
+change, `refresh` hashes the changed files into a new generation, warms the
+affected caches under it on a background thread and then switches every
+cache to it at once. Until the switch, sessions keep reading the previous
+generation's entries, so pages stay consistent with each other (stale
+rather than mixed) and never wait on a rebuild.
+
+    python src/data_versions.py          # file hashes and cache versions in use
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+_log = logging.getLogger('h2c2.data_versions')
+
+# Entries kept per cached call: the generation being served and the one warming
+KEEP_VERSIONS = 2
+
+_lock = threading.Lock()
+_generation = {'id': 0, 'files': {}}      # path → content hash, as served
+_local = threading.local()                # .files: the generation being warmed on this thread
+_graph = {}
+_jobs = queue.Queue()
+_worker = None
+
+
+def file_digest(path) -> str:
+    try:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()[:16]
+    except FileNotFoundError:
+        return 'missing'
+
+
+def _dependency_graph():
+    """call → (source files, upstream calls), inverted from data_watch's maps."""
+    if not _graph:
+        from data_watch import CACHE_DEPENDENTS, FILE_DEPENDENTS
+
+        sources, upstream = {}, {}
+        for path, calls in FILE_DEPENDENTS.items():
+            for call in calls:
+                sources.setdefault(call, []).append(path)
+        for parent, calls in CACHE_DEPENDENTS.items():
+            for call in calls:
+                upstream.setdefault(call, []).append(parent)
+        for call in sources.keys() | upstream.keys():
+            _graph[call] = (sorted(sources.get(call, [])), sorted(upstream.get(call, [])))
+    return _graph
+
+
+def _resolve(table) -> str:
+    if ':' in table:
+        return table
+    from shared_tables import TABLES
+
+    return TABLES[table]
+
+
+def _files():
+    return getattr(_local, 'files', None) or _generation['files']
+
+
+def _file_version(path) -> str:
+    files = _files()
+    version = files.get(path)
+    if version is None:
+        # First read of this file: pin its current content in the generation
+        version = files.setdefault(path, file_digest(path))
+    return version
+
+
+def current_version(table) -> str:
+    """Version of a shared table or cached call (`module:function`) in the generation in use."""
+    call = _resolve(table)
+    sources, upstream = _dependency_graph().get(call, ([], []))
+    parts = {os.path.basename(p): _file_version(p) for p in sources}
+    parts.update({c: current_version(c) for c in upstream})
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def versioned(func):
+    """Key a cached function by the data version of its inputs (passed as `data_version`)."""
+    call = f'{func.__module__}:{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, data_version=current_version(call), **kwargs)
+
+    # data_watch.invalidate and the shared-table publisher still clear through it
+    wrapper.clear = getattr(func, 'clear', lambda: None)
+    return wrapper
+
+
+@contextmanager
+def pinned(files):
+    """Run the block against generation `files` (path → hash) on this thread."""
+    previous = getattr(_local, 'files', None)
+    _local.files = files
+    try:
+        yield
+    finally:
+        _local.files = previous
+
+
+# ── Refresh ──────────────────────────────────────────────────────────────────
+
+def _warm(calls):
+    from warmup import rewarm
+
+    rewarm(set(calls))
+    if 'genie:cached_genie_answer' in calls:
+        from genie import GENIE_PREFETCH_TIMEOUT, GENIE_PROMPTS, cached_genie_answer, genie_configured
+
+        if genie_configured():
+            for prompt in GENIE_PROMPTS:
+                try:
+                    cached_genie_answer(prompt, _timeout=GENIE_PREFETCH_TIMEOUT)
+                except Exception as exc:
+                    _log.warning("re-asking %r failed: %s", prompt, exc)
+
+
+def _apply(paths, warm):
+    from data_watch import affected_caches
+
+    with _lock:
+        base = _generation['files']
+    changed = {p: file_digest(p) for p in paths}
+    changed = {p: v for p, v in changed.items() if base.get(p) not in (None, v)}
+    if not changed:
+        return []
+    files = {**base, **changed}
+    calls = affected_caches(list(changed))
+    if warm:
+        with pinned(files):
+            _warm(calls)
+    with _lock:
+        # Files first read while warming were pinned into `files` as well
+        files = {**_generation['files'], **files}
+        _generation.update(id=_generation['id'] + 1, files=files)
+    _log.info("data generation %d: %s changed; %d caches now on new versions",
+              _generation['id'], ', '.join(os.path.basename(p) for p in changed), len(calls))
+    return calls
+
+
+def _run_jobs():
+    while True:
+        paths, warm, done = _jobs.get()
+        try:
+            done['calls'] = _apply(paths, warm)
+        except Exception as exc:
+            _log.warning("refresh after %s failed: %s", paths, exc)
+            done['calls'] = []
+        finally:
+            done['event'].set()
+
+
+def refresh(paths, warm=True, blocking=False) -> list:
+    """
+    Move to a generation with the current content of `paths`. Affected caches
+    are warmed (warm=True) before the switch; refreshes run one at a time on a
+    background thread. Returns the affected calls when `blocking`, else [].
+    """
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_jobs, name='h2c2-data-refresh', daemon=True)
+            _worker.start()
+    done = {'event': threading.Event(), 'calls': []}
+    _jobs.put((list(paths), warm, done))
+    if blocking:
+        done['event'].wait()
+        return done['calls']
+    return []
+
+
+def status() -> dict:
+    """Generation id, the file hashes in use and the version of every cache that has read one."""
+    graph = _dependency_graph()
+    files = dict(_generation['files'])
+    return {
+        'generation': _generation['id'],
+        'files': {os.path.basename(p): v for p, v in sorted(files.items())},
+        'versions': {call: current_version(call) for call in sorted(graph)
+                     if all(p in files for p in _all_sources(call))},
+    }
+
+
+def _all_sources(call):
+    sources, upstream = _dependency_graph().get(call, ([], []))
+    return set(sources).union(*(_all_sources(c) for c in upstream))
+
+
+if __name__ == '__main__':
+    for call in _dependency_graph():
+        current_version(call)
+    report = status()
+    print(f"generation {report['generation']}")
+    for name, version in report['files'].items():
+        print(f"  {version}  {name}")
+    for call, version in report['versions'].items():
+        print(f"  {version}  {call}")
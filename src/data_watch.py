@@ -0,0 +1,246 @@
+"""
+Data-file watcher and the cache dependency graph.
+
+Polls data/ and models/ for rewritten files (e.g. after fix_country_summary.py
+or a forecast refresh) and hands the changed files to data_versions.refresh:
+only the cached functions that depend on them — directly or through a derived
+cache — get a new data version, warmed in the background from the warm-up
+manifest before every page switches to it. Validated tables are first diffed
+against their last snapshot (snapshot_diff.content_changes), so a rewrite that
+changes no row changes no version. `invalidate` still clears entries by hand.
+
+Importing this module stays cheap (no pandas, no loaders): serve.py (or main.py
+with H2C2_BACKGROUND=1) starts the watcher at boot, and snapshot_diff is only
+imported by the polling thread once a file has actually changed.
+"""
+
+import logging
+import os
+import sys
+import threading
+
+from data_versions import refresh
+
+# Same directories as utils.DATA_DIR / MODELS_DIR, without importing the loaders
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(_ROOT, 'data')
+MODELS_DIR = os.path.join(_ROOT, 'models')
+
+WATCH_INTERVAL = float(os.environ.get('H2C2_WATCH_INTERVAL', 2.0))
+
+_log = logging.getLogger('h2c2.data_watch')
+
+
+def _data_path(*parts):
+    return os.path.normpath(os.path.join(*parts))
+
+
+# Cached functions that read each file directly
+FILE_DEPENDENTS = {
+    _data_path(DATA_DIR, 'humanitarian_analysis_country_metrics.csv'): [
+        'utils:load_country_metrics',
+        'utils:load_year_cubes',
+        'health_regions:generate_sample_entities',
+    ],
+    _data_path(DATA_DIR, 'humanitarian-response-plans.csv'): [
+        'utils:load_year_cubes',
+    ],
+    _data_path(DATA_DIR, 'humanitarian_analysis_sector_benchmarking.csv'): [
+        'utils:load_sector_benchmarking',
+    ],
+    _data_path(DATA_DIR, 'humanitarian_analysis_sector_matrix.csv'): [
+        'utils:load_sector_matrix',
+        'utils:load_flagged_regions',
+    ],
+    _data_path(DATA_DIR, 'country_level_summary (1).csv'): [
+        'health_regions:generate_sample_entities',
+        'utils:load_flagged_regions',
+    ],
+    _data_path(DATA_DIR, 'updated_admin1_summary_data.csv'): [
+        'utils:load_flagged_regions',
+    ],
+    _data_path(MODELS_DIR, 'forecast_results_2026_2030.csv'): [
+        'utils:load_forecast_data',
+    ],
+    # Promoting a model version rewrites the pointer file
+    _data_path(MODELS_DIR, 'artifacts', 'LATEST'): [
+        'model_registry:get_registry',
+    ],
+}
+
+# Cached functions built from the output of other cached functions
+CACHE_DEPENDENTS = {
+    # Genie answers over the same tables, so cached answers follow their versions
+    'utils:load_country_metrics': [
+        'analytics_page:get_analytics_figures',
+        'analytics_page:get_country_index',
+        'forecast_page:get_forecast_index',
+        'genie:cached_genie_answer',
+    ],
+    'utils:load_sector_benchmarking': ['analytics_page:get_analytics_figures', 'genie:cached_genie_answer'],
+    'utils:load_sector_matrix': [
+        'analytics_page:get_analytics_figures',
+        'analytics_page:get_sector_drilldown',
+        'analytics_page:get_country_index',
+        'forecast_page:get_forecast_index',
+    ],
+    'utils:load_forecast_data': [
+        'forecast_page:get_forecast_figures',
+        'forecast_page:get_forecast_index',
+        'genie:cached_genie_answer',
+        'scenarios:get_scenario_base',
+        'uncertainty:get_uncertainty_bands',
+        'utils:load_high_risk_data',
+    ],
+    'uncertainty:get_uncertainty_bands': ['forecast_page:get_forecast_figures', 'forecast_page:get_forecast_index'],
+    'model_registry:get_registry': ['uncertainty:get_uncertainty_bands'],
+    'scenarios:get_scenario_base': ['scenarios:run_scenario'],
+    'utils:load_high_risk_data': ['analytics_page:get_country_index'],
+    'utils:load_year_cubes': [
+        'analytics_page:get_year_figures',
+        'analytics_page:get_country_index',
+        'health_regions:get_globe_html',
+    ],
+    'health_regions:generate_sample_entities': ['health_regions:get_globe_html'],
+}
+
+WATCH_DIRS = [_data_path(DATA_DIR), _data_path(MODELS_DIR), _data_path(MODELS_DIR, 'artifacts')]
+
+
+def affected_caches(paths) -> list:
+    """Every cached function downstream of `paths`, each after the caches it is built from."""
+    reached = []
+    queue = [call for p in paths for call in FILE_DEPENDENTS.get(_data_path(p), [])]
+    while queue:
+        call = queue.pop(0)
+        if call in reached:
+            continue
+        reached.append(call)
+        queue.extend(CACHE_DEPENDENTS.get(call, []))
+    ordered = []
+
+    def visit(call):
+        if call in ordered:
+            return
+        for parent in reached:
+            if call in CACHE_DEPENDENTS.get(parent, ()):
+                visit(parent)
+        ordered.append(call)
+
+    for call in reached:
+        visit(call)
+    return ordered
+
+
+def invalidate(paths, rewarm=False) -> list:
+    """
+    Clear the caches that depend on `paths`; returns the calls that were cleared.
+    Modules that were never imported hold no entries and are skipped, so the
+    watcher never drags Plotly or page code into a process that did not use it.
+    """
+    cleared = []
+    for call in affected_caches(paths):
+        module_name, func_name = call.split(':', 1)
+        module = sys.modules.get(module_name)
+        func = getattr(module, func_name, None) if module else None
+        if func is None or not hasattr(func, 'clear'):
+            continue
+        func.clear()
+        cleared.append(call)
+    if cleared:
+        _log.info("invalidated %s after change to %s", ', '.join(cleared),
+                  ', '.join(os.path.basename(p) for p in paths))
+    if rewarm and cleared:
+        from warmup import rewarm as _rewarm
+        _rewarm(set(cleared))
+    return cleared
+
+
+def _snapshot(dirs):
+    sigs = {}
+    for d in dirs:
+        try:
+            entries = os.scandir(d)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file():
+                    st = entry.stat()
+                    sigs[_data_path(entry.path)] = (st.st_mtime_ns, st.st_size)
+    return sigs
+
+
+class DataWatcher:
+    """
+    Polling watcher (portable, no inotify dependency). A change is acted on
+    only once the file's signature is stable across two polls, so a CSV that
+    is still being written is not loaded half-way through.
+    """
+
+    def __init__(self, dirs=None, interval=WATCH_INTERVAL, rewarm=True, on_change=None):
+        self.dirs = dirs or WATCH_DIRS
+        self.interval = interval
+        self.rewarm = rewarm
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self, known, pending):
+        """One polling step; returns the paths whose change is now settled."""
+        current = _snapshot(self.dirs)
+        changed = {p for p in current.keys() | known.keys() if current.get(p) != known.get(p)}
+        settled = [p for p, sig in pending.items() if current.get(p) == sig and p not in changed]
+        for p in settled:
+            del pending[p]
+        for p in changed:
+            pending[p] = current.get(p)
+        known.clear()
+        known.update(current)
+        return settled
+
+    def _run(self, known):
+        pending = {}
+        while not self._stop.wait(self.interval):
+            settled = self.poll(known, pending)
+            if not settled:
+                continue
+            try:
+                from snapshot_diff import content_changes
+
+                # A file rewritten with the same rows (re-export, reordering) keeps its caches
+                changed = content_changes(settled, log=_log.info)
+                if not changed:
+                    continue
+                # Old versions keep serving until the new ones are warm
+                calls = refresh(changed, warm=self.rewarm, blocking=True)
+                if self.on_change:
+                    self.on_change(changed, calls)
+            except Exception as exc:
+                _log.warning("refresh after %s failed: %s", settled, exc)
+
+    def start(self):
+        if self._thread is None:
+            # Baseline is taken before returning so no write after start() is missed
+            self._thread = threading.Thread(target=self._run, args=(_snapshot(self.dirs),),
+                                            name='h2c2-data-watch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_lock = threading.Lock()
+_watcher = None
+
+
+def start_watcher(rewarm=True):
+    """Start the process-wide watcher once; disabled with H2C2_WATCH_DATA=0."""
+    global _watcher
+    if os.environ.get('H2C2_WATCH_DATA', '1') == '0':
+        return None
+    with _lock:
+        if _watcher is None:
+            _watcher = DataWatcher(rewarm=rewarm).start()
+    return _watcher
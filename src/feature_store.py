@@ -0,0 +1,233 @@
+"""
+Materialized forecasting features, shared by training, backtests and scoring.
+
+Features are built once from the raw CSVs (forecast_features.build_features)
+and written as Parquet under models/feature_store/<version>/:
+
+    manifest.json                      sources + hashes, schema, snapshots
+    as_of=2020/year=2014.parquet       one file per snapshot × feature year
+    ...
+
+Each snapshot `as_of=Y` holds the features computed only from plan rows with
+year ≤ Y, including gap filling and fill medians, so reading a cutoff is
+point-in-time correct: a backtest at cutoff 2020 sees exactly what the
+pipeline would have produced in 2020. The latest snapshot covers every year
+and is what the registry trains on and the app scores from.
+
+The version is a hash of the source files, the feature code and the panel
+options, so editing a CSV or a feature definition yields a new version;
+snapshots for an existing version are added on demand. CURRENT names the
+version readers use.
+
+    python src/feature_store.py build            # materialize every snapshot
+    python -m pytest tests/test_feature_store.py # every snapshot equals build_features
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from forecast_features import FILL_STRATEGIES, NUMERIC_COLS, build_features, fill_remaining
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SRC_DIR, '..', 'data')
+STORE_DIR = os.path.join(SRC_DIR, '..', 'models', 'feature_store')
+
+SOURCE_FILES = ['humanitarian-response-plans.csv', 'country_level_summary (1).csv']
+CODE_FILES = ['forecast_features.py', 'forecast_model.py', 'hrp_plans.py']
+FIRST_AS_OF = 2016
+
+KEY_COLS = ['iso3', 'year']
+VALUE_COLS = NUMERIC_COLS + list(FILL_STRATEGIES)
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([pa.field('iso3', pa.string()), pa.field('year', pa.int64())]
+                     + [pa.field(col, pa.float64()) for col in VALUE_COLS])
+
+
+def _sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(path, payload):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True, default=str)
+    os.replace(tmp_path, path)
+
+
+def source_signature(data_dir=DATA_DIR, allocation=None) -> dict:
+    """Hashes of everything the features depend on."""
+    return {
+        'sources': {name: _sha256(os.path.join(data_dir, name)) for name in SOURCE_FILES},
+        'code': {name: _sha256(os.path.join(SRC_DIR, name)) for name in CODE_FILES},
+        'allocation': allocation,
+    }
+
+
+def store_version(signature) -> str:
+    return hashlib.sha256(json.dumps(signature, sort_keys=True).encode()).hexdigest()[:12]
+
+
+# ── Reading ──────────────────────────────────────────────────────────────────
+
+def current_version(store_dir=STORE_DIR):
+    try:
+        with open(os.path.join(store_dir, 'CURRENT'), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(version=None, store_dir=STORE_DIR) -> dict:
+    version = version or current_version(store_dir)
+    if not version:
+        raise FileNotFoundError(f"no feature store under {store_dir}; run `python src/feature_store.py build`")
+    with open(os.path.join(store_dir, version, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_features(as_of=None, years=None, version=None, store_dir=STORE_DIR) -> pd.DataFrame:
+    """
+    The snapshot as of `as_of` (default: latest), in build_features order.
+    `years` limits which year partitions are read.
+    """
+    import pyarrow.dataset as ds
+
+    manifest = read_manifest(version, store_dir)
+    snapshots = manifest['snapshots']
+    as_of = str(max(map(int, snapshots)) if as_of is None else as_of)
+    if as_of not in snapshots:
+        raise KeyError(f"feature store {manifest['version']} has no snapshot as of {as_of} "
+                       f"(available: {', '.join(sorted(snapshots))})")
+
+    part_dir = os.path.join(store_dir, manifest['version'], f'as_of={as_of}')
+    wanted = sorted(map(int, snapshots[as_of]['years']))
+    if years is not None:
+        wanted = sorted(set(wanted) & set(years))
+    schema = _schema()
+    if not wanted:
+        return schema.empty_table().to_pandas()
+    dataset = ds.dataset([os.path.join(part_dir, f'year={y}.parquet') for y in wanted], format='parquet')
+    if not dataset.schema.equals(schema, check_metadata=False):
+        raise ValueError(f"schema drift in {part_dir}: expected {schema}, found {dataset.schema}")
+    df = dataset.to_table().to_pandas()
+    return df.sort_values(KEY_COLS, kind='stable').reset_index(drop=True)
+
+
+def snapshot_medians(as_of=None, version=None, store_dir=STORE_DIR) -> dict:
+    """Fill medians of a snapshot (what unseen rows should be filled with)."""
+    snapshots = read_manifest(version, store_dir)['snapshots']
+    as_of = str(max(map(int, snapshots)) if as_of is None else as_of)
+    return snapshots[as_of]['medians']
+
+
+# ── Writing ──────────────────────────────────────────────────────────────────
+
+def snapshot_frame(panel, as_of) -> tuple:
+    """Features of the panel rows up to `as_of`, and the medians used to fill them."""
+    features_df = build_features(panel[panel['year'] <= as_of], fill=False)
+    medians = {col: float(features_df[col].median())
+               for col, strategy in FILL_STRATEGIES.items() if strategy == 'median'}
+    features_df = fill_remaining(features_df, medians)
+    return features_df[KEY_COLS + VALUE_COLS], medians
+
+
+def _write_snapshot(features_df, part_dir) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema()
+    counts = {}
+    os.makedirs(part_dir)
+    for year, rows in features_df.groupby('year', sort=True):
+        table = pa.Table.from_pandas(rows.astype({c: float for c in VALUE_COLS}), schema=schema,
+                                     preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, f'year={int(year)}.parquet'))
+        counts[str(int(year))] = len(rows)
+    return counts
+
+
+def ensure_store(as_of_years=None, data_dir=DATA_DIR, allocation=None, store_dir=STORE_DIR) -> str:
+    """
+    Make sure the store matches the current sources and holds a snapshot for
+    every year in `as_of_years` (default FIRST_AS_OF … latest plan year).
+    Only missing snapshots are built. Returns the version, which becomes CURRENT.
+    """
+    from forecast_model import load_training_panel
+
+    signature = source_signature(data_dir, allocation)
+    version = store_version(signature)
+    version_dir = os.path.join(store_dir, version)
+    manifest_path = os.path.join(version_dir, 'manifest.json')
+    os.makedirs(version_dir, exist_ok=True)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    else:
+        manifest = {
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            **signature,
+            'schema': {field.name: str(field.type) for field in _schema()},
+            'fill_strategies': FILL_STRATEGIES,
+            'snapshots': {},
+        }
+
+    panel = None
+    latest = None
+    if as_of_years is None or any(str(y) not in manifest['snapshots'] for y in as_of_years):
+        panel = load_training_panel(data_dir, allocation=allocation)
+        latest = int(panel['year'].max())
+    wanted = range(FIRST_AS_OF, latest + 1) if as_of_years is None else as_of_years
+    for as_of in wanted:
+        if str(as_of) in manifest['snapshots']:
+            continue
+        features_df, medians = snapshot_frame(panel, as_of)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=version_dir)
+        try:
+            counts = _write_snapshot(features_df, os.path.join(staging, 'part'))
+            os.replace(os.path.join(staging, 'part'), os.path.join(version_dir, f'as_of={as_of}'))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        manifest['snapshots'][str(as_of)] = {'rows': len(features_df), 'years': counts, 'medians': medians}
+        _write_json(manifest_path, manifest)
+
+    if current_version(store_dir) != version:
+        tmp_path = os.path.join(store_dir, f'.CURRENT.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(store_dir, 'CURRENT'))
+    return version
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Forecasting feature store.')
+    parser.add_argument('command', nargs='?', choices=['build', 'show'], default='show')
+    parser.add_argument('--as-of', nargs='+', type=int, help='snapshot years to build (default: all)')
+    parser.add_argument('--allocation', choices=['equal', 'population'],
+                        help='build from the allocated country-year panel (hrp_plans)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print(f"CURRENT → {ensure_store(args.as_of, allocation=args.allocation)}")
+    else:
+        manifest = read_manifest()
+        print(f"{manifest['version']}  created {manifest['created_at']}  allocation={manifest['allocation']}")
+        for as_of, snap in sorted(manifest['snapshots'].items(), key=lambda kv: int(kv[0])):
+            years = sorted(map(int, snap['years']))
+            print(f"  as_of={as_of}: {snap['rows']} rows, years {years[0]}–{years[-1]}")
@@ -0,0 +1,91 @@
+"""
+Bitmap indexes behind the analytics and forecast filter panels.
+
+A BitmapIndex is built once per cached table (and data version). Every
+facet value gets a bitmap of the rows carrying it, packed 64 rows to a
+word, and every rankable column gets a presorted ordering:
+
+    index = BitmapIndex(df, facets=['Region', 'Severity Quartile'], order_by=['Mismatch Score'])
+    words = index.select({'Region': ['Asia & Pacific'], 'Severity Quartile': ['High', 'Critical']})
+    index.count(words)                              # popcount
+    index.top(words, 'Mismatch Score', 10)          # row positions, best first
+
+A selection ORs the bitmaps of the values picked within a facet and ANDs
+the facets together; facets with nothing picked do not filter. Multi-valued
+facets (a country with plans in several years or several sectors) are
+passed as `multi={facet: {value: row mask}}`. Top-N queries gather the
+selection along the presorted ordering, so no filter combination sorts or
+regroups the table.
+"""
+
+import numpy as np
+import pandas as pd
+
+WORD_BITS = 64
+
+
+def pack(mask) -> np.ndarray:
+    """Boolean row mask → uint64 words (row i is bit i % 64 of word i // 64)."""
+    mask = np.asarray(mask, dtype=bool)
+    padded = np.zeros(-(-len(mask) // WORD_BITS) * WORD_BITS, dtype=bool)
+    padded[:len(mask)] = mask
+    return np.packbits(padded, bitorder='little').view(np.uint64)
+
+
+def unpack(words, n_rows) -> np.ndarray:
+    return np.unpackbits(words.view(np.uint8), bitorder='little')[:n_rows].view(bool)
+
+
+def popcount(words) -> int:
+    if hasattr(np, 'bitwise_count'):   # NumPy ≥ 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class BitmapIndex:
+    """Facet bitmaps and presorted orderings over one table (read-only once built)."""
+
+    def __init__(self, df, facets=(), multi=None, order_by=()):
+        self.n_rows = len(df)
+        self.all = pack(np.ones(self.n_rows, dtype=bool))
+        self.bitmaps = {}
+        for facet in facets:
+            codes, values = pd.factorize(df[facet], sort=True)
+            self.bitmaps[facet] = {value: pack(codes == k) for k, value in enumerate(values)}
+        for facet, masks in (multi or {}).items():
+            self.bitmaps[facet] = {value: pack(mask) for value, mask in sorted(masks.items()) if np.any(mask)}
+        # Descending, NaN last; ties keep table order
+        self.orders = {col: np.argsort(-df[col].to_numpy(dtype=float, na_value=np.nan), kind='stable')
+                       for col in order_by}
+
+    def values(self, facet) -> list:
+        return list(self.bitmaps.get(facet, {}))
+
+    def select(self, filters) -> np.ndarray:
+        """Words of the rows matching every facet in `filters` (any of its values)."""
+        words = self.all.copy()
+        for facet, picked in filters.items():
+            if not picked:
+                continue
+            bitmaps = self.bitmaps.get(facet, {})
+            any_of = np.zeros_like(words)
+            for value in picked:
+                if value in bitmaps:
+                    any_of |= bitmaps[value]
+            words &= any_of
+        return words
+
+    def mask(self, words) -> np.ndarray:
+        return unpack(words, self.n_rows)
+
+    def rows(self, words) -> np.ndarray:
+        return np.flatnonzero(self.mask(words))
+
+    def count(self, words) -> int:
+        return popcount(words)
+
+    def top(self, words, col, n=None) -> np.ndarray:
+        """Positions of the selected rows, largest `col` first (NaN last), at most `n`."""
+        order = self.orders[col]
+        hits = order[self.mask(words)[order]]
+        return hits if n is None else hits[:n]
@@ -0,0 +1,148 @@
+"""
+Feature engineering for the needs/requirements forecasting pipeline.
+
+Same features and fill rules as the feature cell of models/ML_Forecasting.ipynb
+(Dependency Ratio, Population Velocity, Lagged Requirements, Cost per
+Beneficiary, Cost Inflation), computed over a frame sorted once by
+(group keys, year). Gap filling uses one grouped ffill/bfill over every numeric
+column, and the lags, percentage changes and 3-year rolling mean are NumPy
+shifts masked at group boundaries — no per-group Python lambdas.
+
+Group keys default to iso3; pass e.g. ('scenario', 'iso3') to build features
+for several what-if scenarios in one call.
+
+    python -m pytest tests/test_forecast_features.py   # parity with the notebook feature cell
+"""
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLS = ['revisedRequirements', 'In Need', 'Targeted', 'Total_Population']
+
+FEATURES = ['year', 'Dependency Ratio', 'Population Velocity', 'Cost Inflation', 'Cost per Beneficiary']
+TARGETS = ['In Need', 'revisedRequirements']
+
+# Notebook fill rules for what is still missing after feature building
+FILL_STRATEGIES = {
+    'Dependency Ratio': 'median',
+    'Population Velocity': 0,
+    'Lagged Requirements': 0,
+    'Cost per Beneficiary': 'median',
+    'Cost Inflation': 0,
+}
+
+VELOCITY_WINDOW = 3
+
+
+# ── Grouped primitives ───────────────────────────────────────────────────────
+
+def _group_starts(df, keys) -> np.ndarray:
+    """Boolean mask of the first row of each group in a frame sorted by `keys`."""
+    starts = np.zeros(len(df), dtype=bool)
+    if len(df):
+        starts[0] = True
+    for key in keys:
+        values = df[key].to_numpy()
+        starts[1:] |= values[1:] != values[:-1]
+    return starts
+
+
+def _position_in_group(starts) -> np.ndarray:
+    """0-based row position within its group."""
+    idx = np.arange(len(starts))
+    first = np.maximum.accumulate(np.where(starts, idx, 0))
+    return idx - first
+
+
+def _shift(values, pos, k=1) -> np.ndarray:
+    """Group-aware shift by `k` rows; rows with fewer than k predecessors get NaN."""
+    out = np.full(len(values), np.nan)
+    if k < len(values):
+        out[k:] = values[:-k]
+    out[pos < k] = np.nan
+    return out
+
+
+def _pct_change(values, pos) -> np.ndarray:
+    """pct_change(fill_method=None) within groups."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values / _shift(values, pos) - 1.0
+
+
+def _rolling_mean(values, pos, window) -> np.ndarray:
+    """rolling(window, min_periods=1).mean() within groups, skipping NaN."""
+    total = np.where(np.isnan(values), 0.0, values)
+    count = (~np.isnan(values)).astype(float)
+    sums, counts = total.copy(), count.copy()
+    for k in range(1, window):
+        sums += np.nan_to_num(_shift(total, pos, k), nan=0.0)
+        counts += np.nan_to_num(_shift(count, pos, k), nan=0.0)
+    with np.errstate(invalid='ignore'):
+        return np.where(counts > 0, sums / np.where(counts > 0, counts, 1), np.nan)
+
+
+# ── Feature stage ────────────────────────────────────────────────────────────
+
+def fill_numeric_gaps(df, keys=('iso3',), cols=NUMERIC_COLS) -> pd.DataFrame:
+    """Coerce `cols` to numeric, treat 0 as missing, then ffill/bfill within each group."""
+    cols = [c for c in cols if c in df.columns]
+    if not cols:
+        return df
+    values = df[cols].apply(pd.to_numeric, errors='coerce')
+    values = values.mask(values == 0)
+    grouped = values.groupby([df[k] for k in keys], sort=False)
+    filled = grouped.ffill()
+    df[cols] = filled.groupby([df[k] for k in keys], sort=False).bfill()
+    return df
+
+
+def build_features(df, keys=('iso3',), fill=True) -> pd.DataFrame:
+    """
+    Return a copy of `df` sorted by keys + year with the model features added.
+    `fill=False` leaves the remaining NaNs in place (e.g. to apply the training
+    set's medians to a scoring frame).
+    """
+    keys = list(keys)
+    df = df.sort_values(keys + ['year'], kind='stable').reset_index(drop=True)
+    df = fill_numeric_gaps(df, keys)
+
+    starts = _group_starts(df, keys)
+    pos = _position_in_group(starts)
+
+    in_need = df['In Need'].to_numpy(dtype=float)
+    requirements = df['revisedRequirements'].to_numpy(dtype=float)
+    targeted = df['Targeted'].to_numpy(dtype=float)
+
+    if 'Dependency Ratio' not in df.columns:
+        denom = (df['Total_Population'] if 'Total_Population' in df.columns
+                 else pd.Series(np.nan, index=df.index))
+        if 'Population' in df.columns:
+            denom = denom.fillna(pd.to_numeric(df['Population'], errors='coerce'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['Dependency Ratio'] = in_need / denom.to_numpy(dtype=float)
+
+    df['Population Velocity'] = _rolling_mean(_pct_change(in_need, pos), pos, VELOCITY_WINDOW)
+    df['Lagged Requirements'] = _shift(requirements, pos)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost = requirements / targeted
+    cost[np.isinf(cost)] = np.nan
+    df['Cost per Beneficiary'] = cost
+    df['Cost Inflation'] = _pct_change(cost, pos)
+
+    if fill:
+        df = fill_remaining(df)
+    return df
+
+
+def fill_remaining(df, medians=None) -> pd.DataFrame:
+    """Apply FILL_STRATEGIES; `medians` overrides the frame's own medians."""
+    medians = medians or {}
+    for col, strategy in FILL_STRATEGIES.items():
+        if col not in df.columns:
+            continue
+        if strategy == 'median':
+            df[col] = df[col].fillna(medians.get(col, df[col].median()))
+        else:
+            df[col] = df[col].fillna(strategy)
+    return df
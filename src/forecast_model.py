@@ -0,0 +1,150 @@
+"""
+Needs and requirements models (stage B of models/ML_Forecasting.ipynb).
+
+Builds the notebook's training panel from the repo's data files, fits the two
+XGBoost regressors, and scores the 2026–2030 horizon in one batch: the last
+observation of every country is taken in a single pass over the sorted frame,
+expanded into a country × horizon design matrix, and each target model is
+called once.
+
+    python -m pytest tests/test_forecast_model.py   # parity with the notebook scoring loop
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from forecast_features import FEATURES, TARGETS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+HORIZON = [2026, 2027, 2028, 2029, 2030]
+
+XGB_PARAMS = {'objective': 'reg:squarederror', 'n_estimators': 100, 'random_state': 42}
+
+# Target column → output column of the scored horizon
+PREDICTION_COLUMNS = {
+    'In Need': 'Predicted_In_Need',
+    'revisedRequirements': 'Predicted_Requirements',
+}
+
+
+# ── Training panel ────────────────────────────────────────────────────────────
+
+def load_training_panel(data_dir=DATA_DIR, allocation=None) -> pd.DataFrame:
+    """
+    HRP plans merged with the country summary, as in the notebook's first cell:
+    one row per plan, keyed by the raw `locations` string (multi-country plans
+    keep their pipe-joined code) and plan year.
+
+    With `allocation` ('equal' or 'population') the plans are instead exploded
+    into a clean iso3 × year requirements index (hrp_plans), so regional plans
+    are shared among their member countries and every row meets the summary.
+    """
+    summary = pd.read_csv(os.path.join(data_dir, 'country_level_summary (1).csv'))
+    summary = summary.rename(columns={'Country ISO3': 'iso3'})
+    if allocation:
+        from hrp_plans import allocate_requirements, country_year_requirements, load_plans
+
+        plans = load_plans(os.path.join(data_dir, 'humanitarian-response-plans.csv'))
+        hrp = country_year_requirements(allocate_requirements(plans, allocation))
+        return hrp.merge(summary, on='iso3', how='left', suffixes=('', '_summary'))
+
+    hrp = pd.read_csv(os.path.join(data_dir, 'humanitarian-response-plans.csv'), skiprows=[1])
+    hrp = hrp.rename(columns={'locations': 'iso3', 'years': 'year'})
+    hrp['year'] = pd.to_numeric(hrp['year'], errors='coerce').fillna(0).astype(int)
+    return hrp.merge(summary, on='iso3', how='left', suffixes=('', '_summary'))
+
+
+def model_frame(features_df, features=FEATURES, targets=TARGETS) -> pd.DataFrame:
+    """Rows usable for fitting: every feature and target present."""
+    return features_df.dropna(subset=list(targets) + list(features))
+
+
+def fit_needs_models(features_df, features=FEATURES, targets=TARGETS, target_params=None, **params) -> dict:
+    """
+    One XGBRegressor per target, fitted on every usable row. `target_params`
+    maps a target to its own parameters (e.g. tuning.best_params output).
+    """
+    from xgboost import XGBRegressor
+
+    frame = model_frame(features_df, features, targets)
+    X = frame[features]
+    models = {}
+    for target in targets:
+        model = XGBRegressor(**{**XGB_PARAMS, **params, **(target_params or {}).get(target, {})})
+        model.fit(X, frame[target])
+        models[target] = model
+    return models
+
+
+def holdout_predictions(features_df, train_end=2019, val_years=(2020, 2025), features=FEATURES,
+                        targets=TARGETS, target_params=None) -> pd.DataFrame:
+    """The notebook's temporal hold-out: fit on ≤ train_end, predict val_years."""
+    frame = model_frame(features_df, features, targets)
+    train = frame[frame['year'] <= train_end]
+    val = frame[frame['year'].between(*val_years)]
+    models = fit_needs_models(train, features, targets, target_params)
+    out = val[['iso3', 'year'] + list(targets)].copy()
+    for target in targets:
+        out[PREDICTION_COLUMNS.get(target, f'Predicted_{target}')] = models[target].predict(val[features])
+    return out
+
+
+def validation_rmse(features_df, **kwargs) -> dict:
+    """Hold-out RMSE per target (the figures the notebook prints)."""
+    holdout = holdout_predictions(features_df, **kwargs)
+    return {
+        target: float(np.sqrt(np.mean((holdout[PREDICTION_COLUMNS[target]] - holdout[target]) ** 2)))
+        for target in PREDICTION_COLUMNS if target in holdout
+    }
+
+
+def residual_log_sigma(holdout) -> dict:
+    """
+    Spread of hold-out errors on the log scale per target, i.e. the typical
+    multiplicative error of a prediction (used for uncertainty sampling).
+    """
+    sigmas = {}
+    for target, col in PREDICTION_COLUMNS.items():
+        ok = (holdout[target] > 0) & (holdout[col] > 0)
+        log_err = np.log(holdout.loc[ok, col]) - np.log(holdout.loc[ok, target])
+        sigmas[target] = float(log_err.std(ddof=1)) if ok.sum() > 1 else float('nan')
+    return sigmas
+
+
+# ── Batch scoring ─────────────────────────────────────────────────────────────
+
+def latest_rows(features_df, keys=('iso3',)) -> pd.DataFrame:
+    """Last observation (by year) of every group, in one sort and one boundary pass."""
+    keys = list(keys)
+    df = features_df.dropna(subset=keys).sort_values(keys + ['year'], kind='stable')
+    same_as_next = np.zeros(len(df), dtype=bool)
+    same_as_next[:-1] = True
+    for key in keys:
+        values = df[key].to_numpy()
+        same_as_next[:-1] &= values[:-1] == values[1:]
+    return df[~same_as_next].reset_index(drop=True)
+
+
+def future_design(latest, years=HORIZON, keys=('iso3',), features=FEATURES) -> pd.DataFrame:
+    """Country × horizon design matrix: each latest row repeated once per future year."""
+    keys = list(keys)
+    carried = [f for f in features if f != 'year']
+    n_years = len(years)
+    design = latest[keys + carried].iloc[np.repeat(np.arange(len(latest)), n_years)].reset_index(drop=True)
+    design['year'] = np.tile(np.asarray(years), len(latest))
+    return design[keys + ['year'] + carried]
+
+
+def score_horizon(models, features_df, years=HORIZON, keys=('iso3',), features=FEATURES) -> pd.DataFrame:
+    """
+    Predicted_In_Need / Predicted_Requirements for every group × year in
+    `years`, with one predict call per target model.
+    """
+    design = future_design(latest_rows(features_df, keys), years, keys, features)
+    X = design[features]
+    for target, model in models.items():
+        design[PREDICTION_COLUMNS.get(target, f'Predicted_{target}')] = model.predict(X)
+    return design[list(keys) + ['year'] + [c for c in design.columns if c.startswith('Predicted_')]]
@@ -4,36 +4,65 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
+from data_versions import KEEP_VERSIONS, versioned
+from filter_index import BitmapIndex
 from utils import (
-    FORECAST_COUNTRY_NAMES,
+    FORECAST_COUNTRY_NAMES, ISO3_TO_REGION,
     _AXIS_BASE, _chart_layout,
-    chart_caption, section_header,
-    load_forecast_data, load_high_risk_data,
+    chart_caption, filter_panel, section_header,
+    load_country_metrics, load_forecast_data, load_high_risk_data, load_sector_matrix,
 )
 from styles import PIPELINE_CSS
+from scenarios import DEFAULT_THRESHOLD, OTHER_REGION, REGIONS, run_scenario, scenario_key
+from uncertainty import HIGH_NEGLECT, get_uncertainty_bands
 
+# Partial reruns keep slider drags from re-rendering the whole page (Streamlit ≥ 1.37)
+_fragment = getattr(st, 'fragment', lambda func: func)
+
+FORECAST_FACETS = ['Region', 'Neglect Probability', 'Year', 'Funding Category', 'Severity Quartile', 'Sector']
+NEGLECT_BANDS = (0.1, 0.5, 0.9)
+NEGLECT_LABELS = ['0–10%', '10–50%', '50–90%', '90–100%']   # sort in band order
+RANK_BY = {'Funding gap': 'Funding_Gap', 'Probability of neglect': 'Neglect_Probability'}
 
-# ── Chart builders ─────────────────────────────────────────────────────────────
 
-def _build_chart_f(df_risk):
-    """Top countries by projected funding gap — 2026, colored by funding type."""
-    df_2026 = df_risk[df_risk['year'] == 2026].copy()
+# ── Chart builders ─────────────────────────────────────────────────────────────
 
-    df_2026['Funding_Category'] = np.where(
-        df_2026['Predicted_Funding'] < 0, 'Funding Collapse',
-        np.where(df_2026['Predicted_Funding'] == 0, 'No Coverage Data', 'Underfunded')
+def _funding_frame(df, bands):
+    """Forecast rows with their Monte Carlo gap range and funding category."""
+    df = df.merge(bands[['iso3', 'year', 'Neglect_Probability', 'Gap_p10', 'Gap_p90']],
+                  on=['iso3', 'year'], how='left')
+    df['Funding_Category'] = np.where(
+        df['Predicted_Funding'] < 0, 'Funding Collapse',
+        np.where(df['Predicted_Funding'] == 0, 'No Coverage Data', 'Underfunded')
     )
+    return df
+
+
+def _build_chart_f(df_forecast, bands):
+    """
+    Top countries by projected funding gap — 2026, among those more likely
+    than not to be neglected (HIGH_NEGLECT), colored by funding type.
+    """
+    df_2026 = _funding_frame(df_forecast[df_forecast['year'] == 2026], bands)
+    df_2026 = df_2026[df_2026['Neglect_Probability'] >= HIGH_NEGLECT]
 
     neg   = df_2026[df_2026['Predicted_Funding'] < 0].nlargest(8, 'Funding_Gap')
     pos   = df_2026[df_2026['Predicted_Funding'] > 0].nlargest(7, 'Funding_Gap')
     top15 = pd.concat([neg, pos]).sort_values('Funding_Gap', ascending=True)
+    return _build_gap_bars(top15, 'Projected Funding Gap by Country — 2026')
+
 
+def _build_gap_bars(top15, title):
+    """Horizontal funding-gap bars with 80% whiskers, one per row of `top15` (drawn bottom-up)."""
     cat_colors = {
         'Funding Collapse': '#ef4444',
         'No Coverage Data': '#475569',
         'Underfunded': '#f59e0b',
     }
     colors = [cat_colors[c] for c in top15['Funding_Category']]
+    # Rows from several years need the year to tell a country's bars apart
+    labels = top15['Country'] if top15['year'].nunique() <= 1 else \
+        top15['Country'] + ' ' + top15['year'].astype(str)
 
     hover = [
         (
@@ -41,20 +70,29 @@ def _build_chart_f(df_risk):
             f"Funding Gap: ${gap/1e9:.2f}B<br>"
             f"Projected Funding: {'–$'+f'{abs(fund)/1e6:.0f}M' if fund < 0 else '$'+f'{fund/1e6:.0f}M'}<br>"
             f"Requirements: ${req/1e6:.0f}M<br>"
+            f"80% range of gap: ${lo/1e9:.2f}B to ${hi/1e9:.2f}B<br>"
+            f"Probability of neglect: {prob:.0%}<br>"
             f"Status: {cat}"
         )
-        for country, gap, fund, req, cat in zip(
-            top15['Country'], top15['Funding_Gap'],
+        for country, gap, fund, req, cat, prob, lo, hi in zip(
+            labels, top15['Funding_Gap'],
             top15['Predicted_Funding'], top15['Predicted_Requirements'],
-            top15['Funding_Category'],
+            top15['Funding_Category'], top15['Neglect_Probability'].fillna(1.0),
+            top15['Gap_p10'].fillna(top15['Funding_Gap']), top15['Gap_p90'].fillna(top15['Funding_Gap']),
         )
     ]
 
     fig = go.Figure(go.Bar(
         x=top15['Funding_Gap'] / 1e9,
-        y=top15['Country'],
+        y=labels,
         orientation='h',
         marker=dict(color=colors, line=dict(width=0)),
+        error_x=dict(
+            type='data', symmetric=False,
+            array=(top15['Gap_p90'] - top15['Funding_Gap']).clip(lower=0).fillna(0) / 1e9,
+            arrayminus=(top15['Funding_Gap'] - top15['Gap_p10']).clip(lower=0).fillna(0) / 1e9,
+            color='rgba(226,232,240,0.35)', thickness=1, width=3,
+        ),
         hovertemplate='%{customdata}<extra></extra>',
         customdata=hover,
         showlegend=False,
@@ -67,7 +105,7 @@ def _build_chart_f(df_risk):
         ))
 
     layout = _chart_layout(
-        title='Projected Funding Gap by Country — 2026',
+        title=title,
         height=420,
         xaxis=dict(**_AXIS_BASE, title='Funding Gap (USD Billion)'),
         yaxis=dict(**{**_AXIS_BASE, 'tickfont': dict(family='Space Mono, monospace', color='#e2e8f0', size=12)}, title=''),
@@ -81,10 +119,8 @@ def _build_chart_f(df_risk):
     return fig
 
 
-def _build_chart_g(df_forecast):
-    """Funding trajectory 2026-2030 for selected high-risk countries."""
-    REQUIREMENTS_M = 567.35
-
+def _build_chart_g(df_forecast, bands):
+    """Funding trajectory 2026-2030 for selected high-risk countries, with 80% fan bands."""
     collapse_isos = (
         df_forecast[df_forecast['Predicted_Funding'] < 0]
         .groupby('iso3')['Predicted_Funding'].min()
@@ -97,7 +133,9 @@ def _build_chart_g(df_forecast):
     )
 
     selected = collapse_isos + positive_isos
-    df_sel   = df_forecast[df_forecast['iso3'].isin(selected)]
+    df_sel   = df_forecast[df_forecast['iso3'].isin(selected)].merge(
+        bands[['iso3', 'year', 'Funding_p10', 'Funding_p90']], on=['iso3', 'year'], how='left')
+    required = df_sel.groupby('year')['Predicted_Requirements'].mean() / 1e6
 
     palette_collapse = ['#ef4444', '#f97316', '#fb923c', '#fbbf24', '#a78bfa']
     palette_positive = ['#4ade80', '#34d399', '#38bdf8', '#60a5fa']
@@ -105,12 +143,12 @@ def _build_chart_g(df_forecast):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
-        x=[2026, 2027, 2028, 2029, 2030],
-        y=[REQUIREMENTS_M] * 5,
+        x=required.index,
+        y=required.values,
         mode='lines',
         name='Required (XGBoost)',
         line=dict(color='rgba(74,222,128,0.55)', width=2, dash='dot'),
-        hovertemplate='Requirements: $567M per country<extra></extra>',
+        hovertemplate='Year: %{x}<br>Avg. requirements of shown countries: $%{y:.0f}M<extra></extra>',
     ))
 
     fig.add_hline(
@@ -129,6 +167,13 @@ def _build_chart_g(df_forecast):
         is_collapse = iso3 in collapse_isos
         color      = palette_collapse[i] if is_collapse else palette_positive[i - len(collapse_isos)]
 
+        if sub['Funding_p10'].notna().all():
+            fig.add_trace(go.Scatter(
+                x=list(sub['year']) + list(sub['year'][::-1]),
+                y=list(sub['Funding_p90'] / 1e6) + list(sub['Funding_p10'][::-1] / 1e6),
+                fill='toself', fillcolor=_rgba(color, 0.1), line=dict(width=0),
+                hoverinfo='skip', showlegend=False,
+            ))
         fig.add_trace(go.Scatter(
             x=sub['year'],
             y=sub['Predicted_Funding'] / 1e6,
@@ -161,11 +206,184 @@ def _build_chart_g(df_forecast):
     return fig
 
 
+def _rgba(hex_color, alpha):
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgba({r},{g},{b},{alpha})'
+
+
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS, show_spinner=False)
+def get_forecast_figures(data_version=None):
+    """Charts F and G, built once from the cached loaders and shared across sessions."""
+    bands = get_uncertainty_bands()
+    return {
+        'f': _build_chart_f(load_forecast_data(), bands),
+        'g': _build_chart_g(load_forecast_data(), bands),
+    }
+
+
+@versioned
+@st.cache_resource(max_entries=KEEP_VERSIONS, show_spinner=False)
+def get_forecast_index(data_version=None):
+    """
+    Forecast country-years with their filter facets, and a BitmapIndex over
+    them (Funding_Gap and Neglect_Probability presorted). Shared read-only
+    across sessions.
+    """
+    df = _funding_frame(load_forecast_data(), get_uncertainty_bands())
+    df['Region'] = df['iso3'].map(ISO3_TO_REGION).fillna(OTHER_REGION)
+    band = np.digitize(df['Neglect_Probability'].fillna(1.0), NEGLECT_BANDS)
+    df['Neglect Probability'] = np.asarray(NEGLECT_LABELS)[band]
+    df['Year'] = df['year']
+    df['Funding Category'] = df['Funding_Category']
+    severity = load_country_metrics().set_index('Country ISO3')['Severity Quartile']
+    df['Severity Quartile'] = df['iso3'].map(severity).fillna('Not rated')
+    matrix_df = load_sector_matrix()
+    multi = {'Sector': {sector: df['iso3'].isin(group['Country ISO3']).to_numpy()
+                        for sector, group in matrix_df.groupby('Sector Name')}}
+    index = BitmapIndex(df, facets=FORECAST_FACETS[:-1], multi=multi, order_by=list(RANK_BY.values()))
+    return df, index
+
+
+@_fragment
+def _render_forecast_charts(figures):
+    df, index = get_forecast_index()
+    with st.expander('▸  FILTER COUNTRY-YEARS', expanded=False):
+        filters = filter_panel(index, 'forecast_filter', FORECAST_FACETS, ranges=('Year', 'Neglect Probability'))
+        rank_by = st.radio('Rank by', list(RANK_BY), horizontal=True, key='forecast_rank_by')
+    if any(filters.values()) or RANK_BY[rank_by] != 'Funding_Gap':
+        words = index.select(filters)
+        top15 = df.iloc[index.top(words, RANK_BY[rank_by], 15)[::-1]]
+        if top15.empty:
+            chart_caption('No forecast country-year matches these filters.')
+            return
+        fig_f = _build_gap_bars(top15, 'Projected Funding Gap — Filtered')
+        caption = (f'Top 15 of the {index.count(words)} country-years matching the filters, ordered by '
+                   f'{rank_by.lower()}; bars show the funding gap (USD billion). ')
+    else:
+        fig_f = figures['f']
+        caption = (f'Top 15 countries in 2026 with at least a {HIGH_NEGLECT:.0%} probability of neglect, '
+                   'ordered by funding gap (USD billion). ')
+
+    col_f, col_g = st.columns(2, gap='medium')
+    with col_f:
+        st.plotly_chart(fig_f, use_container_width=True, config={'displayModeBar': False})
+        chart_caption(
+            caption +
+            'Whiskers span the 80% Monte Carlo range of the gap; hover for the probability of neglect. '
+            'Red = Prophet modelled a declining/negative funding trend. '
+            'Amber = funding exists but is structurally insufficient. Hover for exact figures.'
+        )
+    with col_g:
+        st.plotly_chart(figures['g'], use_container_width=True, config={'displayModeBar': False})
+        chart_caption(
+            "Each line traces a country's projected funding (USD million) from 2026 to 2030. "
+            'Shaded fans are 80% Monte Carlo ranges; the dotted green line is the average XGBoost '
+            'requirement of the countries shown. '
+            'Red/orange lines are falling into negative territory — funding is evaporating. '
+            'Green/blue lines show positive but insufficient funding trends.'
+        )
+    _render_neglect_list(df, index, filters, rank_by)
+
+
+def _render_neglect_list(df, index, filters, rank_by):
+    """Country-years at or above HIGH_NEGLECT within the filters, ranked by `rank_by`."""
+    order = index.top(index.select(filters), RANK_BY[rank_by])
+    rows = df.iloc[order]
+    rows = rows[rows['Neglect_Probability'] >= HIGH_NEGLECT]
+    st.dataframe(
+        pd.DataFrame({
+            'Country': rows['Country'],
+            'Year': rows['year'],
+            'Neglect Probability': rows['Neglect_Probability'],
+            'Funding Gap ($M)': rows['Funding_Gap'] / 1e6,
+            'Gap p10 ($M)': rows['Gap_p10'] / 1e6,
+            'Gap p90 ($M)': rows['Gap_p90'] / 1e6,
+        }).head(50),
+        use_container_width=True, hide_index=True, height=320,
+        column_config={
+            'Neglect Probability': st.column_config.ProgressColumn(
+                'Neglect Probability', format='%.2f', min_value=0.0, max_value=1.0),
+            **{c: st.column_config.NumberColumn(c, format='%.0f')
+               for c in ('Funding Gap ($M)', 'Gap p10 ($M)', 'Gap p90 ($M)')},
+        },
+    )
+    chart_caption(
+        f'High-neglect list: {len(rows)} country-years with at least a {HIGH_NEGLECT:.0%} probability that '
+        f'requirements exceed {DEFAULT_THRESHOLD:.2f}× funding across the Monte Carlo draws, ranked by '
+        f'{rank_by.lower()} (top 50 shown).'
+    )
+
+
+# ── Scenario explorer ──────────────────────────────────────────────────────────
+
+def _scenario_card(col, label, value, sub, accent='74,222,128'):
+    col.markdown(
+        f'<div style="background:rgba(15,23,42,0.7);border:1px solid rgba(148,163,184,0.1);'
+        f'border-radius:6px;padding:1rem 1.2rem;border-left:2px solid rgba({accent},0.5);">'
+        f"<p style=\"color:#4ade80;font-family:'Space Mono', monospace;font-size:0.67rem;"
+        f'letter-spacing:0.15em;text-transform:uppercase;margin:0 0 0.35rem 0;">{label}</p>'
+        f'<p style="color:#ffffff;font-size:1.6rem;font-weight:300;margin:0 0 0.2rem 0;line-height:1.1;">{value}</p>'
+        f"<p style=\"color:#475569;font-size:0.76rem;margin:0;font-family:'Space Mono', monospace;\">{sub}</p>"
+        f'</div>',
+        unsafe_allow_html=True,
+    )
+
+
+@_fragment
+def _render_scenario_explorer():
+    c1, c2, c3 = st.columns(3, gap='medium')
+    funding_growth = c1.slider('Funding growth (% per year)', -50, 50, 0, step=1, key='sc_growth')
+    inflation = c2.slider('Requirement inflation (% per year)', -10, 30, 0, step=1, key='sc_inflation')
+    threshold = c3.slider('Risk threshold (requirements ÷ funding)', 1.0, 2.0, DEFAULT_THRESHOLD,
+                          step=0.05, key='sc_threshold')
+
+    shocks = {}
+    with st.expander('▸  DONOR SHOCK BY REGION — one-off change to projected funding', expanded=False):
+        cols = st.columns(len(REGIONS) // 2 + len(REGIONS) % 2)
+        for i, region in enumerate(REGIONS):
+            shocks[region] = cols[i % len(cols)].slider(
+                region, -100, 100, 0, step=5, format='%d%%', key=f'sc_shock_{i}') / 100
+
+    key = scenario_key(funding_growth / 100, inflation / 100, threshold, shocks)
+    result = run_scenario(key)
+    baseline = run_scenario(scenario_key())
+
+    delta = result['risk_instances'] - baseline['risk_instances']
+    k1, k2, k3, k4 = st.columns(4)
+    _scenario_card(k1, 'RISK INSTANCES', str(result['risk_instances']),
+                   f"{delta:+d} vs baseline" if delta else 'same as baseline',
+                   '239,68,68' if delta > 0 else '74,222,128')
+    _scenario_card(k2, 'HIGH-NEGLECT COUNTRIES', str(result['risk_countries']),
+                   f"baseline {baseline['risk_countries']}")
+    _scenario_card(k3, 'TOTAL GAP 2026–2030', f"${result['total_gap_bn']:.1f}B",
+                   f"baseline ${baseline['total_gap_bn']:.1f}B")
+    _scenario_card(k4, 'AVG FUNDING GAP 2026', f"${result['avg_gap_2026_bn']:.2f}B",
+                   'at-risk countries with a funding trend')
+
+    st.dataframe(
+        result['risk_list'].drop(columns=['iso3']).head(50),
+        use_container_width=True, hide_index=True, height=320,
+        column_config={
+            c: st.column_config.NumberColumn(c, format='%.0f')
+            for c in ('Requirements ($M)', 'Funding ($M)', 'Funding Gap ($M)')
+        },
+    )
+    chart_caption(
+        f"High-neglect list under this scenario: {result['risk_instances']} country-years where requirements "
+        f'exceed {threshold:.2f}× projected funding, largest gap first (top 50 shown). Growth and inflation '
+        'compound from 2026; regional shocks scale projected funding in every year.'
+    )
+
+
 # ── Page renderer ──────────────────────────────────────────────────────────────
 
 def render_forecast_page():
     df_forecast = load_forecast_data()
     df_risk     = load_high_risk_data()
+    figures     = get_forecast_figures()
+    bands       = get_uncertainty_bands()
+    risk_instances, risk_countries = len(df_risk), df_risk['iso3'].nunique()
 
     st.markdown(
         '<div style="padding:1.2rem 0 0.75rem 0;">'
@@ -178,8 +396,8 @@ def render_forecast_page():
         'A two-stage machine-learning pipeline &#8212; combining demographic trend modelling with '
         'time-series funding forecasts &#8212; to project where human need will outpace available '
         'resources over the next five years. Results surface '
-        '<span style="color:#e2e8f0;font-weight:500;">706 high-neglect-risk country-years</span> '
-        'where funding is on track to cover less than 85% of projected requirements.</p>'
+        f'<span style="color:#e2e8f0;font-weight:500;">{risk_instances} high-neglect-risk country-years</span> '
+        f'where funding is on track to cover less than {1 / DEFAULT_THRESHOLD:.0%} of projected requirements.</p>'
         '</div>'
         '<div style="border-top:1px solid rgba(148,163,184,0.1);margin:0.75rem 0 1.5rem 0;"></div>',
         unsafe_allow_html=True,
@@ -217,7 +435,7 @@ def render_forecast_page():
   <div class="stage s5">
     <p class="label l-green">04 &#8212; Forecast Output</p>
     <p class="title">2026&#8211;2030 Projections</p>
-    <p class="desc">Predicted In Need<br>Requirements (USD)<br>Funding Gap &middot; Risk Flag<br><span class="red">706 high-neglect instances</span></p>
+    <p class="desc">Predicted In Need<br>Requirements (USD)<br>Funding Gap &middot; Risk Flag<br><span class="red">{risk_instances} high-neglect instances</span></p>
   </div>
 </div>
 <p class="note">&#9672; &nbsp;<span>Top predictors (XGBoost feature importance):</span>&nbsp;
@@ -227,16 +445,15 @@ were the strongest drivers of financial requirements. Population Velocity had a
         components.html(pipeline_html, height=310, scrolling=False)
 
     total_countries  = df_forecast['iso3'].nunique()
-    high_risk_countries = df_risk['iso3'].nunique()
-    high_risk_instances = len(df_risk)
     df_risk_2026     = df_risk[df_risk['year'] == 2026]
     avg_gap_bn       = df_risk_2026[df_risk_2026['Predicted_Funding'] != 0]['Funding_Gap'].mean() / 1e9
+    expected_risk    = bands['Neglect_Probability'].sum()
 
     s1, s2, s3, s4 = st.columns(4)
     for col, label, value, sub in [
         (s1, 'COUNTRIES FORECASTED', str(total_countries), 'unique country projections'),
-        (s2, 'HIGH-NEGLECT COUNTRIES', str(high_risk_countries), 'flagged across all years'),
-        (s3, 'RISK INSTANCES', str(high_risk_instances), 'country-year gaps > 15%'),
+        (s2, 'HIGH-NEGLECT COUNTRIES', str(risk_countries), 'flagged across all years'),
+        (s3, 'RISK INSTANCES', str(risk_instances), f'{expected_risk:.0f} expected under uncertainty'),
         (s4, 'AVG FUNDING GAP 2026', f'${avg_gap_bn:.2f}B', 'among tracked countries'),
     ]:
         col.markdown(
@@ -259,22 +476,16 @@ were the strongest drivers of financial requirements. Population Velocity had a
         'historical trend has turned negative. The right chart shows how funding trajectories '
         'evolve from 2026 to 2030 against the flat requirements line, revealing diverging crises.',
     )
-    col_f, col_g = st.columns(2, gap='medium')
-    with col_f:
-        st.plotly_chart(_build_chart_f(df_risk), use_container_width=True, config={'displayModeBar': False})
-        chart_caption(
-            'Top 15 high-neglect-risk countries in 2026, ordered by funding gap (USD billion). '
-            'Red = Prophet modelled a declining/negative funding trend. '
-            'Amber = funding exists but is structurally insufficient. Hover for exact figures.'
-        )
-    with col_g:
-        st.plotly_chart(_build_chart_g(df_forecast), use_container_width=True, config={'displayModeBar': False})
-        chart_caption(
-            "Each line traces a country's projected funding (USD million) from 2026 to 2030. "
-            'The dotted green line marks the $567M requirements threshold. '
-            'Red/orange lines are falling into negative territory — funding is evaporating. '
-            'Green/blue lines show positive but insufficient funding trends.'
-        )
+    _render_forecast_charts(figures)
+
+    section_header(
+        'SCENARIO EXPLORER — WHAT IF?',
+        'How Would the Gap Move Under Different Assumptions?',
+        'Adjust annual funding growth, requirement inflation, the risk threshold or a regional donor shock. '
+        'Funding gaps, risk flags and the high-neglect list are recomputed across every forecast '
+        'country-year as you drag.',
+    )
+    _render_scenario_explorer()
 
     st.markdown(
         '<div style="border-top:1px solid rgba(148,163,184,0.1);margin-top:1.5rem;padding:1.5rem 0 0.5rem 0;">'
@@ -303,8 +514,9 @@ were the strongest drivers of financial requirements. Population Velocity had a
         "<p style=\"color:#f59e0b;font-family:'Space Mono', monospace;font-size:0.68rem;"
         'letter-spacing:0.1em;text-transform:uppercase;margin:0 0 0.5rem 0;">02 &#8212; Systemic Structural Gap</p>'
         '<p style="color:#94a3b8;font-size:0.9rem;line-height:1.7;margin:0;">'
-        '<span style="color:#e2e8f0;font-weight:500;">706 country-year instances</span> (across 141 countries) '
-        'show requirements exceeding 115% of projected funding. This is not isolated &#8212; it reflects a '
+        f'<span style="color:#e2e8f0;font-weight:500;">{risk_instances} country-year instances</span> '
+        f'(across {risk_countries} countries) show requirements exceeding {DEFAULT_THRESHOLD:.0%} of projected '
+        'funding. This is not isolated &#8212; it reflects a '
         'widening structural disconnect between demographic reality and international aid flows, '
         'concentrated in Sub-Saharan Africa and Central Asia.</p>'
         '</div>',
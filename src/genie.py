@@ -0,0 +1,214 @@
+"""
+Databricks AI/BI Genie API client.
+
+All calls run server-side in Python (no browser CORS). Opening questions are
+answered through a process-wide cache so repeated prompts — and the prompts
+pre-asked by the warm-up routine — do not wait on the Genie poll loop.
+"""
+
+import os
+import re
+import html as _h
+from pathlib import Path
+
+import streamlit as st
+
+from data_versions import versioned
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).parent.parent / ".env")
+except ImportError:
+    pass
+
+# ── Databricks Genie Configuration ────────────────────────────────────────────
+DATABRICKS_HOST  = os.environ.get("DATABRICKS_HOST", "")
+DATABRICKS_TOKEN = os.environ.get("DATABRICKS_TOKEN", "")
+GENIE_SPACE_ID   = os.environ.get("GENIE_SPACE_ID", "")
+
+# Cached opening answers expire so Genie's live data is re-queried periodically
+GENIE_CACHE_TTL = int(os.environ.get("GENIE_CACHE_TTL", 6 * 3600))
+
+# Seconds a user's question may wait on Genie, and the shorter bound for the
+# prompts pre-asked in the background (warm-up, re-warm after a data change)
+GENIE_TIMEOUT = float(os.environ.get("GENIE_TIMEOUT", 180))
+GENIE_PREFETCH_TIMEOUT = float(os.environ.get("GENIE_PREFETCH_TIMEOUT", 45))
+
+# Characters of each cached answer carried into a follow-up as context
+CONTEXT_CHARS = 1500
+
+# Suggested prompts shown as chips in the widget
+GENIE_PROMPTS = [
+    "Which regions are most underfunded?",
+    "Top crisis countries by severity",
+    "Funding gap forecast 2026",
+    "High neglect risk countries",
+]
+
+
+def genie_configured() -> bool:
+    return bool(DATABRICKS_HOST and DATABRICKS_TOKEN and GENIE_SPACE_ID)
+
+
+# ── Genie Python-side API helpers ─────────────────────────────────────────────
+
+def _genie_call(message: str, conversation_id, timeout=None):
+    """
+    Call the Databricks Genie API from Python (server-side, no CORS).
+    Gives up after `timeout` seconds (default GENIE_TIMEOUT).
+    Returns (response_html: str, conversation_id: str).
+    """
+    import requests as _rq, time as _t
+
+    if not genie_configured():
+        raise ValueError("Databricks credentials not configured. Check your .env file.")
+    timeout = GENIE_TIMEOUT if timeout is None else timeout
+    deadline = _t.monotonic() + timeout
+
+    hdrs = {
+        "Authorization": f"Bearer {DATABRICKS_TOKEN}",
+        "Content-Type": "application/json",
+    }
+    base = f"https://{DATABRICKS_HOST}/api/2.0/genie/spaces/{GENIE_SPACE_ID}"
+
+    if conversation_id is None:
+        # POST .../start-conversation → { conversation: {id}, message: {id, status} }
+        r = _rq.post(f"{base}/start-conversation", headers=hdrs,
+                     json={"content": message}, timeout=min(30, timeout))
+        r.raise_for_status()
+        d = r.json()
+        conversation_id = d["conversation"]["id"]
+        msg_id = d["message"]["id"]
+    else:
+        # POST .../conversations/{id}/messages → message object {id, status}
+        r = _rq.post(f"{base}/conversations/{conversation_id}/messages",
+                     headers=hdrs, json={"content": message}, timeout=min(30, timeout))
+        r.raise_for_status()
+        d = r.json()
+        msg_id = d["id"]
+
+    # Poll GET .../messages/{msg_id} until COMPLETED
+    poll_url = f"{base}/conversations/{conversation_id}/messages/{msg_id}"
+    while _t.monotonic() + 2 < deadline:
+        _t.sleep(2)
+        pr = _rq.get(poll_url, headers=hdrs, timeout=max(1.0, min(30, deadline - _t.monotonic())))
+        pr.raise_for_status()
+        m = pr.json()
+        if m["status"] == "COMPLETED":
+            return _parse_genie_resp(m), conversation_id
+        if m["status"] == "FAILED":
+            raise RuntimeError(m.get("error") or "Genie processing failed.")
+
+    raise TimeoutError(f"Genie timed out after {timeout:.0f} seconds. Please retry.")
+
+
+def _html_to_text(html_text: str) -> str:
+    text = re.sub(r"<br\s*/?>|</tr>|</p>|</div>", "\n", html_text)
+    text = re.sub(r"</t[dh]>", " | ", text)
+    return _h.unescape(re.sub(r"<[^>]+>", "", text)).strip()
+
+
+def with_context(message: str, answered) -> str:
+    """
+    `message` prefixed with earlier (question, answer HTML) pairs as plain text,
+    so a new conversation can follow up on answers served from the cache.
+    """
+    if not answered:
+        return message
+    lines = ["Earlier in this chat I asked the following and got these answers:"]
+    for question, answer_html in answered:
+        answer = _html_to_text(answer_html)
+        if len(answer) > CONTEXT_CHARS:
+            answer = answer[:CONTEXT_CHARS].rstrip() + " …"
+        lines += [f"Q: {question}", f"A: {answer}"]
+    lines += ["", f"Follow-up question: {message}"]
+    return "\n".join(lines)
+
+
+def _parse_genie_resp(msg: dict) -> str:
+    """Convert a COMPLETED Genie message's attachments into display HTML."""
+    attachments = msg.get("attachments") or []
+    if not attachments:
+        return ("I analyzed your query but found no results. "
+                "Try asking about a specific country, sector, or funding metric.")
+
+    parts = []
+    for att in attachments:
+        # ── Text answer ──────────────────────────────────────────────────────
+        text_content = (att.get("text") or {}).get("content")
+        if text_content:
+            parts.append(_h.escape(text_content).replace("\n", "<br>"))
+
+        # ── Generated SQL / query description ────────────────────────────────
+        query = att.get("query") or {}
+        if query.get("description"):
+            parts.append(f'<em>&#128202;&nbsp;{_h.escape(query["description"])}</em>')
+        if query.get("query"):
+            parts.append(f'<div class="sqlblk">{_h.escape(query["query"])}</div>')
+
+        # ── Table data ────────────────────────────────────────────────────────
+        table = att.get("table")
+        if table:
+            tbl_html = _table_to_html(table)
+            if tbl_html:
+                parts.append(tbl_html)
+
+    return "<br>".join(parts) if parts else "Analysis complete."
+
+
+def _table_to_html(tbl) -> str:
+    """Render a Genie table attachment as a styled HTML table."""
+    try:
+        cols = tbl.get("columns") or []
+        rows = tbl.get("rows") or []
+        if not cols or not rows:
+            return ""
+
+        col_names = [
+            c.get("name", str(c)) if isinstance(c, dict) else str(c)
+            for c in cols
+        ]
+        th = "".join(f"<th>{_h.escape(n)}</th>" for n in col_names)
+
+        tbody = []
+        for row in rows[:25]:
+            if isinstance(row, dict):
+                vals = row.get("values") or list(row.values())
+            else:
+                vals = list(row) if hasattr(row, "__iter__") else [str(row)]
+            td = "".join(
+                f"<td>{_h.escape(str(v)) if v is not None else ''}</td>"
+                for v in vals
+            )
+            tbody.append(f"<tr>{td}</tr>")
+
+        if len(rows) > 25:
+            tbody.append(
+                f'<tr><td colspan="{len(col_names)}" '
+                f'style="color:#64748b;text-align:center;font-size:0.68rem;">'
+                f"&hellip;&nbsp;{len(rows) - 25} more rows</td></tr>"
+            )
+
+        return (
+            '<div class="genie-tbl-wrap">'
+            '<table class="genie-tbl">'
+            f"<thead><tr>{th}</tr></thead>"
+            f"<tbody>{''.join(tbody)}</tbody>"
+            "</table></div>"
+        )
+    except Exception:
+        return ""
+
+
+@versioned
+@st.cache_data(ttl=GENIE_CACHE_TTL, show_spinner=False)
+def cached_genie_answer(question: str, _timeout=None, data_version=None) -> str:
+    """
+    Answer an opening question in a fresh Genie conversation and cache the HTML.
+    Errors (timeouts included) are not cached, so a failed call is retried on
+    the next ask. `_timeout` is not part of the cache key. The conversation id
+    is discarded: cached answers are shared across sessions, and a session's
+    first follow-up carries them as context text (`with_context`).
+    """
+    resp_html, _ = _genie_call(question, None, timeout=_timeout)
+    return resp_html
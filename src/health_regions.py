@@ -1,10 +1,16 @@
 import os
 
+import numpy as np
 import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 
-from styles import get_globe_button_css
+from data_versions import KEEP_VERSIONS, versioned
+from shared_tables import shared_table
+from styles import get_globe_button_css, get_theme_colors
+from utils import load_year_cubes, year_metrics
+from validation import clean_table
+from year_cubes import SEVERITY_LABELS, year_index
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 
@@ -37,6 +43,9 @@ _ISO3_COORDS = {
 _SEVERITY_NUM = {'Critical': 5, 'High': 4, 'Medium': 3, 'Low': 2}
 _SEVERITY_COLORS = {5: '#ef4444', 4: '#f59e0b', 3: '#3b82f6', 2: '#4ade80'}
 
+# Plan years the globe is cached for per theme (the year slider's range)
+_GLOBE_YEARS = 32
+
 
 def _infer_quartile(severity_score: float) -> str:
     """Assign severity quartile from the raw severity score for rows where
@@ -56,9 +65,11 @@ def _fmt_millions(n: float) -> str:
     return f"{n / 1e3:.0f}K"
 
 
-@st.cache_data
-def generate_sample_entities() -> pd.DataFrame:
-    summary  = pd.read_csv(os.path.join(DATA_DIR, 'country_level_summary (1).csv'))
+@shared_table('crisis_entities')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def generate_sample_entities(data_version=None) -> pd.DataFrame:
+    summary  = clean_table('country_summary')
     metrics  = pd.read_csv(os.path.join(DATA_DIR, 'humanitarian_analysis_country_metrics.csv'))
 
     # Keep only the columns we need from metrics
@@ -151,9 +162,43 @@ def create_home_globe_html():
 </html>"""
 
 
-def create_globe_html(theme_colors):
+def year_entities(year) -> pd.DataFrame:
+    """
+    The crisis regions with a plan in `year`, with that year's severity
+    quartile and Mismatch Score (people in need and coverage stay current).
+    Regions without a row in the metrics table are placed against the year's
+    quartiles by the summary's In Need / Total_Population (inferred from the
+    severity score without a population) and keep their snapshot Mismatch Score.
+    """
+    cubes = load_year_cubes()
+    planned = cubes['iso3'][cubes['planned'][year_index(cubes, year)]]
+    metrics = year_metrics(year).set_index('Country ISO3')
+    df = generate_sample_entities()
+    df = df[df['iso3'].isin(planned)].copy()
+
+    summary = clean_table('country_summary').set_index('Country ISO3').reindex(df['iso3'])
+    prevalence = (summary['In Need'] / summary['Total_Population']).to_numpy(dtype=float)
+    inferred = [_infer_quartile(float(score)) for score in summary['Severity_Score']]
+    if len(metrics):
+        q = metrics['Need Prevalence'].quantile([0.25, 0.5, 0.75]).to_numpy()
+        placed = SEVERITY_LABELS[(prevalence[:, None] > q).sum(axis=1)]
+        inferred = np.where(np.isnan(prevalence), inferred, placed)
+    df['sev_label'] = df['iso3'].map(metrics['Severity Quartile']).fillna(pd.Series(inferred, index=df.index))
+    df['severity'] = df['sev_label'].map(_SEVERITY_NUM)
+    df['hvi'] = df['iso3'].map(metrics['Mismatch Score']).fillna(df['hvi']).round(2)
+    return df.sort_values(['severity', 'name'], ascending=[False, True]).reset_index(drop=True)
+
+
+@versioned
+@st.cache_data(max_entries=2 * (_GLOBE_YEARS + 1) * KEEP_VERSIONS, show_spinner=False)
+def get_globe_html(theme: str, year=None, data_version=None) -> str:
+    """Crisis globe HTML for a theme name and plan year (None: latest), generated once per process."""
+    return create_globe_html(get_theme_colors(theme), year)
+
+
+def create_globe_html(theme_colors, year=None):
     """Crisis globe with real humanitarian data, pulsing markers, region controls."""
-    entities   = generate_sample_entities()
+    entities   = generate_sample_entities() if year is None else year_entities(year)
     button_css = get_globe_button_css(theme_colors)
 
     js_data = ",\n      ".join(
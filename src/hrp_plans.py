@@ -0,0 +1,146 @@
+"""
+Humanitarian Response Plan parser and requirement allocation.
+
+humanitarian-response-plans.csv holds one row per plan, with `locations` and
+`years` as pipe-delimited lists ("JOR | TUR | LBN"). The notebook merged on
+the raw string, so regional plans either missed the country summary or were
+attributed wholesale to one member by `clean_iso3`. Here plans are exploded
+with vectorized split/explode into (plan, iso3, year) rows, each plan's
+requirements are allocated across its countries and years, and the rows sum
+into a clean country-year index:
+
+    allocated = requirements × country weight × 1 / n_years
+
+    weighting='equal'        1 / n_countries
+    weighting='population'   COD-PS admin0 total population share (countries
+                             without a figure take the plan's mean)
+
+    python src/hrp_plans.py --weighting population --out index.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+PLANS_PATH = os.path.join(DATA_DIR, 'humanitarian-response-plans.csv')
+POPULATION_PATH = os.path.join(DATA_DIR, 'cod_population_admin0.csv')
+
+WEIGHTINGS = ('equal', 'population')
+AMOUNT_COLS = ['origRequirements', 'revisedRequirements']
+
+
+def load_plans(path=PLANS_PATH) -> pd.DataFrame:
+    """Plans as published (HXL tag row dropped), one row per plan."""
+    plans = pd.read_csv(path, skiprows=[1])
+    for col in AMOUNT_COLS:
+        plans[col] = pd.to_numeric(plans[col], errors='coerce')
+    return plans
+
+
+def population_weights(path=POPULATION_PATH) -> pd.Series:
+    """Latest COD-PS total population (T_TL) per ISO3."""
+    pop = pd.read_csv(path, encoding='utf-8-sig',
+                      usecols=['ISO3', 'Population_group', 'Population', 'Reference_year'])
+    total = pop[pop['Population_group'] == 'T_TL'].sort_values('Reference_year', kind='stable')
+    total = total.drop_duplicates('ISO3', keep='last')
+    return pd.Series(pd.to_numeric(total['Population'], errors='coerce').to_numpy(),
+                     index=total['ISO3'].to_numpy(), name='Population')
+
+
+def location_counts(locations) -> pd.Series:
+    """Number of country codes in each pipe-delimited location string."""
+    return locations.astype('string').str.count(r'[^|\s]+').fillna(0).astype(int)
+
+
+def _explode_tokens(df, col, pattern) -> pd.DataFrame:
+    """One row per token of `col`; numeric columns are already one value per row."""
+    if not pd.api.types.is_numeric_dtype(df[col]):
+        df = df.assign(**{col: df[col].astype(object).str.findall(pattern)}).explode(col)
+    return df[df[col].notna()]
+
+
+def explode_plans(plans) -> pd.DataFrame:
+    """(plan, iso3, year) rows with the plan's country and year counts."""
+    rows = plans[['code', 'locations', 'years'] + AMOUNT_COLS].copy()
+    rows['plan_row'] = np.arange(len(rows))
+    rows = _explode_tokens(rows, 'locations', r'[^|\s]+')
+    rows = _explode_tokens(rows, 'years', r'\d{4}')
+    rows = rows.rename(columns={'locations': 'iso3', 'years': 'year'})
+    rows['year'] = rows['year'].astype(int)
+    rows = rows.drop_duplicates(['plan_row', 'iso3', 'year']).reset_index(drop=True)
+
+    plan_row = rows['plan_row'].to_numpy()
+    rows['n_countries'] = rows.groupby(['plan_row', 'year'])['iso3'].transform('size')
+    plan_years = rows[['plan_row', 'year']].drop_duplicates()['plan_row'].to_numpy()
+    rows['n_years'] = np.bincount(plan_years, minlength=len(plans))[plan_row]
+    return rows
+
+
+def allocation_weights(rows, weighting='equal', population=None) -> np.ndarray:
+    """Each row's share of its plan (shares sum to 1 per plan)."""
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"unknown weighting {weighting!r}; expected one of {', '.join(WEIGHTINGS)}")
+    country_share = 1.0 / rows['n_countries'].to_numpy(dtype=float)
+    if weighting == 'population':
+        population = population_weights() if population is None else population
+        pop = rows['iso3'].map(population).astype(float)
+        pop = pop.fillna(pop.groupby(rows['plan_row']).transform('mean'))
+        # Plans with no population figures at all fall back to equal shares
+        per_year = pop.groupby([rows['plan_row'], rows['year']]).transform('sum')
+        country_share = np.where(per_year > 0, (pop / per_year).to_numpy(), country_share)
+    return country_share / rows['n_years'].to_numpy(dtype=float)
+
+
+def allocate_requirements(plans, weighting='equal', population=None) -> pd.DataFrame:
+    """Exploded plan rows with requirements split by `weighting`."""
+    rows = explode_plans(plans)
+    rows['weight'] = allocation_weights(rows, weighting, population)
+    for col in AMOUNT_COLS:
+        rows[col] = rows[col] * rows['weight']
+    return rows
+
+
+def country_year_requirements(allocated) -> pd.DataFrame:
+    """
+    Clean iso3 × year index: allocated requirements summed over plans, the
+    number of contributing plans and the share that came from regional plans.
+    """
+    regional = allocated['n_countries'] > 1
+    frame = allocated.assign(regional_requirements=allocated['revisedRequirements'].where(regional, 0.0))
+    grouped = frame.groupby(['iso3', 'year'])
+    index = grouped[AMOUNT_COLS + ['regional_requirements']].sum(min_count=1)
+    index['n_plans'] = grouped['plan_row'].nunique()
+    index = index.reset_index()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index['regional_share'] = (index.pop('regional_requirements').fillna(0.0)
+                                   / index['revisedRequirements']).fillna(0.0)
+    return index
+
+
+def prefer_national(df, location_col='iso3_original', keys=('iso3', 'year')) -> pd.DataFrame:
+    """
+    One row per `keys`, keeping the row whose plan covers the fewest countries,
+    so a country's own plan wins over a regional plan it happens to close.
+    Original row order and index are kept.
+    """
+    if location_col not in df.columns:
+        return df.drop_duplicates(subset=list(keys), keep='first')
+    order = np.argsort(location_counts(df[location_col]).to_numpy(), kind='stable')
+    first = ~df.iloc[order].duplicated(subset=list(keys)).to_numpy()
+    return df.iloc[np.sort(order[first])]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='HRP plan parser and requirement allocation.')
+    parser.add_argument('--weighting', choices=WEIGHTINGS, default='equal')
+    parser.add_argument('--out', help='write the country-year index to this CSV')
+    args = parser.parse_args()
+
+    index = country_year_requirements(allocate_requirements(load_plans(), args.weighting))
+    if args.out:
+        index.to_csv(args.out, index=False)
+    print(index.tail(10).to_string(index=False))
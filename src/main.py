@@ -1,29 +1,15 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import numpy as np
-import os
 import json
+import os
 import html as _h
-import base64
-from pathlib import Path
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv(Path(__file__).parent.parent / ".env")
-except ImportError:
-    pass
-
-from styles import get_theme_colors, get_main_css, get_nav_css
-from analytics_page import render_analytics_page
-from forecast_page import render_forecast_page
-from about_page import render_about_page
-from health_regions import generate_sample_entities, create_globe_html, create_home_globe_html
-
-# ── Databricks Genie Configuration ────────────────────────────────────────────
-DATABRICKS_HOST  = os.environ.get("DATABRICKS_HOST", "")
-DATABRICKS_TOKEN = os.environ.get("DATABRICKS_TOKEN", "")
-GENIE_SPACE_ID   = os.environ.get("GENIE_SPACE_ID", "")
+
+from styles import get_theme_colors, get_theme_head_html
+from genie import GENIE_PROMPTS, _genie_call, cached_genie_answer, with_context
+
+# Page modules (and with them Plotly and the data loaders) are imported inside
+# the functions that render them, so a cold start only pays for the home page.
+# Run `python profile_startup.py` to see the import-time breakdown.
 
 # ── Page configuration ────────────────────────────────────────────────────────
 st.set_page_config(
@@ -39,134 +25,25 @@ if 'current_page' not in st.session_state:
 if 'theme' not in st.session_state:
     st.session_state.theme = 'dark'
 
-# Apply theme CSS (re-evaluated on every rerun so theme changes take effect)
+# Link the compiled theme stylesheet; only the theme marker changes between reruns
 theme_colors = get_theme_colors(st.session_state.theme)
-st.markdown(get_main_css(theme_colors), unsafe_allow_html=True)
-
+st.markdown(get_theme_head_html(st.session_state.theme), unsafe_allow_html=True)
 
+# Cache warm-up and the data watcher are started by `serve.py` at server boot.
+# Warm-up imports every page (and Plotly), so the app only starts them itself
+# when asked to (H2C2_BACKGROUND=1 under plain `streamlit run`); otherwise the
+# cold start stays the home page's own imports.
+def _start_background():
+    if os.environ.get('H2C2_BACKGROUND', '0') != '1':
+        return
+    from warmup import start_warmup
+    from data_watch import start_watcher
 
-# ── Genie Python-side API helpers ─────────────────────────────────────────────
+    start_warmup()
+    start_watcher()
 
-def _genie_call(message: str, conversation_id):
-    """
-    Call the Databricks Genie API from Python (server-side, no CORS).
-    Returns (response_html: str, conversation_id: str).
-    """
-    import requests as _rq, time as _t
 
-    if not DATABRICKS_HOST or not DATABRICKS_TOKEN or not GENIE_SPACE_ID:
-        raise ValueError("Databricks credentials not configured. Check your .env file.")
-
-    hdrs = {
-        "Authorization": f"Bearer {DATABRICKS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    base = f"https://{DATABRICKS_HOST}/api/2.0/genie/spaces/{GENIE_SPACE_ID}"
-
-    if conversation_id is None:
-        # POST .../start-conversation → { conversation: {id}, message: {id, status} }
-        r = _rq.post(f"{base}/start-conversation", headers=hdrs,
-                     json={"content": message}, timeout=30)
-        r.raise_for_status()
-        d = r.json()
-        conversation_id = d["conversation"]["id"]
-        msg_id = d["message"]["id"]
-    else:
-        # POST .../conversations/{id}/messages → message object {id, status}
-        r = _rq.post(f"{base}/conversations/{conversation_id}/messages",
-                     headers=hdrs, json={"content": message}, timeout=30)
-        r.raise_for_status()
-        d = r.json()
-        msg_id = d["id"]
-
-    # Poll GET .../messages/{msg_id} until COMPLETED
-    poll_url = f"{base}/conversations/{conversation_id}/messages/{msg_id}"
-    for _ in range(90):
-        _t.sleep(2)
-        pr = _rq.get(poll_url, headers=hdrs, timeout=30)
-        pr.raise_for_status()
-        m = pr.json()
-        if m["status"] == "COMPLETED":
-            return _parse_genie_resp(m), conversation_id
-        if m["status"] == "FAILED":
-            raise RuntimeError(m.get("error") or "Genie processing failed.")
-
-    raise TimeoutError("Genie timed out after 3 minutes. Please retry.")
-
-
-def _parse_genie_resp(msg: dict) -> str:
-    """Convert a COMPLETED Genie message's attachments into display HTML."""
-    attachments = msg.get("attachments") or []
-    if not attachments:
-        return ("I analyzed your query but found no results. "
-                "Try asking about a specific country, sector, or funding metric.")
-
-    parts = []
-    for att in attachments:
-        # ── Text answer ──────────────────────────────────────────────────────
-        text_content = (att.get("text") or {}).get("content")
-        if text_content:
-            parts.append(_h.escape(text_content).replace("\n", "<br>"))
-
-        # ── Generated SQL / query description ────────────────────────────────
-        query = att.get("query") or {}
-        if query.get("description"):
-            parts.append(f'<em>&#128202;&nbsp;{_h.escape(query["description"])}</em>')
-        if query.get("query"):
-            parts.append(f'<div class="sqlblk">{_h.escape(query["query"])}</div>')
-
-        # ── Table data ────────────────────────────────────────────────────────
-        table = att.get("table")
-        if table:
-            tbl_html = _table_to_html(table)
-            if tbl_html:
-                parts.append(tbl_html)
-
-    return "<br>".join(parts) if parts else "Analysis complete."
-
-
-def _table_to_html(tbl) -> str:
-    """Render a Genie table attachment as a styled HTML table."""
-    try:
-        cols = tbl.get("columns") or []
-        rows = tbl.get("rows") or []
-        if not cols or not rows:
-            return ""
-
-        col_names = [
-            c.get("name", str(c)) if isinstance(c, dict) else str(c)
-            for c in cols
-        ]
-        th = "".join(f"<th>{_h.escape(n)}</th>" for n in col_names)
-
-        tbody = []
-        for row in rows[:25]:
-            if isinstance(row, dict):
-                vals = row.get("values") or list(row.values())
-            else:
-                vals = list(row) if hasattr(row, "__iter__") else [str(row)]
-            td = "".join(
-                f"<td>{_h.escape(str(v)) if v is not None else ''}</td>"
-                for v in vals
-            )
-            tbody.append(f"<tr>{td}</tr>")
-
-        if len(rows) > 25:
-            tbody.append(
-                f'<tr><td colspan="{len(col_names)}" '
-                f'style="color:#64748b;text-align:center;font-size:0.68rem;">'
-                f"&hellip;&nbsp;{len(rows) - 25} more rows</td></tr>"
-            )
-
-        return (
-            '<div class="genie-tbl-wrap">'
-            '<table class="genie-tbl">'
-            f"<thead><tr>{th}</tr></thead>"
-            f"<tbody>{''.join(tbody)}</tbody>"
-            "</table></div>"
-        )
-    except Exception:
-        return ""
+_start_background()
 
 
 # ── Genie Chatbot Widget ──────────────────────────────────────────────────────
@@ -184,6 +61,9 @@ def render_genie_chatbot():
         st.session_state.genie_history = []
     if "genie_conv_id" not in st.session_state:
         st.session_state.genie_conv_id = None
+    if "genie_cached_answers" not in st.session_state:
+        # (question, answer) pairs served from the cache, outside this session's conversation
+        st.session_state.genie_cached_answers = []
 
     # ── Process any pending message (blocking Python API call, no CORS) ──────
     pending = st.session_state.pop("genie_pending_msg", None)
@@ -194,8 +74,18 @@ def render_genie_chatbot():
             "err": False,
         })
         try:
-            resp_html, conv_id = _genie_call(pending, st.session_state.genie_conv_id)
-            st.session_state.genie_conv_id = conv_id
+            if st.session_state.genie_conv_id is None and pending in GENIE_PROMPTS:
+                # Suggested opening prompts are answered from the shared cache
+                resp_html = cached_genie_answer(pending)
+                st.session_state.genie_cached_answers.append((pending, resp_html))
+            else:
+                message = pending
+                if st.session_state.genie_conv_id is None:
+                    # First follow-up: one call, with the cached Q/A as context text
+                    message = with_context(pending, st.session_state.genie_cached_answers)
+                resp_html, conv_id = _genie_call(message, st.session_state.genie_conv_id)
+                st.session_state.genie_conv_id = conv_id
+                st.session_state.genie_cached_answers = []
             st.session_state.genie_history.append(
                 {"role": "bot", "html": resp_html, "err": False}
             )
@@ -208,19 +98,6 @@ def render_genie_chatbot():
 
     # ── Hidden Streamlit form (offscreen via CSS) ─────────────────────────────
     # JS finds this input by placeholder and triggers it when the user sends.
-    st.markdown("""
-<style>
-[data-testid="stForm"]:has(input[placeholder="__genie__"]) {
-    position:fixed!important;left:-9999px!important;top:0!important;
-    width:1px!important;height:1px!important;overflow:hidden!important;
-    opacity:0!important;
-}
-[data-testid="stForm"]:has(input[placeholder="__genie__"]) button,
-[data-testid="stForm"]:has(input[placeholder="__genie__"]) input {
-    pointer-events:auto!important;
-}
-</style>""", unsafe_allow_html=True)
-
     with st.form("__genie_capture__", clear_on_submit=True):
         captured = st.text_input(
             "genie", placeholder="__genie__",
@@ -246,161 +123,6 @@ def render_genie_chatbot():
             f"</div>"
         )
 
-    # ── CSS ───────────────────────────────────────────────────────────────────
-    css_str = """
-  #genie-widget {
-    position: fixed;
-    bottom: 28px;
-    right: 28px;
-    z-index: 2147483647;
-    font-family: 'Space Mono', monospace;
-  }
-  #genie-toggle {
-    display: flex;
-    align-items: center;
-    gap: 10px;
-    background: linear-gradient(135deg, #0d1f0d 0%, #0a1a1f 100%);
-    border: 1.5px solid rgba(74,222,128,0.65);
-    border-radius: 34px;
-    padding: 14px 24px 14px 18px;
-    cursor: pointer;
-    color: #4ade80;
-    font-size: 0.9rem;
-    font-weight: 700;
-    letter-spacing: 0.13em;
-    text-transform: uppercase;
-    box-shadow: 0 0 28px rgba(74,222,128,0.25), 0 6px 28px rgba(0,0,0,0.7);
-    transition: all 0.25s ease;
-    user-select: none;
-    outline: none;
-  }
-  #genie-toggle:hover {
-    background: linear-gradient(135deg, #0f2a0f 0%, #0a2030 100%);
-    border-color: rgba(74,222,128,0.9);
-    box-shadow: 0 0 40px rgba(74,222,128,0.38), 0 8px 36px rgba(0,0,0,0.8);
-    transform: translateY(-2px);
-  }
-  .genie-btn-dot {
-    width: 10px; height: 10px; background: #4ade80; border-radius: 50%;
-    box-shadow: 0 0 9px #4ade80; animation: gpulse 2s infinite; flex-shrink: 0;
-  }
-  @keyframes gpulse {
-    0%, 100% { opacity: 1; transform: scale(1); }
-    50%       { opacity: 0.45; transform: scale(0.72); }
-  }
-  #genie-panel {
-    display: none; flex-direction: column;
-    width: 490px; height: 590px;
-    background: rgba(10,14,26,0.98);
-    border: 1px solid rgba(74,222,128,0.32); border-radius: 18px;
-    overflow: hidden;
-    box-shadow: 0 0 52px rgba(74,222,128,0.15), 0 28px 72px rgba(0,0,0,0.88);
-    margin-bottom: 16px; animation: gslide 0.28s ease; position: relative;
-  }
-  #genie-panel.open { display: flex; }
-  @keyframes gslide {
-    from { opacity: 0; transform: translateY(22px); }
-    to   { opacity: 1; transform: translateY(0); }
-  }
-  #genie-header {
-    display: flex; align-items: center; justify-content: space-between;
-    padding: 17px 19px 15px;
-    background: linear-gradient(135deg, rgba(13,20,36,0.99) 0%, rgba(10,26,20,0.99) 100%);
-    border-bottom: 1px solid rgba(74,222,128,0.18); flex-shrink: 0;
-  }
-  .ghdr-left { display: flex; align-items: center; gap: 12px; }
-  .gavatar {
-    width: 38px; height: 38px;
-    background: linear-gradient(135deg, #0d3321, #0a2030);
-    border: 1px solid rgba(74,222,128,0.55); border-radius: 10px;
-    display: flex; align-items: center; justify-content: center;
-    font-size: 19px; box-shadow: 0 0 14px rgba(74,222,128,0.24); flex-shrink: 0;
-  }
-  .gtname { color: #e2e8f0; font-size: 0.9rem; font-weight: 700; letter-spacing: 0.1em; display: block; }
-  .gtsub  { color: #4ade80; font-size: 0.68rem; letter-spacing: 0.07em; opacity: 0.82; display: block; margin-top: 1px; }
-  .ghdr-status { width: 8px; height: 8px; background: #4ade80; border-radius: 50%; box-shadow: 0 0 8px #4ade80; animation: gpulse 2s infinite; }
-  #genie-closebtn {
-    background: none; border: none; color: #475569; cursor: pointer;
-    font-size: 1.18rem; padding: 3px 7px; border-radius: 5px; line-height: 1;
-    transition: color 0.2s; outline: none; margin-left: 8px;
-  }
-  #genie-closebtn:hover { color: #e2e8f0; }
-  #genie-prompts {
-    display: flex; flex-wrap: wrap; gap: 7px; padding: 12px 17px;
-    border-bottom: 1px solid rgba(148,163,184,0.07); flex-shrink: 0;
-  }
-  .gchip {
-    background: rgba(74,222,128,0.07); border: 1px solid rgba(74,222,128,0.22);
-    border-radius: 22px; padding: 5px 12px; font-size: 0.67rem; color: #94a3b8;
-    cursor: pointer; letter-spacing: 0.04em; transition: all 0.2s; white-space: nowrap;
-    font-family: 'Space Mono', monospace;
-  }
-  .gchip:hover { background: rgba(74,222,128,0.15); border-color: rgba(74,222,128,0.52); color: #4ade80; }
-  #genie-messages {
-    flex: 1; overflow-y: auto; padding: 17px;
-    display: flex; flex-direction: column; gap: 14px;
-    scrollbar-width: thin; scrollbar-color: rgba(74,222,128,0.18) transparent;
-  }
-  #genie-messages::-webkit-scrollbar { width: 4px; }
-  #genie-messages::-webkit-scrollbar-track { background: transparent; }
-  #genie-messages::-webkit-scrollbar-thumb { background: rgba(74,222,128,0.2); border-radius: 2px; }
-  .gmsg { display: flex; gap: 9px; max-width: 93%; }
-  .gmsg.user { align-self: flex-end; flex-direction: row-reverse; }
-  .gmsg.bot  { align-self: flex-start; }
-  .gmsg-ico {
-    width: 27px; height: 27px; border-radius: 7px; flex-shrink: 0;
-    display: flex; align-items: center; justify-content: center;
-    font-size: 13px; margin-top: 2px;
-  }
-  .gmsg.bot  .gmsg-ico { background: linear-gradient(135deg,#0d3321,#0a2030); border: 1px solid rgba(74,222,128,0.38); color: #4ade80; }
-  .gmsg.user .gmsg-ico { background: rgba(74,222,128,0.13); border: 1px solid rgba(74,222,128,0.32); color: #4ade80; }
-  .gbubble { padding: 10px 14px; border-radius: 11px; font-size: 0.82rem; line-height: 1.58; max-width: 100%; word-break: break-word; }
-  .gmsg.bot  .gbubble { background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.12); color: #cbd5e1; }
-  .gmsg.user .gbubble { background: rgba(74,222,128,0.12); border: 1px solid rgba(74,222,128,0.26); color: #e2e8f0; }
-  .gbubble em { color: #4ade80; font-style: normal; font-size: 0.74rem; }
-  .gbubble .sqlblk {
-    background: rgba(0,0,0,0.45); border: 1px solid rgba(74,222,128,0.16); border-radius: 7px;
-    padding: 7px 10px; font-size: 0.71rem; color: #86efac; margin-top: 7px;
-    font-family: 'Space Mono', monospace; overflow-x: auto; white-space: pre-wrap;
-  }
-  .gbubble.gerr { background: rgba(239,68,68,0.1); border: 1px solid rgba(239,68,68,0.28); color: #fca5a5; }
-  .genie-tbl-wrap { overflow-x: auto; margin-top: 8px; border-radius: 7px; }
-  .genie-tbl { width: 100%; border-collapse: collapse; font-size: 0.72rem; }
-  .genie-tbl th { background: rgba(74,222,128,0.1); color: #4ade80; padding: 5px 9px; text-align: left; border-bottom: 1px solid rgba(74,222,128,0.2); white-space: nowrap; }
-  .genie-tbl td { color: #94a3b8; padding: 4px 9px; border-bottom: 1px solid rgba(148,163,184,0.07); }
-  .genie-tbl tr:hover td { background: rgba(74,222,128,0.04); }
-  #genie-typing { display: none; align-self: flex-start; align-items: center; gap: 9px; padding: 0 2px; }
-  #genie-typing.on { display: flex; }
-  .gdots { display: flex; gap: 5px; background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.12); border-radius: 11px; padding: 10px 15px; }
-  .gdot { width: 6px; height: 6px; background: #4ade80; border-radius: 50%; animation: gbounce 1.2s infinite; }
-  .gdot:nth-child(2) { animation-delay: 0.22s; }
-  .gdot:nth-child(3) { animation-delay: 0.44s; }
-  @keyframes gbounce {
-    0%,80%,100% { transform: translateY(0); opacity: 0.32; }
-    40%          { transform: translateY(-7px); opacity: 1; }
-  }
-  #genie-inputrow {
-    display: flex; align-items: center; gap: 9px; padding: 14px 17px;
-    border-top: 1px solid rgba(74,222,128,0.14); background: rgba(8,12,22,0.97); flex-shrink: 0;
-  }
-  #genie-input {
-    flex: 1; background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.23);
-    border-radius: 9px; padding: 10px 14px; color: #e2e8f0; font-size: 0.82rem;
-    font-family: 'Space Mono', monospace; outline: none; transition: border-color 0.2s;
-  }
-  #genie-input:focus { border-color: rgba(74,222,128,0.58); }
-  #genie-input::placeholder { color: #475569; }
-  #genie-input:disabled { opacity: 0.5; }
-  #genie-sendbtn {
-    width: 40px; height: 40px; background: linear-gradient(135deg, #166534, #0a2030);
-    border: 1px solid rgba(74,222,128,0.44); border-radius: 9px; cursor: pointer;
-    display: flex; align-items: center; justify-content: center;
-    flex-shrink: 0; transition: all 0.2s; color: #4ade80; outline: none;
-  }
-  #genie-sendbtn:hover { background: linear-gradient(135deg, #15803d, #0e3040); border-color: rgba(74,222,128,0.75); transform: scale(1.05); }
-  #genie-sendbtn:disabled { opacity: 0.36; cursor: not-allowed; transform: none; }
-"""
-
     # ── HTML ──────────────────────────────────────────────────────────────────
     html_str = """
 <div id="genie-widget">
@@ -419,10 +141,7 @@ def render_genie_chatbot():
       </div>
     </div>
     <div id="genie-prompts">
-      <span class="gchip">Which regions are most underfunded?</span>
-      <span class="gchip">Top crisis countries by severity</span>
-      <span class="gchip">Funding gap forecast 2026</span>
-      <span class="gchip">High neglect risk countries</span>
+      __GENIE_CHIPS__
     </div>
     <div id="genie-messages">
       <div class="gmsg bot">
@@ -455,7 +174,9 @@ def render_genie_chatbot():
     ASK GENIE
   </button>
 </div>
-"""
+""".replace("__GENIE_CHIPS__", "\n      ".join(
+        f'<span class="gchip">{_h.escape(p)}</span>' for p in GENIE_PROMPTS
+    ))
 
     # ── JS: display only — no fetch calls, triggers hidden Streamlit form ─────
     js_logic = """
@@ -571,16 +292,9 @@ function initGenieWidget(historyHtml) {
   if (existingPanel) wasOpen = existingPanel.classList.contains('open');
 
   // Remove stale widget (to inject fresh history from Python)
+  // Widget CSS ships in the compiled theme stylesheet linked by the app.
   var old = pDoc.getElementById('genie-widget');
   if (old) old.remove();
-  var oldCss = pDoc.getElementById('genie-widget-css');
-  if (oldCss) oldCss.remove();
-
-  // Inject CSS
-  var s = pDoc.createElement('style');
-  s.id = 'genie-widget-css';
-  s.textContent = {json.dumps(css_str)};
-  pDoc.head.appendChild(s);
 
   // Inject HTML
   var c = pDoc.createElement('div');
@@ -604,7 +318,6 @@ function initGenieWidget(historyHtml) {
 
 def _render_inner_nav(key_suffix: str):
     """Navigation bar shared by dashboard, analytics, forecast, and about pages."""
-    st.markdown(get_nav_css(st.session_state.theme, 'nav-wrapper-dashboard', theme_colors['app_bg']), unsafe_allow_html=True)
     st.markdown('<div class="nav-wrapper-dashboard">', unsafe_allow_html=True)
     cols = st.columns([0.5, 1.2, 1.2, 1.2, 0.8, 3.8, 1.3])
 
@@ -643,7 +356,8 @@ def _render_inner_nav(key_suffix: str):
 
 def show_home_page():
     """Landing page with hero section and background globe."""
-    st.markdown(get_nav_css(st.session_state.theme, 'nav-wrapper', theme_colors['app_bg']), unsafe_allow_html=True)
+    from health_regions import create_home_globe_html
+
     st.markdown('<div class="nav-wrapper">', unsafe_allow_html=True)
     cols = st.columns([0.5, 1.2, 1.2, 1.2, 0.8, 3.8, 1.3])
 
@@ -740,6 +454,9 @@ def show_home_page():
 
 def show_dashboard_page():
     """Crisis regions dashboard with themed globe and entity list."""
+    from health_regions import generate_sample_entities, get_globe_html, year_entities
+    from utils import load_year_cubes
+
     _render_inner_nav('dashboard')
 
     col1, col2 = st.columns([0.7, 3.5])
@@ -755,7 +472,11 @@ def show_dashboard_page():
 
         st.markdown("<div style='margin-bottom: 0.5rem;'></div>", unsafe_allow_html=True)
 
-        entities       = generate_sample_entities()
+        years = [int(y) for y in load_year_cubes()['years']] + ['LATEST']
+        year  = st.select_slider('Plan year', options=years, value='LATEST', key='dashboard_year')
+        year  = None if year == 'LATEST' else year
+
+        entities       = generate_sample_entities() if year is None else year_entities(year)
         total_entities = len(entities)
         sev_dot = {5: '#ef4444', 4: '#f59e0b', 3: '#3b82f6', 2: '#4ade80'}
         entity_items_html = ""
@@ -817,7 +538,7 @@ def show_dashboard_page():
 </script>""", height=0, scrolling=False)
 
     with col2:
-        components.html(create_globe_html(theme_colors), height=800, scrolling=False)
+        components.html(get_globe_html(st.session_state.theme, year), height=800, scrolling=False)
 
 
 # ── App entry point ───────────────────────────────────────────────────────────
@@ -836,8 +557,6 @@ def run_app():
 (function() {
   var w = window.parent.document.getElementById('genie-widget');
   if (w) w.remove();
-  var s = window.parent.document.getElementById('genie-widget-css');
-  if (s) s.remove();
 })();
 </script>""", height=0, scrolling=False)
 
@@ -846,12 +565,15 @@ def run_app():
     elif page == 'dashboard':
         show_dashboard_page()
     elif page == 'analytics':
+        from analytics_page import render_analytics_page
         _render_inner_nav('analytics')
         render_analytics_page()
     elif page == 'forecast':
+        from forecast_page import render_forecast_page
         _render_inner_nav('forecast')
         render_forecast_page()
     elif page == 'about':
+        from about_page import render_about_page
         _render_inner_nav('about')
         render_about_page(theme_colors)
     else:
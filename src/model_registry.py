@@ -0,0 +1,324 @@
+"""
+Versioned model artifacts for in-app scoring.
+
+`python src/model_registry.py train` fits the needs/requirements XGBoost
+models and the per-country funding trends, then saves them under
+models/artifacts/<version>/:
+
+    manifest.json        version, features, fill medians, files + hashes, metadata
+    in_need.ubj          XGBoost (UBJSON) — final_model_in_need
+    requirements.ubj     XGBoost (UBJSON) — final_model_req
+    trend_params.csv     per-country trend coefficients (trend_engine.fit_trends)
+    residuals.json       hold-out error scale per target (for uncertainty sampling)
+
+The version is a content hash of those files, so retraining on unchanged data
+registers nothing new; it only rewrites the existing version's metadata
+(hyperparameters, tuning summary, feature store, validation RMSE, …) with the
+latest run's, keeping its version, files and trained_at. models/artifacts/LATEST
+names the version the app serves.
+
+In the app, `get_registry()` returns the LATEST bundle, cached once per
+process; each XGBoost model is deserialized on first use and then reused by
+every session, so scoring never reloads or retrains anything per request.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_versions import KEEP_VERSIONS, versioned
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+ARTIFACTS_DIR = os.path.join(MODELS_DIR, 'artifacts')
+
+# Manifest fields that describe the stored files; re-registering keeps them
+ARTIFACT_FIELDS = ('version', 'files', 'trained_at')
+
+# Target column → artifact file
+MODEL_FILES = {
+    'In Need': 'in_need.ubj',
+    'revisedRequirements': 'requirements.ubj',
+}
+TREND_FILE = 'trend_params.csv'
+RESIDUALS_FILE = 'residuals.json'
+
+
+def _file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ── Bundle ───────────────────────────────────────────────────────────────────
+
+class ModelBundle:
+    """One registered version. Models and trend parameters load on first access."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest['version']
+        self.features = self.manifest['features']
+        self.medians = self.manifest.get('medians', {})
+        self._models = {}
+        self._trend_params = None
+        self._lock = threading.Lock()
+
+    def model(self, target):
+        """The fitted XGBRegressor for `target`, deserialized once."""
+        if target not in self._models:
+            with self._lock:
+                if target not in self._models:
+                    from xgboost import XGBRegressor
+
+                    model = XGBRegressor()
+                    model.load_model(os.path.join(self.path, self.manifest['files'][MODEL_FILES[target]]['name']))
+                    self._models[target] = model
+        return self._models[target]
+
+    @property
+    def models(self) -> dict:
+        return {target: self.model(target) for target in MODEL_FILES}
+
+    @property
+    def trend_params(self) -> pd.DataFrame:
+        if self._trend_params is None:
+            self._trend_params = pd.read_csv(os.path.join(self.path, TREND_FILE))
+        return self._trend_params
+
+    @property
+    def residuals(self) -> dict:
+        """{'log_sigma': {target: σ}, 'rmse': {target: rmse}} from the hold-out; {} if absent."""
+        path = os.path.join(self.path, RESIDUALS_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def score(self, features_df=None, years=None, keys=('iso3',)) -> pd.DataFrame:
+        """
+        Batch-score the horizon for every group in an already-featurized frame
+        (default: the feature store's latest snapshot).
+        """
+        from forecast_model import HORIZON, score_horizon
+
+        if features_df is None:
+            from feature_store import load_features
+
+            features_df = load_features()
+        return score_horizon(self.models, features_df, years or HORIZON, keys, self.features)
+
+    def funding(self, years=None, damping=None) -> pd.DataFrame:
+        """Funding forecast (with bounds) from the stored trend parameters."""
+        from trend_engine import HORIZON, forecast_trends
+
+        return forecast_trends(self.trend_params, years or HORIZON, damping=damping)
+
+    def __repr__(self):
+        return f"ModelBundle(version={self.version!r}, trained={self.manifest.get('trained_at')!r})"
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+def list_versions(artifacts_dir=ARTIFACTS_DIR) -> list:
+    """Registered versions, oldest first."""
+    if not os.path.isdir(artifacts_dir):
+        return []
+    versions = []
+    for name in os.listdir(artifacts_dir):
+        manifest_path = os.path.join(artifacts_dir, name, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                versions.append((json.load(f).get('trained_at', ''), name))
+    return [name for _, name in sorted(versions)]
+
+
+def latest_version(artifacts_dir=ARTIFACTS_DIR):
+    try:
+        with open(os.path.join(artifacts_dir, 'LATEST'), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def promote(version, artifacts_dir=ARTIFACTS_DIR):
+    """Point LATEST at `version` (atomic, so serving processes never see a partial write)."""
+    if not os.path.exists(os.path.join(artifacts_dir, version, 'manifest.json')):
+        raise ValueError(f"no registered model version {version!r}")
+    tmp_path = os.path.join(artifacts_dir, f'.LATEST.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(artifacts_dir, 'LATEST'))
+
+
+def load_bundle(version=None, artifacts_dir=ARTIFACTS_DIR):
+    """Uncached load of `version` (default LATEST); None when nothing is registered."""
+    version = version or latest_version(artifacts_dir)
+    if not version:
+        return None
+    return ModelBundle(os.path.join(artifacts_dir, version))
+
+
+@versioned
+@st.cache_resource(max_entries=KEEP_VERSIONS, show_spinner=False)
+def get_registry(version=None, data_version=None):
+    """Process-wide model bundle shared by every session (None if none registered)."""
+    return load_bundle(version)
+
+
+def _update_manifest(version_dir, manifest):
+    """Rewrite a registered manifest with `manifest`'s metadata; its ARTIFACT_FIELDS are kept."""
+    path = os.path.join(version_dir, 'manifest.json')
+    with open(path, encoding='utf-8') as f:
+        current = json.load(f)
+    updated = {**manifest, **{k: current[k] for k in ARTIFACT_FIELDS if k in current}}
+    if updated == current:
+        return
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', suffix='.tmp', dir=version_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(updated, f, indent=2, default=str)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def register(models, trend_params, features, medians=None, metadata=None, residuals=None,
+             artifacts_dir=ARTIFACTS_DIR, make_latest=True) -> str:
+    """Save fitted models + trend parameters as a new content-hashed version."""
+    os.makedirs(artifacts_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=artifacts_dir)
+    try:
+        for target, filename in MODEL_FILES.items():
+            models[target].save_model(os.path.join(staging, filename))
+        trend_params.to_csv(os.path.join(staging, TREND_FILE), index=False)
+        if residuals:
+            with open(os.path.join(staging, RESIDUALS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(residuals, f, indent=2, sort_keys=True)
+
+        names = sorted(os.listdir(staging))
+        files = {name: {'name': name, 'sha256': _file_sha256(os.path.join(staging, name)),
+                        'bytes': os.path.getsize(os.path.join(staging, name))} for name in names}
+        version = hashlib.sha256(
+            ''.join(f"{n}:{files[n]['sha256']}" for n in names).encode()
+        ).hexdigest()[:12]
+
+        manifest = {
+            'version': version,
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'features': list(features),
+            'targets': list(MODEL_FILES),
+            'medians': medians or {},
+            'files': files,
+            **(metadata or {}),
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        target_dir = os.path.join(artifacts_dir, version)
+        os.chmod(staging, 0o755)       # mkdtemp creates it owner-only
+        if os.path.exists(target_dir):
+            # Identical artifacts already registered: keep them, record this run's metadata
+            _update_manifest(target_dir, manifest)
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, target_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if make_latest:
+        promote(version, artifacts_dir)
+    return version
+
+
+def train_and_register(make_latest=True, tuned=None) -> str:
+    """
+    Fit both stages from the repo's data files and register the result.
+    `tuned` is a tuning.save_results payload: its per-target parameters are
+    used for the fit and recorded, with the search summary, in the manifest.
+    The search selects on 2018–2019 only, so the validation RMSE and residual
+    spread below stay out-of-sample on the 2020–2025 hold-out.
+    """
+    import xgboost
+
+    from feature_store import ensure_store, load_features, snapshot_medians
+    from forecast_features import FEATURES
+    from forecast_model import (
+        PREDICTION_COLUMNS, fit_needs_models, holdout_predictions, load_training_panel, model_frame,
+        residual_log_sigma,
+    )
+    from trend_engine import fit_trends, yearly_matrix
+
+    panel = load_training_panel()
+    store_version = ensure_store()
+    features_df = load_features()
+    target_params = (tuned or {}).get('params')
+    models = fit_needs_models(features_df, target_params=target_params)
+    trend_params = fit_trends(*yearly_matrix(panel))
+    medians = snapshot_medians()
+    holdout = holdout_predictions(features_df, target_params=target_params)
+    rmse = {target: float(np.sqrt(np.mean((holdout[col] - holdout[target]) ** 2)))
+            for target, col in PREDICTION_COLUMNS.items()}
+    residuals = {'log_sigma': residual_log_sigma(holdout), 'rmse': rmse}
+    metadata = {
+        'xgboost_version': xgboost.__version__,
+        'training_rows': len(model_frame(features_df)),
+        'trend_countries': int(len(trend_params)),
+        'feature_store': store_version,
+        'validation_rmse': rmse,
+        'hyperparameters': {target: {k: v for k, v in model.get_params().items()
+                                     if v is not None and not (isinstance(v, float) and np.isnan(v))}
+                            for target, model in models.items()},
+    }
+    if tuned:
+        metadata['tuning'] = tuned.get('search', {})
+    return register(models, trend_params, FEATURES, medians, metadata, residuals, make_latest=make_latest)
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+
+    parser = argparse.ArgumentParser(description='Model artifact registry.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    train = sub.add_parser('train', help='fit both stages and register a new version')
+    train.add_argument('--no-promote', action='store_true', help='register without updating LATEST')
+    train.add_argument('--tuned', action='store_true', help='use models/tuning/best_params.json (tuning.py)')
+    sub.add_parser('list', help='list registered versions')
+    prom = sub.add_parser('promote', help='serve a registered version')
+    prom.add_argument('version')
+    args = parser.parse_args()
+
+    # get_registry's decorator warns when used outside `streamlit run`; irrelevant here
+    logging.getLogger('streamlit.runtime.caching.cache_data_api').setLevel(logging.ERROR)
+    if args.command == 'train':
+        tuned = None
+        if args.tuned:
+            from tuning import load_best_params
+
+            tuned = load_best_params()
+        version = train_and_register(make_latest=not args.no_promote, tuned=tuned)
+        print(f"registered {version}" + ('' if args.no_promote else ' (LATEST)'))
+    elif args.command == 'promote':
+        promote(args.version)
+        print(f"LATEST → {args.version}")
+    else:
+        latest = latest_version()
+        for version in list_versions():
+            bundle = load_bundle(version)
+            print(f"{'*' if version == latest else ' '} {version}  {bundle.manifest['trained_at']}  "
+                  f"rows={bundle.manifest.get('training_rows')}  "
+                  f"trend_countries={bundle.manifest.get('trend_countries')}")
@@ -0,0 +1,202 @@
+"""
+Robust outlier screen for cost and targeting metrics.
+
+The `Outlier_Flag` column shipped in the country and admin1 summaries has no
+reproducible definition. This module recomputes outliers from the figures:
+
+    Cost_per_Beneficiary    as published (revisedRequirements / Targeted when absent)
+    Budget per PIN          revisedRequirements / In Need
+    Targeting Efficiency    Targeted / In Need
+
+Each metric is scored against its peer group with two robust rules:
+
+    Robust Z   0.6745 × (x − median) / MAD, flagged when |z| > 3.5 (Iglewicz–Hoaglin)
+    IQR        flagged outside [Q1 − 1.5 × IQR, Q3 + 1.5 × IQR]
+
+A group with zero MAD or IQR gets no score for that rule.
+
+Group quantiles and MADs are computed for all groups at once with pandas'
+grouped quantile kernel (grouped_quantiles) and every per-row statistic is a
+gather by group code, so hundreds of thousands of subnational rows cost two
+grouped passes per metric rather than one quantile call per group. Groups
+with fewer than MIN_GROUP_SIZE values are not scored, and a metric is only
+scored where its inputs exist (admin1 rows carry no budget, so they get no
+Budget per PIN).
+
+Peer groups per level (LEVELS): admin1 regions against the other regions of
+their country, countries against each other, and country × sector cells
+against the same cluster in other countries.
+
+    python src/outliers.py                     # print the flagged regions
+    python src/outliers.py --out flagged.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+METRICS = ['Cost_per_Beneficiary', 'Budget per PIN', 'Targeting Efficiency']
+Z_THRESHOLD = 3.5
+IQR_K = 1.5
+MIN_GROUP_SIZE = 5
+MAD_SCALE = 0.6745
+
+# Level → source file, peer-group columns and the column naming the region
+LEVELS = {
+    'Admin 1': {'file': 'updated_admin1_summary_data.csv', 'by': ['Country ISO3'], 'region': 'Admin 1 Name'},
+    'Country': {'file': 'country_level_summary (1).csv', 'by': [], 'region': 'Country ISO3'},
+    'Country × Sector': {'file': 'humanitarian_analysis_sector_matrix.csv', 'by': ['Cluster'], 'region': 'Cluster'},
+}
+FLAG_COLUMNS = ['Level', 'Group', 'Country ISO3', 'Region', 'Metric', 'Value', 'Group Size', 'Group Median',
+                'Robust Z', 'IQR Low', 'IQR High', 'Rule', 'Source Flag']
+
+
+def add_metrics(df) -> pd.DataFrame:
+    """The METRICS columns that can be derived from the figures present."""
+    df = df.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if {'Targeted', 'In Need'} <= set(df.columns):
+            df['Targeting Efficiency'] = df['Targeted'] / df['In Need']
+        if {'revisedRequirements', 'In Need'} <= set(df.columns):
+            df['Budget per PIN'] = df['revisedRequirements'] / df['In Need']
+        if 'Cost_per_Beneficiary' not in df.columns and {'revisedRequirements', 'Targeted'} <= set(df.columns):
+            df['Cost_per_Beneficiary'] = df['revisedRequirements'] / df['Targeted']
+    present = [m for m in METRICS if m in df.columns]
+    df[present] = df[present].replace([np.inf, -np.inf], np.nan)
+    return df
+
+
+# ── Grouped statistics ───────────────────────────────────────────────────────
+
+def grouped_quantiles(values, codes, n_groups, qs) -> tuple:
+    """
+    Linear-interpolated quantiles `qs` of `values` per group code
+    (0 … n_groups-1), NaNs ignored, for all groups in one grouped pass.
+    Returns (counts, array of shape (len(qs), n_groups)).
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    counts = np.bincount(codes[valid], minlength=n_groups)
+    quantiles = (pd.Series(values[valid]).groupby(codes[valid]).quantile(list(qs))
+                 .unstack().reindex(index=range(n_groups), columns=list(qs)))
+    return counts, quantiles.to_numpy().T.copy()
+
+
+def _group_codes(df, by) -> tuple:
+    if not by:
+        return np.zeros(len(df), dtype=np.int64), 1
+    codes = df.groupby(by, sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+    return codes, int(codes.max()) + 1 if len(codes) else 0
+
+
+def score_metric(values, codes, n_groups, min_group_size=MIN_GROUP_SIZE) -> pd.DataFrame:
+    """Per-row group size, median, robust z and IQR fences for one metric."""
+    values = np.asarray(values, dtype=float)
+    counts, (q1, median, q3) = grouped_quantiles(values, codes, n_groups, (0.25, 0.5, 0.75))
+    _, (mad,) = grouped_quantiles(np.abs(values - median[codes]), codes, n_groups, (0.5,))
+    small = counts < min_group_size
+    median[small] = q1[small] = q3[small] = mad[small] = np.nan
+
+    iqr = q3 - q1
+    # A zero IQR (a group sharing one published value) would flag float noise
+    iqr[iqr <= 0] = np.nan
+    low, high = (q1 - IQR_K * iqr)[codes], (q3 + IQR_K * iqr)[codes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(mad[codes] > 0, MAD_SCALE * (values - median[codes]) / mad[codes], np.nan)
+    return pd.DataFrame({
+        'Group Size': counts[codes],
+        'Group Median': median[codes],
+        'Robust Z': z,
+        'IQR Low': low,
+        'IQR High': high,
+        'Z Flag': np.abs(z) > Z_THRESHOLD,
+        'IQR Flag': (values < low) | (values > high),
+    })
+
+
+def score(df, by=(), metrics=METRICS, min_group_size=MIN_GROUP_SIZE) -> pd.DataFrame:
+    """
+    Long form: one row per (input row, metric present) with the input's
+    index in `row`, the value and its group statistics.
+    """
+    by = list(by)
+    codes, n_groups = _group_codes(df, by)
+    frames = []
+    for metric in metrics:
+        if metric not in df.columns:
+            continue
+        values = df[metric].to_numpy(dtype=float)
+        stats = score_metric(values, codes, n_groups, min_group_size)
+        stats.insert(0, 'row', df.index)
+        stats.insert(1, 'Metric', metric)
+        stats.insert(2, 'Value', values)
+        frames.append(stats[~np.isnan(values)])
+    if not frames:
+        return pd.DataFrame(columns=['row', 'Metric', 'Value', 'Group Size', 'Group Median', 'Robust Z',
+                                     'IQR Low', 'IQR High', 'Z Flag', 'IQR Flag'])
+    return pd.concat(frames, ignore_index=True)
+
+
+# ── Flagged regions ──────────────────────────────────────────────────────────
+
+def flag_level(df, level, by, region) -> pd.DataFrame:
+    """Flagged rows of one level in FLAG_COLUMNS form."""
+    df = add_metrics(df)
+    scored = score(df, by)
+    scored = scored[scored['Z Flag'] | scored['IQR Flag']]
+    rows = df.loc[scored['row']]
+    rule = np.select([scored['Z Flag'] & scored['IQR Flag'], scored['Z Flag']],
+                     ['robust z + IQR', 'robust z'], 'IQR')
+    group = rows[by].astype(str).agg(' / '.join, axis=1) if by else pd.Series('All', index=rows.index)
+    source_flag = rows['Outlier_Flag'] if 'Outlier_Flag' in rows.columns else pd.Series(np.nan, index=rows.index)
+    return pd.DataFrame({
+        'Level': level,
+        'Group': group.to_numpy(),
+        'Country ISO3': rows['Country ISO3'].to_numpy(),
+        'Region': rows[region].to_numpy(),
+        'Metric': scored['Metric'].to_numpy(),
+        'Value': scored['Value'].to_numpy(),
+        'Group Size': scored['Group Size'].to_numpy(),
+        'Group Median': scored['Group Median'].to_numpy(),
+        'Robust Z': scored['Robust Z'].to_numpy(),
+        'IQR Low': scored['IQR Low'].to_numpy(),
+        'IQR High': scored['IQR High'].to_numpy(),
+        'Rule': rule,
+        'Source Flag': source_flag.to_numpy(),
+    }, columns=FLAG_COLUMNS)
+
+
+def flagged_regions(data_dir=DATA_DIR, levels=LEVELS) -> pd.DataFrame:
+    """Flagged rows of every level whose source file exists, largest |Robust Z| first within a level."""
+    frames = []
+    for level, spec in levels.items():
+        path = os.path.join(data_dir, spec['file'])
+        if not os.path.exists(path):
+            continue
+        frames.append(flag_level(pd.read_csv(path), level, spec['by'], spec['region']))
+    if not frames:
+        return pd.DataFrame(columns=FLAG_COLUMNS)
+    result = pd.concat(frames, ignore_index=True)
+    result['_order'] = [list(levels).index(level) for level in result['Level']]
+    result['_abs_z'] = result['Robust Z'].abs().fillna(np.inf)
+    return (result.sort_values(['_order', '_abs_z'], ascending=[True, False], kind='stable')
+            .drop(columns=['_order', '_abs_z']).reset_index(drop=True))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Robust outlier screen (median/MAD and IQR).')
+    parser.add_argument('--out', help='write the flagged regions to this CSV')
+    args = parser.parse_args()
+
+    result = flagged_regions()
+    if args.out:
+        result.to_csv(args.out, index=False)
+    for level, rows in result.groupby('Level', sort=False):
+        print(f"{level}: {len(rows)} flags in {rows['Region'].nunique()} regions")
+        print(rows[['Group', 'Region', 'Metric', 'Value', 'Group Median', 'Robust Z', 'Rule', 'Source Flag']]
+              .head(15).to_string(index=False))
@@ -0,0 +1,347 @@
+"""
+Stage-memoized runner for the forecasting workflow of models/ML_Forecasting.ipynb.
+
+The notebook's cells become named stages in a small DAG:
+
+    load ─┬→ clean ──────┐
+          ├→ population ─┤
+          ├──────────────┴→ merge → funding ─┐
+          └→ features → needs ───────────────┴→ risk → save
+
+Each stage's output is cached on disk (models/pipeline/cache/<stage>/) under
+a key hashed from its code (the stage function plus the modules it calls),
+the parameters it reads and the keys of its inputs; source files enter
+through `load`. Stages whose key is unchanged are not re-run, and an
+unchanged upstream is not even loaded. Changing the risk threshold therefore
+re-runs only `risk` and `save`; editing a CSV re-runs everything downstream
+of `load`. Features are read from the feature store (feature_store.py), the
+same snapshot training and backtests use, so that stage keeps no copy of
+its own.
+
+    python src/pipeline.py run                                # cached where possible
+    python src/pipeline.py run --set risk_threshold=1.3       # re-runs risk + save only
+    python src/pipeline.py run --from features                # force features and downstream
+    python src/pipeline.py status
+"""
+
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SRC_DIR, '..', 'data')
+OUTPUT_DIR = os.path.join(SRC_DIR, '..', 'models', 'pipeline')
+CACHE_DIR = os.path.join(OUTPUT_DIR, 'cache')
+
+SOURCE_FILES = {
+    'hrp': 'humanitarian-response-plans.csv',
+    'summary': 'country_level_summary (1).csv',
+    'pop': 'cod_population_admin0.csv',
+}
+OUTPUT_COLUMNS = ['iso3', 'year', 'Predicted_In_Need', 'Predicted_Requirements', 'Predicted_Funding',
+                  'iso3_original', 'Funding_Gap', 'Risk_Flag']
+
+DEFAULT_PARAMS = {
+    'data_dir': DATA_DIR,
+    'out_dir': OUTPUT_DIR,
+    'horizon': [2026, 2027, 2028, 2029, 2030],
+    'funding_engine': 'prophet' if importlib.util.find_spec('prophet') else 'linear',
+    'risk_threshold': 1.15,
+    'store_dir': os.path.join(SRC_DIR, '..', 'models', 'feature_store'),   # not keyed: stores are versioned
+}
+
+
+def _sha256(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(path) -> str:
+    with open(path, 'rb') as f:
+        return _sha256(f.read())
+
+
+# ── Stages ───────────────────────────────────────────────────────────────────
+
+class Stage:
+    """A named step: `func(inputs, params)` over the outputs of `deps`."""
+
+    def __init__(self, name, func, deps=(), params=(), modules=(), memo=True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = tuple(params)
+        self.modules = tuple(modules)
+        self.memo = memo
+
+    def code_version(self) -> str:
+        parts = [inspect.getsource(self.func).encode()]
+        parts += [open(os.path.join(SRC_DIR, m), 'rb').read() for m in self.modules]
+        return _sha256(b'\0'.join(parts))
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+
+def _load(inputs, params):
+    """Raw CSVs, as read by the notebook's first cell."""
+    frames = {key: pd.read_csv(os.path.join(params['data_dir'], name), encoding='utf-8-sig', low_memory=False)
+              for key, name in SOURCE_FILES.items()}
+    frames['signature'] = {key: _file_sha256(os.path.join(params['data_dir'], name))
+                           for key, name in SOURCE_FILES.items()}
+    return frames
+
+
+def _clean(inputs, params):
+    """HXL tag row dropped, plan columns renamed to the panel keys."""
+    hrp = inputs['load']['hrp']
+    hrp = hrp[~hrp['code'].astype(str).str.startswith('#')].reset_index(drop=True)
+    hrp = hrp.rename(columns={'locations': 'iso3', 'years': 'year'})
+    hrp['year'] = pd.to_numeric(hrp['year'], errors='coerce').fillna(0).astype(int)
+    for col in ('origRequirements', 'revisedRequirements'):
+        hrp[col] = pd.to_numeric(hrp[col], errors='coerce')
+    return hrp
+
+
+def _population(inputs, params):
+    """Latest COD-PS total population per country."""
+    pop = inputs['load']['pop']
+    total = pop[pop['Population_group'] == 'T_TL'].sort_values('Reference_year', kind='stable')
+    total = total.drop_duplicates('ISO3', keep='last')
+    return pd.DataFrame({'iso3': total['ISO3'].to_numpy(),
+                         'Population': pd.to_numeric(total['Population'], errors='coerce').to_numpy()})
+
+
+def _merge(inputs, params):
+    """Plans + country summary + population, one row per plan."""
+    summary = inputs['load']['summary'].rename(columns={'Country ISO3': 'iso3'})
+    panel = inputs['clean'].merge(summary, on='iso3', how='left', suffixes=('', '_summary'))
+    return panel.merge(inputs['population'], on='iso3', how='left', suffixes=('', '_pop'))
+
+
+def _features(inputs, params):
+    """Latest feature-store snapshot of the sources in data_dir, materialized if missing."""
+    from feature_store import ensure_store, load_features
+
+    version = ensure_store(data_dir=params['data_dir'], store_dir=params['store_dir'])
+    return load_features(version=version, store_dir=params['store_dir'])
+
+
+def _funding(inputs, params):
+    """Stage A: funding trend per country (Prophet in the notebook)."""
+    from trend_engine import forecast_funding
+
+    return forecast_funding(inputs['merge'], params['funding_engine'], years=params['horizon'])
+
+
+def _needs(inputs, params):
+    """Stage B: XGBoost needs/requirements models and their horizon forecast."""
+    from forecast_model import fit_needs_models, score_horizon
+
+    models = fit_needs_models(inputs['features'])
+    return {'models': models, 'forecast': score_horizon(models, inputs['features'], years=params['horizon'])}
+
+
+def _risk(inputs, params):
+    """Needs + funding merge, clean iso3, funding gap and neglect flag."""
+    final = inputs['needs']['forecast'].merge(
+        inputs['funding'][['iso3', 'year', 'Predicted_Funding']], on=['iso3', 'year'], how='left')
+    final['Predicted_Funding'] = final['Predicted_Funding'].fillna(0)
+    final['iso3_original'] = final['iso3']
+    # clean_iso3: last non-empty pipe component
+    final['iso3'] = final['iso3'].str.extract(r'([^|\s]+)[|\s]*$', expand=False).fillna(final['iso3'])
+    final['Funding_Gap'] = final['Predicted_Requirements'] - final['Predicted_Funding']
+    final['Risk_Flag'] = final['Predicted_Requirements'] > final['Predicted_Funding'] * params['risk_threshold']
+    return final[OUTPUT_COLUMNS]
+
+
+def _save(inputs, params):
+    """forecast_results / high_neglect_risk CSVs, as the notebook's last cell."""
+    final = inputs['risk']
+    risk = final[final['Risk_Flag']].sort_values('Funding_Gap', ascending=False)
+    os.makedirs(params['out_dir'], exist_ok=True)
+    paths = {
+        'forecast': os.path.join(params['out_dir'], 'forecast_results_2026_2030.csv'),
+        'high_risk': os.path.join(params['out_dir'], 'high_neglect_risk_2026_2030.csv'),
+    }
+    final.to_csv(paths['forecast'], index=False)
+    risk.to_csv(paths['high_risk'], index=False)
+    return paths
+
+
+STAGES = {s.name: s for s in [
+    Stage('load', _load, params=('data_dir',)),
+    Stage('clean', _clean, deps=('load',)),
+    Stage('population', _population, deps=('load',)),
+    Stage('merge', _merge, deps=('load', 'clean', 'population')),
+    Stage('features', _features, deps=('load',), params=('data_dir',), memo=False,
+          modules=('feature_store.py', 'forecast_features.py', 'forecast_model.py', 'hrp_plans.py')),
+    Stage('funding', _funding, deps=('merge',), params=('funding_engine', 'horizon'),
+          modules=('trend_engine.py',)),
+    Stage('needs', _needs, deps=('features',), params=('horizon',),
+          modules=('forecast_model.py', 'forecast_features.py')),
+    Stage('risk', _risk, deps=('needs', 'funding'), params=('risk_threshold',)),
+    Stage('save', _save, deps=('risk',), params=('out_dir',), memo=False),
+]}
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+def _upstream(names) -> list:
+    """`names` plus everything they depend on, in STAGES order."""
+    needed, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(STAGES[name].deps)
+    return [name for name in STAGES if name in needed]
+
+
+def _downstream(name) -> set:
+    out = {name}
+    for stage in STAGES.values():
+        if any(dep in out for dep in stage.deps):
+            out.add(stage.name)
+    return out
+
+
+def stage_keys(params=None, names=None) -> dict:
+    """Cache key of every stage, from code, parameters, upstream keys and source files."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    keys = {}
+    for name in _upstream(names or list(STAGES)):
+        stage = STAGES[name]
+        payload = {
+            'stage': name,
+            'code': stage.code_version(),
+            'params': {p: params[p] for p in stage.params},
+            'deps': {dep: keys[dep] for dep in stage.deps},
+        }
+        if name == 'load':
+            payload['sources'] = {key: _file_sha256(os.path.join(params['data_dir'], file))
+                                  for key, file in SOURCE_FILES.items()}
+        keys[name] = _sha256(json.dumps(payload, sort_keys=True, default=str).encode())[:24]
+    return keys
+
+
+def _cache_path(cache_dir, name, key):
+    return os.path.join(cache_dir, name, f'{key}.pkl')
+
+
+def _cache_get(cache_dir, name, key):
+    path = _cache_path(cache_dir, name, key)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _cache_put(cache_dir, name, key, value):
+    path = _cache_path(cache_dir, name, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def run(targets=('save',), params=None, force_from=None, cache_dir=CACHE_DIR, log=print) -> dict:
+    """
+    Produce `targets`, running only stages whose key has no cached output
+    (plus `force_from` and everything downstream of it). Returns the target
+    outputs; `run.last` holds per-stage status and timings.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    keys = stage_keys(params, targets)
+    forced = _downstream(force_from) if force_from else set()
+    outputs, report = {}, []
+
+    def resolve(name):
+        if name in outputs:
+            return outputs[name]
+        stage = STAGES[name]
+        cached = None
+        if stage.memo and name not in forced and cache_dir:
+            cached = _cache_get(cache_dir, name, keys[name])
+        if cached is not None:
+            outputs[name] = cached
+            report.append((name, 'cached', 0.0))
+            if log:
+                log(f"  {name:<11} cached")
+            return cached
+        inputs = {dep: resolve(dep) for dep in stage.deps}
+        t0 = time.perf_counter()
+        value = stage.func(inputs, params)
+        elapsed = time.perf_counter() - t0
+        if stage.memo and cache_dir:
+            _cache_put(cache_dir, name, keys[name], value)
+        outputs[name] = value
+        report.append((name, 'ran', elapsed))
+        if log:
+            log(f"  {name:<11} ran      {elapsed * 1000:8.0f} ms")
+        return value
+
+    results = {name: resolve(name) for name in targets}
+    run.last = report
+    return results
+
+
+def status(params=None, cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """Key and cache state of every stage under `params`."""
+    keys = stage_keys(params)
+    return pd.DataFrame([{
+        'stage': name,
+        'deps': ', '.join(stage.deps) or '-',
+        'key': keys[name],
+        'cached': bool(stage.memo and os.path.exists(_cache_path(cache_dir, name, keys[name]))),
+    } for name, stage in STAGES.items()])
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+    import sys
+
+    parser = argparse.ArgumentParser(description='Stage-memoized forecasting pipeline.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_cmd = sub.add_parser('run', help='run the pipeline, reusing cached stages')
+    run_cmd.add_argument('--from', dest='force_from', choices=list(STAGES),
+                         help='re-run this stage and everything downstream')
+    run_cmd.add_argument('--until', choices=list(STAGES), default='save', help='last stage to produce')
+    run_cmd.add_argument('--no-cache', action='store_true', help='run every stage without the cache')
+    stat_cmd = sub.add_parser('status', help='show stage keys and cache state')
+    for cmd in (run_cmd, stat_cmd):
+        cmd.add_argument('--set', nargs='+', default=[], metavar='NAME=VALUE',
+                         help=f"override parameters ({', '.join(DEFAULT_PARAMS)})")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        if name not in DEFAULT_PARAMS:
+            sys.exit(f"unknown parameter {name!r}; expected one of {', '.join(DEFAULT_PARAMS)}")
+        overrides[name] = _parse_value(value)
+
+    logging.getLogger('prophet').setLevel(logging.ERROR)
+    if args.command == 'status':
+        print(status(overrides).to_string(index=False))
+    else:
+        t0 = time.perf_counter()
+        result = run((args.until,), overrides, args.force_from, None if args.no_cache else CACHE_DIR)
+        print(f"done in {time.perf_counter() - t0:.2f}s")
+        if args.until == 'save':
+            for label, path in result['save'].items():
+                print(f"  {label}: {path}")
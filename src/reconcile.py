@@ -0,0 +1,160 @@
+"""
+Admin1 → admin0 rollup reconciliation.
+
+Country totals (country_level_summary (1).csv) and the admin1 breakdowns
+(updated_admin1_summary_data.csv, or any number of per-country subnational
+files) are produced separately. This sums the admin1 rows per ISO3 in one
+grouped pass and compares each metric with the country total:
+
+    match               |admin1 sum − total| ≤ max(ABS_TOL, REL_TOL × |total|)
+    mismatch            outside the tolerance with every admin1 row reported
+    admin1 incomplete   outside the tolerance, some admin1 rows missing the figure
+    admin0 only         no admin1 figures for the country
+    admin1 only         no country total; the admin1 sum fills it in the summary
+
+Admin1 inputs go through the admin1_summary validation rules first, so a
+Population of 0.0 counts as unreported rather than as zero people. Results
+are written to data/validated/: reconciliation.csv (one row per country and
+metric) and reconciled_country_summary.csv (the country summary with the
+admin1 sums and a status per metric). With --gate the exit code is 1 when
+any metric is a mismatch, so a data refresh can be stopped on it.
+
+    python src/reconcile.py
+    python src/reconcile.py --admin1 'data/admin1/*.csv' --rel-tol 0.02 --gate
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from validation import OUTPUT_DIR, TABLES, clean_table, validate
+
+# Admin1 column → country summary column
+METRICS = {'Population': 'Total_Population', 'In Need': 'In Need', 'Targeted': 'Targeted'}
+REL_TOL = 0.01
+ABS_TOL = 1000
+STATUS_ORDER = ['mismatch', 'admin1 incomplete', 'admin1 only', 'match', 'admin0 only']
+
+DISCREPANCIES_PATH = os.path.join(OUTPUT_DIR, 'reconciliation.csv')
+SUMMARY_PATH = os.path.join(OUTPUT_DIR, 'reconciled_country_summary.csv')
+
+
+def load_admin1(paths=None) -> pd.DataFrame:
+    """The validated default admin1 table, or the given files (globs allowed) validated and concatenated."""
+    if not paths:
+        return clean_table('admin1_summary')
+    files = sorted({f for pattern in paths for f in (glob.glob(pattern) or [pattern])})
+    spec = TABLES['admin1_summary']
+    frames = [validate(pd.read_csv(f), {**spec, 'source': f})[0] for f in files]
+    return pd.concat(frames, ignore_index=True)
+
+
+def rollup(admin1, metrics=METRICS) -> pd.DataFrame:
+    """Per ISO3: admin1 row count, and for each metric its sum and number of rows reporting it."""
+    cols = [m for m in metrics if m in admin1.columns]
+    grouped = admin1.groupby('Country ISO3', sort=True)[cols]
+    sums = grouped.sum(min_count=1)
+    reported = grouped.count().add_suffix(' reported')
+    rolled = sums.join(reported)
+    rolled.insert(0, 'Admin1 Rows', admin1.groupby('Country ISO3', sort=True).size())
+    return rolled
+
+
+def reconcile(admin1, country, rel_tol=REL_TOL, abs_tol=ABS_TOL, metrics=METRICS) -> pd.DataFrame:
+    """One row per (country, metric) with both figures, the difference and a status."""
+    rolled = rollup(admin1, metrics)
+    totals = country.drop_duplicates('Country ISO3').set_index('Country ISO3')
+    index = totals.index.union(rolled.index)
+    rolled, totals = rolled.reindex(index), totals.reindex(index)
+    rows = rolled['Admin1 Rows'].fillna(0).to_numpy(dtype=np.int64)
+
+    frames = []
+    for admin1_col, country_col in metrics.items():
+        total = totals[country_col].to_numpy(dtype=float)
+        if admin1_col in rolled.columns:
+            admin_sum = rolled[admin1_col].to_numpy(dtype=float)
+            reported = rolled[f'{admin1_col} reported'].fillna(0).to_numpy(dtype=np.int64)
+        else:
+            admin_sum, reported = np.full(len(index), np.nan), np.zeros(len(index), dtype=np.int64)
+        diff = admin_sum - total
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rel = np.where(total != 0, diff / np.abs(total), np.nan)
+        within = np.abs(diff) <= np.maximum(abs_tol, rel_tol * np.abs(total))
+        status = np.select(
+            [reported == 0, np.isnan(total), within, reported < rows],
+            ['admin0 only', 'admin1 only', 'match', 'admin1 incomplete'],
+            'mismatch',
+        )
+        frames.append(pd.DataFrame({
+            'Country ISO3': index.to_numpy(),
+            'Metric': admin1_col,
+            'Country Total': total,
+            'Admin1 Sum': admin_sum,
+            'Difference': diff,
+            'Relative Difference': rel,
+            'Admin1 Rows': rows,
+            'Admin1 Reported': reported,
+            'Status': status,
+        }))
+    result = pd.concat(frames, ignore_index=True)
+    # Countries with neither figure for a metric carry no information
+    result = result[~(np.isnan(result['Country Total']) & (result['Admin1 Reported'] == 0))]
+    order = result['Status'].map({s: i for i, s in enumerate(STATUS_ORDER)})
+    return (result.assign(_order=order, _abs=result['Relative Difference'].abs())
+            .sort_values(['_order', '_abs', 'Country ISO3'], ascending=[True, False, True], kind='stable')
+            .drop(columns=['_order', '_abs']).reset_index(drop=True))
+
+
+def reconciled_summary(country, discrepancies, metrics=METRICS) -> pd.DataFrame:
+    """
+    The country summary plus `<metric> (admin1)` sums and `<metric> Status`
+    per metric. Missing country totals are filled from complete admin1 sums.
+    """
+    summary = country.drop_duplicates('Country ISO3').set_index('Country ISO3')
+    wide = discrepancies.pivot(index='Country ISO3', columns='Metric')
+    summary = summary.reindex(summary.index.union(wide.index))
+    for admin1_col, country_col in metrics.items():
+        if admin1_col not in wide['Status'].columns:
+            continue
+        status = wide['Status'][admin1_col].reindex(summary.index)
+        admin_sum = wide['Admin1 Sum'][admin1_col].reindex(summary.index)
+        complete = wide['Admin1 Reported'][admin1_col] == wide['Admin1 Rows'][admin1_col]
+        fill = (status == 'admin1 only') & complete.reindex(summary.index, fill_value=False)
+        summary.loc[fill, country_col] = admin_sum[fill]
+        summary[f'{admin1_col} (admin1)'] = admin_sum
+        summary[f'{admin1_col} Status'] = status.fillna('admin0 only')
+    return summary.reset_index()
+
+
+def run(admin1_paths=None, rel_tol=REL_TOL, abs_tol=ABS_TOL, out_dir=OUTPUT_DIR) -> tuple:
+    admin1 = load_admin1(admin1_paths)
+    country = clean_table('country_summary')
+    discrepancies = reconcile(admin1, country, rel_tol, abs_tol)
+    summary = reconciled_summary(country, discrepancies)
+    os.makedirs(out_dir, exist_ok=True)
+    discrepancies.to_csv(os.path.join(out_dir, os.path.basename(DISCREPANCIES_PATH)), index=False)
+    summary.to_csv(os.path.join(out_dir, os.path.basename(SUMMARY_PATH)), index=False)
+    return discrepancies, summary
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Reconcile admin1 rollups against country totals.')
+    parser.add_argument('--admin1', nargs='+', help='admin1 files or globs (default: validated admin1 summary)')
+    parser.add_argument('--rel-tol', type=float, default=REL_TOL)
+    parser.add_argument('--abs-tol', type=float, default=ABS_TOL)
+    parser.add_argument('--gate', action='store_true', help='exit 1 when any metric is a mismatch')
+    args = parser.parse_args()
+
+    discrepancies, _ = run(args.admin1, args.rel_tol, args.abs_tol)
+    shown = discrepancies[discrepancies['Status'] != 'admin0 only']
+    with pd.option_context('display.width', 160, 'display.float_format', '{:,.3f}'.format):
+        print(shown.drop(columns=['Admin1 Rows']).to_string(index=False))
+    counts = discrepancies['Status'].value_counts()
+    print(f"\n{', '.join(f'{counts.get(s, 0)} {s}' for s in STATUS_ORDER)} → {DISCREPANCIES_PATH}")
+    if args.gate and counts.get('mismatch', 0):
+        sys.exit(1)
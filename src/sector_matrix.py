@@ -0,0 +1,192 @@
+"""
+Country × cluster sector matrix built from the HNO cluster data.
+
+`hpc_hno_2025.csv` (HXL tags in its second row) holds In Need / Targeted
+figures per country, cluster, admin area and population category. The build
+keeps the cluster rows (Cluster != 'ALL'), takes the all-category figures at
+the coarsest admin level each country reports for a cluster, and assembles
+two sparse country × cluster matrices (In Need, Targeted). One pass over the
+stored cells then gives, for every country-cluster pair:
+
+    Coverage                = Targeted / In Need
+    Cluster Mean Coverage   = mean Coverage of the cluster across countries
+    Benchmark Ratio         = Coverage / Cluster Mean Coverage
+
+(the sectoral benchmarking of src/Untitled; a ratio below 0.5 marks an
+underperforming country-sector response). The result is written in long
+form to data/humanitarian_analysis_sector_matrix.csv for the analytics page.
+
+    python src/sector_matrix.py                      # build from data/hpc_hno_2025.csv
+    python src/sector_matrix.py --fetch              # download the HNO file from HDX first
+
+The HNO file is not committed; the ingest CLI (validation.py) builds the
+matrix through ensure_matrix whenever the HNO file is newer than it.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+HNO_PATH = os.path.join(DATA_DIR, 'hpc_hno_2025.csv')
+OUTPUT_PATH = os.path.join(DATA_DIR, 'humanitarian_analysis_sector_matrix.csv')
+# HDX (CKAN) metadata of the global HNO dataset; its resources include hpc_hno_<year>.csv
+HDX_DATASET_URL = 'https://data.humdata.org/api/3/action/package_show?id=global-hpc-hno'
+
+ADMIN_CODE_COLS = ['Admin 1 PCode', 'Admin 2 PCode', 'Admin 3 PCode']
+UNDERPERFORMING_RATIO = 0.5
+MATRIX_COLUMNS = ['Country ISO3', 'Cluster', 'In Need', 'Targeted', 'Coverage', 'Cluster Mean Coverage',
+                  'Benchmark Ratio']
+
+
+def load_hno(path=HNO_PATH) -> pd.DataFrame:
+    """Cluster rows of the HNO file, HXL row dropped and figures numeric."""
+    hno = pd.read_csv(path, skiprows=[1], low_memory=False)
+    for col in ('Population', 'In Need', 'Targeted'):
+        if col in hno.columns:
+            hno[col] = pd.to_numeric(hno[col], errors='coerce')
+    return hno[hno['Cluster'].notna() & (hno['Cluster'] != 'ALL')]
+
+
+def country_cluster_totals(hno) -> pd.DataFrame:
+    """
+    One In Need / Targeted figure per (country, cluster): all-category rows
+    at the coarsest admin level reported, so national totals are not added
+    to their own sub-national breakdown.
+    """
+    rows = hno
+    if 'Category' in rows.columns:
+        category = rows['Category'].astype('string').str.strip()
+        rows = rows[category.isna() | (category == '')]
+    admin_cols = [c for c in ADMIN_CODE_COLS if c in rows.columns]
+    level = rows[admin_cols].notna().sum(axis=1) if admin_cols else pd.Series(0, index=rows.index)
+    keys = [rows['Country ISO3'], rows['Cluster']]
+    rows = rows[level == level.groupby(keys).transform('min')]
+    return rows.groupby(['Country ISO3', 'Cluster'], as_index=False)[['In Need', 'Targeted']].sum(min_count=1)
+
+
+def build_matrix(totals) -> dict:
+    """Sparse (countries × clusters) In Need and Targeted matrices with their labels."""
+    from scipy import sparse
+
+    countries, row = np.unique(totals['Country ISO3'].to_numpy(dtype=str), return_inverse=True)
+    clusters, col = np.unique(totals['Cluster'].to_numpy(dtype=str), return_inverse=True)
+    shape = (len(countries), len(clusters))
+    in_need = totals['In Need'].to_numpy(dtype=float)
+    targeted = totals['Targeted'].to_numpy(dtype=float)
+    # Cells need both figures; a zero In Need carries no coverage information
+    keep = np.isfinite(in_need) & np.isfinite(targeted) & (in_need > 0)
+    return {
+        'countries': countries,
+        'clusters': clusters,
+        'in_need': sparse.csr_matrix((in_need[keep], (row[keep], col[keep])), shape=shape),
+        'targeted': sparse.csr_matrix((targeted[keep], (row[keep], col[keep])), shape=shape),
+    }
+
+
+def benchmark(matrix) -> pd.DataFrame:
+    """Coverage and Benchmark Ratio for every stored cell, in one vectorized pass."""
+    in_need = matrix['in_need'].tocoo()
+    targeted = matrix['targeted'].tocsr()
+    # Same sparsity pattern by construction; read Targeted at the In Need cells
+    tgt = np.asarray(targeted[in_need.row, in_need.col]).ravel()
+    coverage = tgt / in_need.data
+    n_clusters = len(matrix['clusters'])
+    counts = np.bincount(in_need.col, minlength=n_clusters)
+    sums = np.bincount(in_need.col, weights=coverage, minlength=n_clusters)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cluster_mean = sums / counts
+    mean_at_cell = cluster_mean[in_need.col]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(mean_at_cell > 0, coverage / mean_at_cell, np.nan)
+    frame = pd.DataFrame({
+        'Country ISO3': matrix['countries'][in_need.row],
+        'Cluster': matrix['clusters'][in_need.col],
+        'In Need': in_need.data,
+        'Targeted': tgt,
+        'Coverage': coverage,
+        'Cluster Mean Coverage': mean_at_cell,
+        'Benchmark Ratio': ratio,
+    })
+    return frame.sort_values(['Country ISO3', 'Cluster'], kind='stable').reset_index(drop=True)
+
+
+def build_sector_matrix(path=HNO_PATH) -> pd.DataFrame:
+    return benchmark(build_matrix(country_cluster_totals(load_hno(path))))
+
+
+def underperforming(matrix_df, threshold=UNDERPERFORMING_RATIO) -> pd.DataFrame:
+    """Country-sector pairs whose coverage is below `threshold` × the cluster mean."""
+    return matrix_df[matrix_df['Benchmark Ratio'] < threshold].sort_values('Benchmark Ratio')
+
+
+# ── Fetch / build ────────────────────────────────────────────────────────────
+
+def _replace(path, write):
+    """Write `path` through a unique temp file in its directory, replaced atomically."""
+    fd, tmp_path = tempfile.mkstemp(prefix='.sector-', suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def fetch_hno(path=HNO_PATH, dataset_url=HDX_DATASET_URL, timeout=120) -> str:
+    """Download the HDX resource named like `path` (hpc_hno_2025.csv) to `path`."""
+    import json
+    import urllib.request
+
+    name = os.path.basename(path)
+    with urllib.request.urlopen(dataset_url, timeout=timeout) as resp:
+        resources = json.load(resp)['result']['resources']
+    urls = [r['url'] for r in resources if r.get('name') == name or r.get('url', '').endswith('/' + name)]
+    if not urls:
+        raise FileNotFoundError(f"{name} is not among the resources of {dataset_url}")
+    with urllib.request.urlopen(urls[0], timeout=timeout) as resp:
+        _replace(path, lambda f: shutil.copyfileobj(resp, f))
+    return path
+
+
+def ensure_matrix(hno_path=HNO_PATH, out_path=OUTPUT_PATH, fetch=False) -> bool:
+    """
+    Rebuild `out_path` when it is missing or older than the HNO file (fetched
+    first if missing and `fetch`). Returns whether a matrix is available.
+    """
+    if fetch and not os.path.exists(hno_path):
+        fetch_hno(hno_path)
+    if not os.path.exists(hno_path):
+        return os.path.exists(out_path)
+    if not os.path.exists(out_path) or os.path.getmtime(out_path) < os.path.getmtime(hno_path):
+        result = build_sector_matrix(hno_path)
+        _replace(out_path, lambda f: result.to_csv(f, index=False))
+    return True
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the country × cluster sector matrix.')
+    parser.add_argument('--hno', default=HNO_PATH)
+    parser.add_argument('--out', default=OUTPUT_PATH)
+    parser.add_argument('--fetch', action='store_true', help='download the HNO file from HDX if it is missing')
+    parser.add_argument('--underperforming', help='also write pairs with Benchmark Ratio < 0.5 to this CSV')
+    args = parser.parse_args()
+
+    if args.fetch and not os.path.exists(args.hno):
+        print(f"fetched {fetch_hno(args.hno)}")
+    if not os.path.exists(args.hno):
+        parser.exit(1, f"{args.hno} not found — pass --fetch or download the HNO 2025 cluster file from HDX\n")
+    else:
+        result = build_sector_matrix(args.hno)
+        _replace(args.out, lambda f: result.to_csv(f, index=False))
+        print(f"{len(result)} country-cluster cells, {result['Country ISO3'].nunique()} countries → {args.out}")
+        if args.underperforming:
+            underperforming(result).to_csv(args.underperforming, index=False)
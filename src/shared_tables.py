@@ -0,0 +1,305 @@
+"""
+Cross-process shared-memory data plane.
+
+One publisher process builds each cached table once and writes it as an Arrow
+IPC stream into a `multiprocessing.shared_memory` segment; a small JSON
+manifest names the current, content-hashed version of every table. Streamlit
+workers on the same host attach to those segments instead of holding their
+own copy, so host RAM scales with data size rather than with data size ×
+worker count.
+
+    python src/shared_tables.py publish --watch   # long-running publisher
+    python src/shared_tables.py status
+
+Loaders opt in with the `shared_table` decorator. Whenever no publisher is
+running, pyarrow is missing, or the published table was built from another
+data version than the worker is serving (data_versions.current_version), the
+decorated loader silently falls back to its local st.cache_data path.
+
+st.cache_data hands every caller its own copy; the data plane cannot afford
+that, so each caller gets a shallow copy of the attached frame instead. The
+shared buffers are read-only: adding or replacing columns only changes the
+caller's copy, and under pandas copy-on-write (the default from pandas 3)
+in-place edits copy the touched column first. Without copy-on-write, an
+in-place edit of a shared column raises ValueError ("read-only") rather
+than leaking into other sessions.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+from multiprocessing import shared_memory
+
+from data_versions import current_version
+
+MANIFEST_PATH = os.environ.get(
+    'H2C2_SHARED_MANIFEST', os.path.join(tempfile.gettempdir(), 'h2c2-shared-tables.json')
+)
+ENABLED = os.environ.get('H2C2_SHARED_TABLES', '1') != '0'
+
+# Table name → loader whose result is published
+TABLES = {
+    'country_metrics': 'utils:load_country_metrics',
+    'sector_benchmarking': 'utils:load_sector_benchmarking',
+    'sector_matrix': 'utils:load_sector_matrix',
+    'flagged_regions': 'utils:load_flagged_regions',
+    'forecast': 'utils:load_forecast_data',
+    'high_risk': 'utils:load_high_risk_data',
+    'crisis_entities': 'health_regions:generate_sample_entities',
+}
+
+_lock = threading.Lock()
+_manifest_cache = {'mtime': None, 'tables': {}}
+_attached = {}     # table → (version, SharedMemory, DataFrame); keeps segments mapped
+_superseded = []   # handles of replaced versions, closed once no frame references them
+
+
+# ── Manifest and source freshness ─────────────────────────────────────────────
+
+def _read_manifest():
+    """Parsed manifest, re-read only when its mtime changes; {} when absent."""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != _manifest_cache['mtime']:
+        try:
+            with open(MANIFEST_PATH, encoding='utf-8') as f:
+                tables = json.load(f).get('tables', {})
+        except (OSError, ValueError):
+            return {}
+        _manifest_cache.update(mtime=mtime, tables=tables)
+    return _manifest_cache['tables']
+
+
+def _open_segment(name):
+    # Attaching must not register the segment with this process's resource
+    # tracker, which would unlink it when the worker exits; ownership stays
+    # with the publisher. `track` exists from Python 3.13.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+def attach(table):
+    """
+    DataFrame for `table` backed by the publisher's shared memory, or None when
+    the plane is unavailable or stale. Numeric columns are zero-copy views;
+    every call returns its own shallow copy, so callers never share a frame.
+    """
+    if not ENABLED:
+        return None
+    entry = _read_manifest().get(table)
+    # Only a table built from the data version this worker is serving is used
+    if not entry or entry.get('data_version') != current_version(table):
+        return None
+
+    cached = _attached.get(table)
+    if cached and cached[0] == entry['version']:
+        return cached[2].copy(deep=False)
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    with _lock:
+        cached = _attached.get(table)
+        if cached and cached[0] == entry['version']:
+            return cached[2].copy(deep=False)
+        try:
+            shm = _open_segment(entry['segment'])
+        except FileNotFoundError:
+            return None   # superseded between manifest read and attach
+        reader = pa.ipc.open_stream(pa.py_buffer(shm.buf)[:entry['size']])
+        df = reader.read_all().to_pandas(split_blocks=True)
+        if cached:
+            _superseded.append(cached[1])
+        _attached[table] = (entry['version'], shm, df)
+        _release_superseded()
+    return df.copy(deep=False)
+
+
+def _release_superseded():
+    # A segment cannot be unmapped while a frame still exports its memory
+    # (close() raises BufferError); those stay mapped until sessions drop them.
+    for shm in list(_superseded):
+        try:
+            shm.close()
+        except BufferError:
+            continue
+        _superseded.remove(shm)
+
+
+def shared_table(table):
+    """Serve a zero-arg cached loader from the shared data plane when available."""
+    def decorator(loader):
+        @functools.wraps(loader)
+        def wrapper():
+            df = attach(table)
+            return df if df is not None else loader()
+
+        # Keep the st.cache_data invalidation hook used by data_watch
+        wrapper.clear = getattr(loader, 'clear', lambda: None)
+        return wrapper
+    return decorator
+
+
+# ── Publisher side ────────────────────────────────────────────────────────────
+
+def _resolve_loader(table):
+    import importlib
+
+    module_name, func_name = TABLES[table].split(':', 1)
+    func = getattr(importlib.import_module(module_name), func_name)
+    # Bypass the shared_table wrapper: the publisher must build from source
+    return getattr(func, '__wrapped__', func)
+
+
+def _write_manifest(tables):
+    tmp_path = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'publisher_pid': os.getpid(), 'tables': tables}, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+class Publisher:
+    """Owns the shared segments; unlinks superseded versions after each flip."""
+
+    def __init__(self):
+        self.tables = {}
+        self.segments = {}
+
+    def publish(self, table):
+        import pyarrow as pa
+
+        data_version = current_version(table)
+        loader = _resolve_loader(table)
+        # Loaders run outside any script thread here; their context warnings are noise
+        logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+        if hasattr(loader, 'clear'):
+            loader.clear()
+        df = loader()
+
+        sink = pa.BufferOutputStream()
+        batch_table = pa.Table.from_pandas(df, preserve_index=True)
+        with pa.ipc.new_stream(sink, batch_table.schema) as writer:
+            writer.write_table(batch_table)
+        payload = sink.getvalue()
+
+        version = hashlib.sha256(payload.to_pybytes()).hexdigest()[:16]
+        previous = self.tables.get(table)
+        if previous and previous['version'] == version:
+            # Same content under a new data version: keep the segment, restamp it
+            previous['data_version'] = data_version
+            _write_manifest(self.tables)
+            return previous
+
+        # Short names keep within macOS's 31-character POSIX shm limit
+        segment = f"h2c2_{hashlib.sha256(f'{table}:{version}'.encode()).hexdigest()[:16]}"
+        shm = shared_memory.SharedMemory(name=segment, create=True, size=max(payload.size, 1))
+        shm.buf[:payload.size] = memoryview(payload).cast('B')
+        self.tables[table] = {
+            'segment': segment, 'size': payload.size, 'version': version,
+            'rows': len(df), 'data_version': data_version,
+        }
+        old = self.segments.get(table)
+        self.segments[table] = shm
+        _write_manifest(self.tables)
+        if old is not None:
+            # Workers that already mapped it keep their mapping until they drop it
+            old.close()
+            old.unlink()
+        return self.tables[table]
+
+    def publish_all(self):
+        for table in TABLES:
+            self.publish(table)
+            print(f"published {table}: {self.tables[table]['rows']} rows, "
+                  f"{self.tables[table]['size'] / 1024:.1f} KB, v{self.tables[table]['version']}")
+
+    def republish_for(self, paths):
+        """Republish the tables whose loader reads any of `paths`."""
+        from data_versions import refresh
+        from data_watch import affected_caches
+
+        # Move to the new file versions (a no-op when the watcher already has);
+        # the publisher builds from the new files right away, nothing to serve stale
+        refresh(paths, warm=False, blocking=True)
+        affected = set(affected_caches(paths))
+        for table, call in TABLES.items():
+            if call in affected:
+                info = self.publish(table)
+                print(f"republished {table} → v{info['version']}")
+
+    def close(self):
+        if os.path.exists(MANIFEST_PATH):
+            os.remove(MANIFEST_PATH)
+        for shm in self.segments.values():
+            shm.close()
+            shm.unlink()
+        self.segments.clear()
+
+
+def status():
+    tables = _read_manifest()
+    if not tables:
+        print(f"No publisher manifest at {MANIFEST_PATH}")
+        return
+    for table, entry in tables.items():
+        fresh = entry.get('data_version') == current_version(table)
+        print(f"{table:22s} v{entry['version']}  {entry['rows']:>6} rows  "
+              f"{entry['size'] / 1024:8.1f} KB  {'fresh' if fresh else 'STALE'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared-memory data plane for H2C2 workers.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    pub = sub.add_parser('publish', help='build and publish every table')
+    pub.add_argument('--watch', action='store_true',
+                     help='keep running and republish when data files change')
+    sub.add_parser('status', help='show the published tables')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        status()
+        return
+
+    # Clean up segments and the manifest on `kill` / container stop too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    publisher = Publisher()
+    try:
+        publisher.publish_all()
+        if args.watch:
+            from data_watch import DataWatcher
+
+            watcher = DataWatcher(rewarm=False, on_change=lambda paths, _: publisher.republish_for(paths))
+            watcher.start()
+            print(f"Watching {', '.join(watcher.dirs)} — Ctrl+C to stop")
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,251 @@
+"""
+Row- and cell-level diff between two snapshots of a table.
+
+Both snapshots are hash-joined on the table's natural key (an outer merge),
+so every row is classified as added, removed, changed or unchanged in one
+pass; the common columns are then compared column-wise (numeric columns
+with a relative tolerance, so a CSV round trip is not a change) and each
+changed cell is reported with its old and new value and, for numbers, the
+absolute and relative delta.
+
+The natural key comes from the validation rules (TABLES in validation.py)
+or KEYS for the known source files, else it is inferred from the columns
+(ISO3 plus admin1 name, cluster and year where present).
+
+The data watcher uses `content_changes` to skip invalidation when a file was
+rewritten without any row changing: the last validated snapshot
+(data/validated/<table>.parquet) is diffed against the newly validated
+source, and only files whose rows differ clear their caches.
+
+    python src/snapshot_diff.py OLD.csv NEW.csv                  # summary + changed rows
+    python src/snapshot_diff.py HEAD:data/country_level_summary.csv data/country_level_summary.csv
+    python src/snapshot_diff.py --pending                        # every source vs its last validated snapshot
+"""
+
+import io
+import os
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from validation import OUTPUT_DIR, TABLES, validate, validate_tables
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RTOL = 1e-9
+
+# Source file → natural key, for files without validation rules
+KEYS = {
+    'humanitarian-response-plans.csv': ['internalId'],
+    'hpc_hno_2025.csv': ['Country ISO3', 'Admin 1 PCode', 'Admin 2 PCode', 'Admin 3 PCode', 'Cluster', 'Category'],
+}
+ISO3_COLUMNS = ['iso3_original', 'Country ISO3', 'iso3']
+KEY_EXTRAS = ['Admin 1 Name', 'Cluster', 'year']
+
+
+def _table_for(path):
+    path = os.path.normpath(os.path.abspath(path))
+    for name, spec in TABLES.items():
+        if os.path.normpath(os.path.abspath(spec['source'])) == path:
+            return name
+    return None
+
+
+def natural_key(df, path=None) -> list:
+    name = _table_for(path) if path else None
+    if name:
+        return TABLES[name]['key']
+    if path and os.path.basename(path) in KEYS:
+        return KEYS[os.path.basename(path)]
+    iso3 = next((c for c in ISO3_COLUMNS if c in df.columns), None)
+    key = ([iso3] if iso3 else []) + [c for c in KEY_EXTRAS if c in df.columns]
+    if not key:
+        raise ValueError(f"no natural key found among columns {list(df.columns)}; pass --key")
+    return key
+
+
+def read_snapshot(spec) -> pd.DataFrame:
+    """A CSV or Parquet path, or `REV:path` for the file as committed at a git revision."""
+    if ':' in spec and not os.path.exists(spec):
+        rev, path = spec.split(':', 1)
+        proc = subprocess.run(['git', 'show', f'{rev}:{path}'], cwd=REPO_DIR, capture_output=True)
+        if proc.returncode:
+            raise FileNotFoundError(f"{spec}: {proc.stderr.decode().strip()}")
+        source = io.BytesIO(proc.stdout)
+    else:
+        path, source = spec, spec
+    if path.endswith('.parquet'):
+        return pd.read_parquet(source)
+    # HXL exports carry a tag row under the header
+    head = pd.read_csv(source, nrows=1)
+    hxl = len(head) and str(head.iloc[0, 0]).startswith('#')
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return pd.read_csv(source, low_memory=False, skiprows=[1] if hxl else None)
+
+
+# ── Diff ─────────────────────────────────────────────────────────────────────
+
+def _unequal(old, new, rtol):
+    """Element-wise 'changed' mask; NaN == NaN, numbers within rtol are equal."""
+    if pd.api.types.is_numeric_dtype(old) and pd.api.types.is_numeric_dtype(new):
+        a, b = old.to_numpy(dtype=float), new.to_numpy(dtype=float)
+        return ~np.isclose(a, b, rtol=rtol, atol=0.0, equal_nan=True)
+    a, b = old.astype(object), new.astype(object)
+    both_missing = a.isna().to_numpy() & b.isna().to_numpy()
+    return ~((a == b).to_numpy(dtype=bool) | both_missing)
+
+
+def diff_frames(old, new, key, rtol=RTOL) -> dict:
+    """
+    {'summary': counts, 'rows': key + change per differing row,
+     'cells': key + column, old, new, delta, rel_delta per changed cell}.
+    """
+    for label, df in (('old', old), ('new', new)):
+        dupes = int(df.duplicated(key).sum())
+        if dupes:
+            raise ValueError(f"{dupes} duplicate {key} keys in the {label} snapshot; pass a finer --key")
+    common = [c for c in old.columns if c in new.columns and c not in key]
+    joined = old[key + common].merge(new[key + common], on=key, how='outer', suffixes=('\0old', '\0new'),
+                                     indicator=True)
+    both = (joined['_merge'] == 'both').to_numpy()
+
+    changed_any = np.zeros(len(joined), dtype=bool)
+    cells, changed_by_column = [], {}
+    for col in common:
+        o, n = joined[f'{col}\0old'], joined[f'{col}\0new']
+        mask = _unequal(o, n, rtol) & both
+        if not mask.any():
+            continue
+        changed_any |= mask
+        changed_by_column[col] = int(mask.sum())
+        frame = joined.loc[mask, key].copy()
+        frame['column'] = col
+        frame['old'] = o[mask].astype(object).to_numpy()
+        frame['new'] = n[mask].astype(object).to_numpy()
+        if pd.api.types.is_numeric_dtype(o) and pd.api.types.is_numeric_dtype(n):
+            delta = n[mask].to_numpy(dtype=float) - o[mask].to_numpy(dtype=float)
+            base = np.abs(o[mask].to_numpy(dtype=float))
+            frame['delta'] = delta
+            # Relative change is undefined from zero
+            frame['rel_delta'] = np.divide(delta, base, out=np.full(len(delta), np.nan), where=base > 0)
+        else:
+            frame['delta'] = frame['rel_delta'] = np.nan
+        cells.append(frame)
+
+    change = np.select([joined['_merge'] == 'right_only', joined['_merge'] == 'left_only', changed_any],
+                       ['added', 'removed', 'changed'], 'unchanged')
+    rows = joined.loc[change != 'unchanged', key].assign(change=change[change != 'unchanged'])
+    counts = pd.Series(change).value_counts()
+    summary = {
+        'key': key,
+        **{k: int(counts.get(k, 0)) for k in ('added', 'removed', 'changed', 'unchanged')},
+        'columns_added': [c for c in new.columns if c not in old.columns],
+        'columns_removed': [c for c in old.columns if c not in new.columns],
+        'changed_by_column': changed_by_column,
+    }
+    cells = (pd.concat(cells, ignore_index=True) if cells
+             else pd.DataFrame(columns=key + ['column', 'old', 'new', 'delta', 'rel_delta']))
+    return {'summary': summary, 'rows': rows.reset_index(drop=True), 'cells': cells}
+
+
+def has_changes(result) -> bool:
+    s = result['summary']
+    return bool(s['added'] or s['removed'] or s['changed'] or s['columns_added'] or s['columns_removed'])
+
+
+def diff_files(old_spec, new_spec, key=None, rtol=RTOL) -> dict:
+    old, new = read_snapshot(old_spec), read_snapshot(new_spec)
+    path = new_spec.split(':', 1)[1] if ':' in new_spec and not os.path.exists(new_spec) else new_spec
+    return diff_frames(old, new, key or natural_key(new, path), rtol)
+
+
+# ── Refresh driver ───────────────────────────────────────────────────────────
+
+def pending_diff(name, out_dir=OUTPUT_DIR):
+    """Source of validated table `name` vs its last validated snapshot; None when never validated."""
+    spec = TABLES[name]
+    snapshot = os.path.join(out_dir, f'{name}.parquet')
+    if not os.path.exists(snapshot) or not os.path.exists(spec['source']):
+        return None
+    new = validate(pd.read_csv(spec['source']), spec)[0]
+    return diff_frames(pd.read_parquet(snapshot), new, spec['key'])
+
+
+def content_changes(paths, out_dir=OUTPUT_DIR, log=None) -> list:
+    """
+    The subset of changed `paths` whose rows actually differ from the last
+    validated snapshot. Files without validation rules, or never validated,
+    are always returned. Changed tables are re-validated on the way.
+    """
+    changed = []
+    for path in paths:
+        name = _table_for(path)
+        try:
+            result = pending_diff(name, out_dir) if name else None
+        except (OSError, ValueError, KeyError) as exc:
+            if log:
+                log(f"diff of {os.path.basename(path)} failed ({exc}); treating it as changed")
+            result = None
+        if result is None:
+            changed.append(path)
+            continue
+        if has_changes(result):
+            changed.append(path)
+            if log:
+                s = result['summary']
+                log(f"{os.path.basename(path)}: {s['added']} added, {s['removed']} removed, "
+                    f"{s['changed']} changed rows")
+        elif log:
+            log(f"{os.path.basename(path)} rewritten without row changes; caches kept")
+        # Record the new source hash so clean_table does not re-validate it again
+        validate_tables([name], out_dir)
+    return changed
+
+
+def _print(result, limit):
+    s = result['summary']
+    print(f"key {s['key']}: {s['added']} added, {s['removed']} removed, {s['changed']} changed, "
+          f"{s['unchanged']} unchanged")
+    if s['columns_added'] or s['columns_removed']:
+        print(f"  columns added {s['columns_added']}, removed {s['columns_removed']}")
+    for col, count in s['changed_by_column'].items():
+        print(f"  {col:<28} {count:>7} cells")
+    if len(result['cells']):
+        with pd.option_context('display.width', 160, 'display.max_colwidth', 40):
+            print(result['cells'].head(limit).to_string(index=False))
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Diff two snapshots of a table on its natural key.')
+    parser.add_argument('old', nargs='?', help='old snapshot: path or REV:path')
+    parser.add_argument('new', nargs='?', help='new snapshot: path or REV:path')
+    parser.add_argument('--key', nargs='+', help='natural key columns (default: from the validation rules)')
+    parser.add_argument('--rtol', type=float, default=RTOL, help='relative tolerance for numeric cells')
+    parser.add_argument('--out', help='write rows.csv and cells.csv to this directory')
+    parser.add_argument('--limit', type=int, default=20, help='changed cells to print')
+    parser.add_argument('--pending', action='store_true', help='diff every source against its validated snapshot')
+    args = parser.parse_args()
+
+    if args.pending:
+        for name in TABLES:
+            result = pending_diff(name)
+            if result is None:
+                print(f"{name}: not validated yet")
+            elif has_changes(result):
+                print(f"{name}:")
+                _print(result, args.limit)
+            else:
+                print(f"{name}: no changes")
+        sys.exit(0)
+    if not (args.old and args.new):
+        parser.error('OLD and NEW snapshots are required (or use --pending)')
+    result = diff_files(args.old, args.new, args.key, args.rtol)
+    _print(result, args.limit)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        result['rows'].to_csv(os.path.join(args.out, 'rows.csv'), index=False)
+        result['cells'].to_csv(os.path.join(args.out, 'cells.csv'), index=False)
@@ -0,0 +1,240 @@
+"""
+End-to-end forecasting pipeline as a PySpark job.
+
+Same stages as models/ML_Forecasting.ipynb, but reading the repo's data files
+(or any DBFS / cloud path) instead of Colab's /content/:
+
+    1. load + HXL cleanup      spark.read.csv, tag row dropped, summary joined
+    2. feature engineering     groupBy('iso3').applyInPandas(build_features)
+                               + global medians via percentile()
+    3. funding trends          groupBy('iso3').applyInPandas(Prophet per country)
+    4. needs/requirements      XGBoost fitted on the driver, broadcast, and
+                               scored per country with applyInPandas
+    5. gap / risk merge        Spark expressions → forecast + high-risk tables
+
+The per-group functions are the same pandas code the app and backtests use
+(forecast_features, forecast_model, trend_engine), shipped to executors with
+addPyFile. Running on a cluster is a matter of --master (or none at all on
+Databricks, where the session already exists):
+
+    python src/spark_pipeline.py --master "local[*]" --out /tmp/h2c2-forecast
+    python src/spark_pipeline.py --engine linear --compare   # no Prophet needed
+
+Requires pyspark (and prophet for --engine prophet) on the driver and executors.
+"""
+
+import argparse
+import os
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SRC_DIR, '..', 'data')
+MODELS_DIR = os.path.join(SRC_DIR, '..', 'models')
+
+# Modules whose pandas functions run inside applyInPandas on executors
+EXECUTOR_MODULES = ['forecast_features.py', 'forecast_model.py', 'trend_engine.py']
+
+OUTPUT_COLUMNS = ['iso3', 'year', 'Predicted_In_Need', 'Predicted_Requirements', 'Predicted_Funding',
+                  'iso3_original', 'Funding_Gap', 'Risk_Flag']
+RISK_MULTIPLIER = 1.15
+
+
+def get_spark(master=None, app_name='h2c2-forecast'):
+    from pyspark.sql import SparkSession
+
+    builder = SparkSession.builder.appName(app_name)
+    if master:
+        builder = builder.master(master)
+    spark = (builder
+             .config('spark.sql.execution.arrow.pyspark.enabled', 'true')
+             .getOrCreate())
+    for module in EXECUTOR_MODULES:
+        spark.sparkContext.addPyFile(os.path.join(SRC_DIR, module))
+    return spark
+
+
+# ── 1. Load ──────────────────────────────────────────────────────────────────
+
+def load_panel(spark, data_dir=DATA_DIR):
+    """HRP plans (HXL row dropped) left-joined with the country summary."""
+    from pyspark.sql import functions as F
+
+    hrp = (spark.read.option('header', True).csv(os.path.join(data_dir, 'humanitarian-response-plans.csv'))
+           # Null-safe: a plan without a code (the 2014 Syria RRP) is data, not the HXL row
+           .filter(F.col('code').isNull() | ~F.col('code').startswith('#'))
+           .withColumnRenamed('locations', 'iso3')
+           .withColumnRenamed('years', 'year')
+           # try_cast: unparseable values become null as with pd.to_numeric(errors='coerce'), also under ANSI mode
+           .withColumn('year', F.coalesce(F.expr('try_cast(`year` AS INT)'), F.lit(0)))
+           .withColumn('origRequirements', F.expr('try_cast(`origRequirements` AS DOUBLE)'))
+           .withColumn('revisedRequirements', F.expr('try_cast(`revisedRequirements` AS DOUBLE)'))
+           # File order breaks ties between plans of the same country-year, as in pandas
+           .withColumn('_row', F.monotonically_increasing_id()))
+
+    summary = (spark.read.option('header', True).option('inferSchema', True)
+               .csv(os.path.join(data_dir, 'country_level_summary (1).csv'))
+               .withColumnRenamed('Country ISO3', 'iso3'))
+    for col in summary.columns:
+        if col != 'iso3' and col in hrp.columns:
+            summary = summary.withColumnRenamed(col, f'{col}_summary')
+
+    panel = hrp.join(summary, on='iso3', how='left')
+    for col in ('In Need', 'Targeted', 'Total_Population'):
+        panel = panel.withColumn(col, F.expr(f'try_cast(`{col}` AS DOUBLE)'))
+    return panel
+
+
+# ── 2. Features ──────────────────────────────────────────────────────────────
+
+def engineer_features(panel):
+    """Per-country features with applyInPandas, then the notebook's global fills."""
+    from pyspark.sql import functions as F
+    from pyspark.sql import types as T
+
+    from forecast_features import FILL_STRATEGIES, NUMERIC_COLS
+
+    # Only what build_features reads: no summary columns through Arrow and the shuffle
+    panel = panel.select('iso3', 'year', '_row', *[f'`{c}`' for c in NUMERIC_COLS])
+    feature_cols = list(FILL_STRATEGIES)
+    schema = T.StructType(panel.schema.fields + [T.StructField(c, T.DoubleType()) for c in feature_cols
+                                                 if c not in panel.columns])
+    columns = [f.name for f in schema.fields]
+
+    def features_udf(pdf):
+        from forecast_features import build_features
+
+        pdf = pdf.sort_values('_row', kind='stable')
+        return build_features(pdf, fill=False)[columns]
+
+    featured = panel.groupBy('iso3').applyInPandas(features_udf, schema=schema)
+
+    fills = {}
+    medians = featured.agg(*[
+        F.expr(f'percentile(`{col}`, 0.5)').alias(col)
+        for col, strategy in FILL_STRATEGIES.items() if strategy == 'median'
+    ]).first().asDict()
+    for col, strategy in FILL_STRATEGIES.items():
+        fills[col] = medians[col] if strategy == 'median' else float(strategy)
+    return featured.fillna(fills)
+
+
+# ── 3. Funding trends ────────────────────────────────────────────────────────
+
+def forecast_funding(panel, engine='prophet'):
+    """Stage A per country; engine is 'prophet' (notebook) or a trend_engine batch engine."""
+    schema = 'iso3 string, year int, Predicted_Funding double'
+
+    def funding_udf(pdf):
+        import pandas as pd
+        from trend_engine import forecast_funding as _forecast
+
+        try:
+            out = _forecast(pdf, engine)
+        except Exception:
+            # A failed fit drops the country, as the notebook's try/except did
+            return pd.DataFrame(columns=['iso3', 'year', 'Predicted_Funding'])
+        return out[['iso3', 'year', 'Predicted_Funding']].astype({'year': 'int32'})
+
+    rows = panel.select('iso3', 'year', 'revisedRequirements').filter('revisedRequirements IS NOT NULL')
+    return rows.groupBy('iso3').applyInPandas(funding_udf, schema=schema)
+
+
+# ── 4. Needs / requirements ──────────────────────────────────────────────────
+
+def forecast_needs(spark, featured):
+    """Fit both XGBoost models on the driver, broadcast them, score every country in parallel."""
+    from forecast_features import FEATURES, TARGETS
+    from forecast_model import fit_needs_models
+
+    # Rows in build_features order (iso3, year, file order), so the fit sees what the pandas path sees
+    training = (featured.orderBy('iso3', 'year', '_row')
+                .select(*[f'`{c}`' for c in FEATURES + TARGETS]).dropna().toPandas())
+    models = spark.sparkContext.broadcast(fit_needs_models(training))
+
+    keep = ['iso3', '_row'] + FEATURES
+    schema = 'iso3 string, year int, Predicted_In_Need double, Predicted_Requirements double'
+
+    def score_udf(pdf):
+        from forecast_model import score_horizon
+
+        pdf = pdf.sort_values('_row', kind='stable')
+        out = score_horizon(models.value, pdf)
+        return out[['iso3', 'year', 'Predicted_In_Need', 'Predicted_Requirements']].astype({'year': 'int32'})
+
+    return featured.select(*[f'`{c}`' for c in keep]).groupBy('iso3').applyInPandas(score_udf, schema=schema)
+
+
+# ── 5. Gap / risk merge ──────────────────────────────────────────────────────
+
+def merge_forecasts(needs, funding):
+    """The notebook's final cell as Spark expressions (no per-row Python)."""
+    from pyspark.sql import functions as F
+
+    final = (needs.join(funding, on=['iso3', 'year'], how='left')
+             .fillna({'Predicted_Funding': 0.0})
+             .withColumn('iso3_original', F.col('iso3')))
+    # clean_iso3: last non-empty pipe component, e.g. " |  | NPL" → "NPL"
+    last_code = F.regexp_extract(F.col('iso3'), r'([^|\s]+)[|\s]*$', 1)
+    final = final.withColumn('iso3', F.when(last_code != '', last_code).otherwise(F.col('iso3')))
+    final = (final
+             .withColumn('Funding_Gap', F.col('Predicted_Requirements') - F.col('Predicted_Funding'))
+             .withColumn('Risk_Flag', F.col('Predicted_Requirements') > F.col('Predicted_Funding') * RISK_MULTIPLIER))
+    return final.select(*OUTPUT_COLUMNS)
+
+
+def run(spark, data_dir=DATA_DIR, engine='prophet'):
+    """Return (forecast, high_risk) Spark DataFrames."""
+    panel = load_panel(spark, data_dir).cache()
+    featured = engineer_features(panel).cache()
+    final = merge_forecasts(forecast_needs(spark, featured), forecast_funding(panel, engine)).cache()
+    high_risk = final.filter('Risk_Flag').orderBy(final['Funding_Gap'].desc())
+    return final, high_risk
+
+
+def compare_with_reference(forecast_pdf, models_dir=MODELS_DIR) -> dict:
+    """Largest relative differences against the committed forecast_results_2026_2030.csv."""
+    import numpy as np
+    import pandas as pd
+
+    ref = pd.read_csv(os.path.join(models_dir, 'forecast_results_2026_2030.csv'))
+    keys = ['iso3_original', 'year']
+    both = ref.merge(forecast_pdf, on=keys, suffixes=('_ref', ''))
+    report = {'reference_rows': len(ref), 'output_rows': len(forecast_pdf), 'matched_rows': len(both)}
+    for col in ('Predicted_In_Need', 'Predicted_Requirements', 'Predicted_Funding', 'Funding_Gap'):
+        scale = np.maximum(both[f'{col}_ref'].abs(), 1.0)
+        report[f'{col}_max_rel_diff'] = float(((both[col] - both[f'{col}_ref']).abs() / scale).max())
+    report['Risk_Flag_agreement'] = float((both['Risk_Flag'] == both['Risk_Flag_ref']).mean())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the forecasting pipeline on Spark.')
+    parser.add_argument('--master', default=os.environ.get('SPARK_MASTER') or
+                        (None if os.environ.get('DATABRICKS_RUNTIME_VERSION') else 'local[*]'),
+                        help="Spark master (default local[*]; omitted on Databricks)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--out', default=os.path.join(MODELS_DIR, 'spark'),
+                        help='directory for forecast_results_2026_2030.csv / high_neglect_risk_2026_2030.csv')
+    parser.add_argument('--engine', default='prophet', choices=['prophet', 'linear', 'damped'],
+                        help='stage A funding engine')
+    parser.add_argument('--compare', action='store_true', help='diff the output against models/*.csv')
+    args = parser.parse_args()
+
+    spark = get_spark(args.master)
+    forecast, high_risk = run(spark, args.data_dir, args.engine)
+    # The outputs are a few thousand rows: collect and write single CSVs like the notebook
+    forecast_pdf = forecast.orderBy('iso3_original', 'year').toPandas()
+    risk_pdf = high_risk.toPandas()
+    os.makedirs(args.out, exist_ok=True)
+    forecast_pdf.to_csv(os.path.join(args.out, 'forecast_results_2026_2030.csv'), index=False)
+    risk_pdf.to_csv(os.path.join(args.out, 'high_neglect_risk_2026_2030.csv'), index=False)
+    print(f"wrote {len(forecast_pdf)} forecast rows, {len(risk_pdf)} high-risk rows to {args.out}")
+    if args.compare:
+        for key, value in compare_with_reference(forecast_pdf).items():
+            print(f"  {key}: {value}")
+    spark.stop()
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, SRC_DIR)
+    main()
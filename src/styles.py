@@ -2,6 +2,12 @@
 Styling and CSS management for H2C2 application
 """
 
+import functools
+import hashlib
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
 def get_theme_colors(theme):
     """Get color scheme based on current theme"""
     if theme == 'dark':
@@ -587,19 +593,29 @@ def get_main_css(theme_colors):
 """
 
 
+def _nav_colors(theme, app_bg=None):
+    """Navigation bar palette for a theme"""
+    if theme == 'dark':
+        return {
+            'nav_text': '#9ca3af',
+            'nav_accent': '#00ff41',
+            'nav_hover': '#00ff41',
+            'nav_bg': app_bg or '#060911',
+        }
+    return {
+        'nav_text': '#475569',
+        'nav_accent': '#2563eb',
+        'nav_hover': '#1d4ed8',
+        'nav_bg': '#f8fafc',
+    }
+
+
 def get_nav_css(theme, wrapper_class='nav-wrapper', app_bg=None):
     """Generate navigation bar CSS with theme support"""
-    if theme == 'dark':
-        nav_text = '#9ca3af'
-        nav_accent = '#00ff41'
-        nav_hover = '#00ff41'
-        nav_bg = app_bg or '#060911'
-    else:
-        nav_text = '#475569'
-        nav_accent = '#2563eb'
-        nav_hover = '#1d4ed8'
-        nav_bg = '#f8fafc'
-    
+    return _nav_rules(wrapper_class, **_nav_colors(theme, app_bg))
+
+
+def _nav_rules(wrapper_class, nav_text, nav_accent, nav_hover, nav_bg):
     return f"""
 <style>
 /* Force navigation row to use flexbox with center alignment */
@@ -856,6 +872,246 @@ body{background:#0a0e1a;font-family:'Space Mono', monospace;padding:14px 4px 32p
 .red{color:#ef4444;}
 """
 
+# ── Genie chat widget CSS ─────────────────────────────────────────────────────
+# The widget is injected into the parent document, so these rules ship inside the
+# compiled theme stylesheet rather than being pushed through the iframe each rerun.
+GENIE_WIDGET_CSS = """
+  #genie-widget {
+    position: fixed;
+    bottom: 28px;
+    right: 28px;
+    z-index: 2147483647;
+    font-family: 'Space Mono', monospace;
+  }
+  #genie-toggle {
+    display: flex;
+    align-items: center;
+    gap: 10px;
+    background: linear-gradient(135deg, #0d1f0d 0%, #0a1a1f 100%);
+    border: 1.5px solid rgba(74,222,128,0.65);
+    border-radius: 34px;
+    padding: 14px 24px 14px 18px;
+    cursor: pointer;
+    color: #4ade80;
+    font-size: 0.9rem;
+    font-weight: 700;
+    letter-spacing: 0.13em;
+    text-transform: uppercase;
+    box-shadow: 0 0 28px rgba(74,222,128,0.25), 0 6px 28px rgba(0,0,0,0.7);
+    transition: all 0.25s ease;
+    user-select: none;
+    outline: none;
+  }
+  #genie-toggle:hover {
+    background: linear-gradient(135deg, #0f2a0f 0%, #0a2030 100%);
+    border-color: rgba(74,222,128,0.9);
+    box-shadow: 0 0 40px rgba(74,222,128,0.38), 0 8px 36px rgba(0,0,0,0.8);
+    transform: translateY(-2px);
+  }
+  .genie-btn-dot {
+    width: 10px; height: 10px; background: #4ade80; border-radius: 50%;
+    box-shadow: 0 0 9px #4ade80; animation: gpulse 2s infinite; flex-shrink: 0;
+  }
+  @keyframes gpulse {
+    0%, 100% { opacity: 1; transform: scale(1); }
+    50%       { opacity: 0.45; transform: scale(0.72); }
+  }
+  #genie-panel {
+    display: none; flex-direction: column;
+    width: 490px; height: 590px;
+    background: rgba(10,14,26,0.98);
+    border: 1px solid rgba(74,222,128,0.32); border-radius: 18px;
+    overflow: hidden;
+    box-shadow: 0 0 52px rgba(74,222,128,0.15), 0 28px 72px rgba(0,0,0,0.88);
+    margin-bottom: 16px; animation: gslide 0.28s ease; position: relative;
+  }
+  #genie-panel.open { display: flex; }
+  @keyframes gslide {
+    from { opacity: 0; transform: translateY(22px); }
+    to   { opacity: 1; transform: translateY(0); }
+  }
+  #genie-header {
+    display: flex; align-items: center; justify-content: space-between;
+    padding: 17px 19px 15px;
+    background: linear-gradient(135deg, rgba(13,20,36,0.99) 0%, rgba(10,26,20,0.99) 100%);
+    border-bottom: 1px solid rgba(74,222,128,0.18); flex-shrink: 0;
+  }
+  .ghdr-left { display: flex; align-items: center; gap: 12px; }
+  .gavatar {
+    width: 38px; height: 38px;
+    background: linear-gradient(135deg, #0d3321, #0a2030);
+    border: 1px solid rgba(74,222,128,0.55); border-radius: 10px;
+    display: flex; align-items: center; justify-content: center;
+    font-size: 19px; box-shadow: 0 0 14px rgba(74,222,128,0.24); flex-shrink: 0;
+  }
+  .gtname { color: #e2e8f0; font-size: 0.9rem; font-weight: 700; letter-spacing: 0.1em; display: block; }
+  .gtsub  { color: #4ade80; font-size: 0.68rem; letter-spacing: 0.07em; opacity: 0.82; display: block; margin-top: 1px; }
+  .ghdr-status { width: 8px; height: 8px; background: #4ade80; border-radius: 50%; box-shadow: 0 0 8px #4ade80; animation: gpulse 2s infinite; }
+  #genie-closebtn {
+    background: none; border: none; color: #475569; cursor: pointer;
+    font-size: 1.18rem; padding: 3px 7px; border-radius: 5px; line-height: 1;
+    transition: color 0.2s; outline: none; margin-left: 8px;
+  }
+  #genie-closebtn:hover { color: #e2e8f0; }
+  #genie-prompts {
+    display: flex; flex-wrap: wrap; gap: 7px; padding: 12px 17px;
+    border-bottom: 1px solid rgba(148,163,184,0.07); flex-shrink: 0;
+  }
+  .gchip {
+    background: rgba(74,222,128,0.07); border: 1px solid rgba(74,222,128,0.22);
+    border-radius: 22px; padding: 5px 12px; font-size: 0.67rem; color: #94a3b8;
+    cursor: pointer; letter-spacing: 0.04em; transition: all 0.2s; white-space: nowrap;
+    font-family: 'Space Mono', monospace;
+  }
+  .gchip:hover { background: rgba(74,222,128,0.15); border-color: rgba(74,222,128,0.52); color: #4ade80; }
+  #genie-messages {
+    flex: 1; overflow-y: auto; padding: 17px;
+    display: flex; flex-direction: column; gap: 14px;
+    scrollbar-width: thin; scrollbar-color: rgba(74,222,128,0.18) transparent;
+  }
+  #genie-messages::-webkit-scrollbar { width: 4px; }
+  #genie-messages::-webkit-scrollbar-track { background: transparent; }
+  #genie-messages::-webkit-scrollbar-thumb { background: rgba(74,222,128,0.2); border-radius: 2px; }
+  .gmsg { display: flex; gap: 9px; max-width: 93%; }
+  .gmsg.user { align-self: flex-end; flex-direction: row-reverse; }
+  .gmsg.bot  { align-self: flex-start; }
+  .gmsg-ico {
+    width: 27px; height: 27px; border-radius: 7px; flex-shrink: 0;
+    display: flex; align-items: center; justify-content: center;
+    font-size: 13px; margin-top: 2px;
+  }
+  .gmsg.bot  .gmsg-ico { background: linear-gradient(135deg,#0d3321,#0a2030); border: 1px solid rgba(74,222,128,0.38); color: #4ade80; }
+  .gmsg.user .gmsg-ico { background: rgba(74,222,128,0.13); border: 1px solid rgba(74,222,128,0.32); color: #4ade80; }
+  .gbubble { padding: 10px 14px; border-radius: 11px; font-size: 0.82rem; line-height: 1.58; max-width: 100%; word-break: break-word; }
+  .gmsg.bot  .gbubble { background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.12); color: #cbd5e1; }
+  .gmsg.user .gbubble { background: rgba(74,222,128,0.12); border: 1px solid rgba(74,222,128,0.26); color: #e2e8f0; }
+  .gbubble em { color: #4ade80; font-style: normal; font-size: 0.74rem; }
+  .gbubble .sqlblk {
+    background: rgba(0,0,0,0.45); border: 1px solid rgba(74,222,128,0.16); border-radius: 7px;
+    padding: 7px 10px; font-size: 0.71rem; color: #86efac; margin-top: 7px;
+    font-family: 'Space Mono', monospace; overflow-x: auto; white-space: pre-wrap;
+  }
+  .gbubble.gerr { background: rgba(239,68,68,0.1); border: 1px solid rgba(239,68,68,0.28); color: #fca5a5; }
+  .genie-tbl-wrap { overflow-x: auto; margin-top: 8px; border-radius: 7px; }
+  .genie-tbl { width: 100%; border-collapse: collapse; font-size: 0.72rem; }
+  .genie-tbl th { background: rgba(74,222,128,0.1); color: #4ade80; padding: 5px 9px; text-align: left; border-bottom: 1px solid rgba(74,222,128,0.2); white-space: nowrap; }
+  .genie-tbl td { color: #94a3b8; padding: 4px 9px; border-bottom: 1px solid rgba(148,163,184,0.07); }
+  .genie-tbl tr:hover td { background: rgba(74,222,128,0.04); }
+  #genie-typing { display: none; align-self: flex-start; align-items: center; gap: 9px; padding: 0 2px; }
+  #genie-typing.on { display: flex; }
+  .gdots { display: flex; gap: 5px; background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.12); border-radius: 11px; padding: 10px 15px; }
+  .gdot { width: 6px; height: 6px; background: #4ade80; border-radius: 50%; animation: gbounce 1.2s infinite; }
+  .gdot:nth-child(2) { animation-delay: 0.22s; }
+  .gdot:nth-child(3) { animation-delay: 0.44s; }
+  @keyframes gbounce {
+    0%,80%,100% { transform: translateY(0); opacity: 0.32; }
+    40%          { transform: translateY(-7px); opacity: 1; }
+  }
+  #genie-inputrow {
+    display: flex; align-items: center; gap: 9px; padding: 14px 17px;
+    border-top: 1px solid rgba(74,222,128,0.14); background: rgba(8,12,22,0.97); flex-shrink: 0;
+  }
+  #genie-input {
+    flex: 1; background: rgba(15,25,45,0.93); border: 1px solid rgba(74,222,128,0.23);
+    border-radius: 9px; padding: 10px 14px; color: #e2e8f0; font-size: 0.82rem;
+    font-family: 'Space Mono', monospace; outline: none; transition: border-color 0.2s;
+  }
+  #genie-input:focus { border-color: rgba(74,222,128,0.58); }
+  #genie-input::placeholder { color: #475569; }
+  #genie-input:disabled { opacity: 0.5; }
+  #genie-sendbtn {
+    width: 40px; height: 40px; background: linear-gradient(135deg, #166534, #0a2030);
+    border: 1px solid rgba(74,222,128,0.44); border-radius: 9px; cursor: pointer;
+    display: flex; align-items: center; justify-content: center;
+    flex-shrink: 0; transition: all 0.2s; color: #4ade80; outline: none;
+  }
+  #genie-sendbtn:hover { background: linear-gradient(135deg, #15803d, #0e3040); border-color: rgba(74,222,128,0.75); transform: scale(1.05); }
+  #genie-sendbtn:disabled { opacity: 0.36; cursor: not-allowed; transform: none; }
+"""
+
+# Hidden Streamlit form that bridges the widget to Python (kept offscreen).
+GENIE_FORM_CSS = """
+[data-testid="stForm"]:has(input[placeholder="__genie__"]) {
+    position:fixed!important;left:-9999px!important;top:0!important;
+    width:1px!important;height:1px!important;overflow:hidden!important;
+    opacity:0!important;
+}
+[data-testid="stForm"]:has(input[placeholder="__genie__"]) button,
+[data-testid="stForm"]:has(input[placeholder="__genie__"]) input {
+    pointer-events:auto!important;
+}
+"""
+
+# ── Compiled theme stylesheet ─────────────────────────────────────────────────
+# Every parent-document rule (main, nav, Genie) is compiled once against CSS
+# variables and written to src/static/ under a content hash. Pages link it once;
+# switching theme only swaps a marker element that selects the variable set.
+
+_NAV_WRAPPERS = ('nav-wrapper', 'nav-wrapper-dashboard')
+
+
+def _css_var(key):
+    return f"--h2c2-{key.replace('_', '-')}"
+
+
+def _theme_palette(theme):
+    colors = get_theme_colors(theme)
+    return {**colors, **_nav_colors(theme, colors['app_bg'])}
+
+
+def _strip_style_tags(css):
+    return css.strip().removeprefix('<style>').removesuffix('</style>')
+
+
+def build_theme_stylesheet():
+    """Compile all parent-document CSS into one theme-agnostic stylesheet"""
+    var_refs = {key: f'var({_css_var(key)})' for key in _theme_palette('dark')}
+    main_refs = {key: var_refs[key] for key in get_theme_colors('dark')}
+    nav_refs = {key: var_refs[key] for key in _nav_colors('dark')}
+
+    def _declarations(theme):
+        return '\n'.join(f'    {_css_var(k)}: {v};' for k, v in _theme_palette(theme).items())
+
+    # The main sheet opens with @import, which must stay the first rule
+    parts = [_strip_style_tags(get_main_css(main_refs))]
+    parts += [_strip_style_tags(_nav_rules(w, **nav_refs)) for w in _NAV_WRAPPERS]
+    parts += [GENIE_FORM_CSS, GENIE_WIDGET_CSS]
+    parts.append(f':root {{\n{_declarations("dark")}\n}}')
+    parts.append(f':root:has(.h2c2-theme-light) {{\n{_declarations("light")}\n}}')
+    return '\n'.join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def get_theme_stylesheet():
+    """
+    Write the compiled stylesheet to src/static/ once per process.
+    Returns (url, css); url is None when the static dir is not writable.
+    """
+    css = build_theme_stylesheet()
+    name = f"h2c2.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]}.css"
+    path = os.path.join(STATIC_DIR, name)
+    try:
+        if not os.path.exists(path):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(css)
+            os.replace(tmp_path, path)
+    except OSError:
+        return None, css
+    return f'app/static/{name}', css
+
+
+def get_theme_head_html(theme):
+    """Per-rerun markup: the stylesheet link plus the active-theme marker"""
+    url, css = get_theme_stylesheet()
+    marker = f'<span class="h2c2-theme-{theme}" style="display:none"></span>'
+    if url is None:
+        # Static serving unavailable: fall back to inlining the compiled sheet
+        return f'<style>{css}</style>{marker}'
+    return f'<link rel="stylesheet" href="{url}">{marker}'
+
+
 # ── About page iframe CSS ──────────────────────────────────────────────────────
 _ABOUT_CSS_BASE = """
   @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
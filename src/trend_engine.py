@@ -0,0 +1,250 @@
+"""
+Funding trend engines (stage A of models/ML_Forecasting.ipynb).
+
+The notebook fits one Prophet model per country on 3–25 yearly
+revisedRequirements totals with every seasonality disabled — in effect a
+regularised piecewise-linear trend, at the cost of a cmdstan fit per country.
+The "linear" and "damped" engines here fit every country at once: the yearly
+series are pivoted into a countries × years matrix and a trend basis is solved
+for all rows as one batched weighted least-squares problem (missing years get
+zero weight). Prediction intervals come from each country's residual variance.
+
+    engine    fit                                   needs
+    linear    OLS trend, straight-line extrapolation NumPy
+    damped    same fit, slope damped by phi per year NumPy
+    prophet   the notebook's per-country Prophet     prophet + cmdstan
+
+    python src/trend_engine.py --engine damped        # print the 2026–2030 forecast
+    python -m pytest tests/test_trend_engine.py       # hold-out errors, agreement with Prophet output
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+HORIZON = [2026, 2027, 2028, 2029, 2030]
+TRAIN_END = 2025
+MIN_POINTS = 3          # the notebook skips countries with fewer training years
+INTERVAL_WIDTH = 0.8    # Prophet's default interval_width
+DAMPING = 0.9
+
+ENGINES = ('linear', 'damped', 'prophet')
+
+
+# ── Input series ─────────────────────────────────────────────────────────────
+
+def yearly_matrix(panel, value_col='revisedRequirements', key='iso3', train_end=TRAIN_END):
+    """
+    Countries × years matrix of yearly totals (NaN where a country has no
+    plan), restricted to years ≤ train_end. Returns (matrix, keys, years).
+    """
+    rows = panel[panel[value_col].notna() & panel[key].notna() & (panel['year'] <= train_end)]
+    totals = rows.groupby([key, 'year'])[value_col].sum()
+    wide = totals.unstack('year').sort_index(axis=1)
+    return wide.to_numpy(dtype=float), wide.index.to_numpy(), wide.columns.to_numpy()
+
+
+# ── Batched least squares ────────────────────────────────────────────────────
+
+def _trend_basis(years, origin):
+    t = np.asarray(years, dtype=float) - origin
+    return np.column_stack([np.ones_like(t), t])
+
+
+def fit_trends(matrix, keys, years, min_points=MIN_POINTS) -> pd.DataFrame:
+    """
+    Fit y = a + b·(year − origin) for every row of `matrix` in one batched
+    solve. Returns one row of parameters per country with at least
+    `min_points` observed years; these are all that is needed to forecast.
+    """
+    years = np.asarray(years, dtype=float)
+    observed = ~np.isnan(matrix)
+    n = observed.sum(axis=1)
+    keep = n >= min_points
+    matrix, observed, n, keys = matrix[keep], observed[keep], n[keep], np.asarray(keys)[keep]
+
+    origin = years.mean() if len(years) else 0.0
+    X = _trend_basis(years, origin)                     # years × p
+    W = observed.astype(float)                          # countries × years
+    Y = np.where(observed, matrix, 0.0)
+
+    gram = np.einsum('ct,tp,tq->cpq', W, X, X)          # countries × p × p
+    moment = np.einsum('ct,tp->cp', W * Y, X)           # countries × p
+    # Two or more distinct observed years (min_points ≥ 2) keep every Gram matrix invertible
+    coef = np.linalg.solve(gram, moment[..., None])[..., 0]
+
+    resid = np.where(observed, Y - coef @ X.T, 0.0)
+    dof = np.maximum(n - X.shape[1], 1)
+    sigma2 = (resid ** 2).sum(axis=1) / dof
+    gram_inv = np.linalg.inv(gram)
+
+    last_year = np.where(observed, years, -np.inf).max(axis=1) if len(years) else np.array([])
+    return pd.DataFrame({
+        'iso3': keys,
+        'origin': origin,
+        'intercept': coef[:, 0],
+        'slope': coef[:, 1],
+        'sigma2': sigma2,
+        'n_points': n,
+        'last_year': last_year.astype(int) if len(last_year) else last_year,
+        # Inverse Gram entries give the parameter covariance (× sigma2)
+        'inv_00': gram_inv[:, 0, 0],
+        'inv_01': gram_inv[:, 0, 1],
+        'inv_11': gram_inv[:, 1, 1],
+    })
+
+
+def forecast_trends(params, years=HORIZON, damping=None, interval_width=INTERVAL_WIDTH) -> pd.DataFrame:
+    """
+    Long iso3 × year frame with Predicted_Funding, its lower/upper bounds and
+    the predictive standard error.
+    With `damping` (0 < phi < 1), growth past each country's last observed
+    year shrinks geometrically: fitted(last) + slope·(phi + phi² + … + phiʰ).
+    """
+    from scipy.stats import t as student_t
+
+    years = np.asarray(years, dtype=float)
+    t = years[None, :] - params['origin'].to_numpy()[:, None]          # countries × horizon
+    a = params['intercept'].to_numpy()[:, None]
+    b = params['slope'].to_numpy()[:, None]
+    yhat = a + b * t
+
+    if damping is not None:
+        last = params['last_year'].to_numpy()[:, None].astype(float)
+        h = np.maximum(years[None, :] - last, 0)
+        # Geometric sum phi + … + phi^h, in closed form
+        growth = damping * (1 - damping ** h) / (1 - damping) if damping != 1 else h
+        yhat = a + b * (last - params['origin'].to_numpy()[:, None]) + b * growth
+
+    # Var(ŷ) = sigma² · (1 + x₀ᵀ (XᵀWX)⁻¹ x₀) with x₀ = [1, t]
+    leverage = (params['inv_00'].to_numpy()[:, None] + 2 * t * params['inv_01'].to_numpy()[:, None]
+                + t ** 2 * params['inv_11'].to_numpy()[:, None])
+    se = np.sqrt(params['sigma2'].to_numpy()[:, None] * (1 + leverage))
+    dof = np.maximum(params['n_points'].to_numpy() - 2, 1)[:, None]
+    q = student_t.ppf(0.5 + interval_width / 2, dof)
+
+    n_years = len(years)
+    return pd.DataFrame({
+        'iso3': np.repeat(params['iso3'].to_numpy(), n_years),
+        'year': np.tile(years.astype(int), len(params)),
+        'Predicted_Funding': yhat.ravel(),
+        'Predicted_Funding_lower': (yhat - q * se).ravel(),
+        'Predicted_Funding_upper': (yhat + q * se).ravel(),
+        'Predicted_Funding_se': se.ravel(),
+    })
+
+
+# ── Prophet (reference engine) ───────────────────────────────────────────────
+
+def _prophet_forecast(panel, years=HORIZON, train_end=TRAIN_END, min_points=MIN_POINTS):
+    """The notebook's per-country Prophet loop."""
+    import logging
+    from prophet import Prophet
+
+    logging.getLogger('prophet').setLevel(logging.ERROR)
+    logging.getLogger('cmdstanpy').setLevel(logging.ERROR)
+
+    results = []
+    rows = panel[panel['revisedRequirements'].notna()]
+    for iso, country_data in rows.groupby('iso3', sort=False):
+        yearly = country_data.groupby('year', as_index=False)['revisedRequirements'].sum()
+        train = yearly[yearly['year'] <= train_end]
+        if len(train) < min_points:
+            continue
+        try:
+            m = Prophet(daily_seasonality=False, weekly_seasonality=False, yearly_seasonality=False)
+            m.fit(pd.DataFrame({'ds': pd.to_datetime(train['year'], format='%Y'),
+                                'y': train['revisedRequirements']}))
+            forecast = m.predict(pd.DataFrame({'ds': pd.to_datetime(list(years), format='%Y')}))
+        except Exception:
+            continue
+        results.append(pd.DataFrame({
+            'iso3': iso,
+            'year': forecast['ds'].dt.year,
+            'Predicted_Funding': forecast['yhat'],
+            'Predicted_Funding_lower': forecast['yhat_lower'],
+            'Predicted_Funding_upper': forecast['yhat_upper'],
+        }))
+    if not results:
+        return pd.DataFrame(columns=['iso3', 'year', 'Predicted_Funding',
+                                     'Predicted_Funding_lower', 'Predicted_Funding_upper'])
+    return pd.concat(results, ignore_index=True)
+
+
+# ── Engine selection ─────────────────────────────────────────────────────────
+
+def forecast_funding(panel, engine='linear', years=HORIZON, train_end=TRAIN_END,
+                     damping=DAMPING) -> pd.DataFrame:
+    """Funding forecast for every country with enough history, from the chosen engine."""
+    if engine == 'prophet':
+        return _prophet_forecast(panel, years, train_end)
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    matrix, keys, hist_years = yearly_matrix(panel, train_end=train_end)
+    params = fit_trends(matrix, keys, hist_years)
+    return forecast_trends(params, years, damping=damping if engine == 'damped' else None)
+
+
+# ── Comparison ───────────────────────────────────────────────────────────────
+
+def holdout_errors(panel, engines=ENGINES, cutoff=2021, eval_years=(2022, 2025)) -> pd.DataFrame:
+    """
+    Fit each engine on years ≤ cutoff and score the yearly totals in
+    eval_years. Engines whose dependencies are missing are reported as skipped.
+    """
+    import time
+
+    eval_range = list(range(eval_years[0], eval_years[1] + 1))
+    actual = (panel[panel['revisedRequirements'].notna() & panel['year'].isin(eval_range)]
+              .groupby(['iso3', 'year'], as_index=False)['revisedRequirements'].sum())
+    rows = []
+    for engine in engines:
+        t0 = time.perf_counter()
+        try:
+            pred = forecast_funding(panel, engine, years=eval_range, train_end=cutoff)
+        except ImportError as exc:
+            rows.append({'engine': engine, 'skipped': str(exc)})
+            continue
+        seconds = time.perf_counter() - t0
+        scored = actual.merge(pred, on=['iso3', 'year'])
+        err = scored['Predicted_Funding'] - scored['revisedRequirements']
+        covered = scored['revisedRequirements'].between(scored['Predicted_Funding_lower'],
+                                                        scored['Predicted_Funding_upper'])
+        rows.append({
+            'engine': engine, 'seconds': round(seconds, 4), 'countries': scored['iso3'].nunique(),
+            'points': len(scored), 'mae': err.abs().mean(), 'rmse': float(np.sqrt((err ** 2).mean())),
+            'interval_coverage': covered.mean(),
+        })
+    return pd.DataFrame(rows)
+
+
+def compare_with_published(forecast, path=None) -> dict:
+    """Agreement with the Prophet Predicted_Funding in the committed forecast CSV."""
+    published = pd.read_csv(path or os.path.join(MODELS_DIR, 'forecast_results_2026_2030.csv'))
+    # The committed file keeps the raw plan location string in iso3_original
+    published = published.rename(columns={'iso3': 'iso3_clean', 'iso3_original': 'iso3'})
+    both = published.merge(forecast, on=['iso3', 'year'], suffixes=('_prophet', ''))
+    both = both[both['Predicted_Funding_prophet'] != 0]   # 0 = Prophet skipped the country
+    diff = both['Predicted_Funding'] - both['Predicted_Funding_prophet']
+    scale = both['Predicted_Funding_prophet'].abs().mean()
+    return {
+        'countries': both['iso3'].nunique(),
+        'median_abs_pct_diff': float((diff.abs() / both['Predicted_Funding_prophet'].abs()).median()),
+        'mae_over_mean': float(diff.abs().mean() / scale) if scale else float('nan'),
+        'correlation': float(np.corrcoef(both['Predicted_Funding'], both['Predicted_Funding_prophet'])[0, 1]),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from forecast_model import load_training_panel
+
+    parser = argparse.ArgumentParser(description='Funding trend engines.')
+    parser.add_argument('--engine', choices=ENGINES, default='linear')
+    args = parser.parse_args()
+
+    print(forecast_funding(load_training_panel(), args.engine).to_string(index=False))
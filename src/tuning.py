@@ -0,0 +1,244 @@
+"""
+Hyperparameter search for the stage B XGBoost models.
+
+Candidate configurations are sampled from SEARCH_SPACE and every
+(configuration, target) pair is one trial, so `In Need` and
+`revisedRequirements` train side by side. Trials run in a process pool sized
+to a CPU budget (workers × threads per trial ≤ --cpus). Each trial fits with
+`tree_method='hist'` on an inner split (train ≤ 2017, early stopping on
+2018–2019) and records its stopping-window RMSE, best iteration and wall
+time. Selection never sees 2020–2025: the winner (with n_estimators fixed at
+its best iteration) and the XGB_PARAMS baseline are refitted on ≤ 2019 and
+scored on that hold-out, the same window model_registry reports.
+
+The best configuration per target is written to models/tuning/best_params.json;
+`python src/model_registry.py train --tuned` fits on it and stores it in the
+artifact manifest.
+
+    python src/tuning.py --trials 24 --cpus 4
+    python src/tuning.py --trials 24 --cpus 4 --register
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from forecast_features import FEATURES, TARGETS
+from forecast_model import XGB_PARAMS, model_frame
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+OUTPUT_DIR = os.path.join(MODELS_DIR, 'tuning')
+BEST_PARAMS_PATH = os.path.join(OUTPUT_DIR, 'best_params.json')
+
+TRAIN_END = 2017
+STOP_YEARS = (2018, 2019)          # early stopping and selection
+HOLDOUT_YEARS = (2020, 2025)       # reported only; forecast_model.holdout_predictions' window
+N_TRIALS = 24
+SEED = 42
+
+BASE_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'n_estimators': 1000,          # upper bound; early stopping picks the count
+    'early_stopping_rounds': 30,
+    'random_state': 42,
+}
+SEARCH_SPACE = {
+    'max_depth': [2, 3, 4, 6, 8],
+    'learning_rate': [0.02, 0.05, 0.1, 0.2, 0.3],
+    'min_child_weight': [1, 3, 5, 10],
+    'subsample': [0.6, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'reg_lambda': [0.5, 1.0, 5.0, 10.0],
+    'max_bin': [64, 256],
+}
+
+
+def sample_configs(n_trials=N_TRIALS, seed=SEED, space=SEARCH_SPACE) -> list:
+    """`n_trials` distinct configurations; the first is XGBoost's defaults on hist."""
+    rng = np.random.default_rng(seed)
+    configs, seen = [{}], {'{}'}
+    attempts = 0
+    while len(configs) < n_trials and attempts < n_trials * 50:
+        attempts += 1
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        config = {k: (v.item() if hasattr(v, 'item') else v) for k, v in config.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def temporal_split(features_df, train_end=TRAIN_END, val_years=STOP_YEARS, features=FEATURES, targets=TARGETS):
+    frame = model_frame(features_df, features, targets)
+    train = frame[frame['year'] <= train_end]
+    val = frame[frame['year'].between(*val_years)]
+    return train, val
+
+
+# ── Trials (module level so the process pool can pickle them) ────────────────
+
+def _trial(trial_id, config, target, data, n_threads):
+    from xgboost import XGBRegressor
+
+    X_train, y_train, X_val, y_val = data
+    t0 = time.perf_counter()
+    model = XGBRegressor(**{**BASE_PARAMS, **config, 'n_jobs': n_threads})
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    pred = model.predict(X_val, iteration_range=(0, model.best_iteration + 1))
+    return {
+        'trial': trial_id,
+        'target': target,
+        'stop_rmse': float(np.sqrt(np.mean((pred - y_val) ** 2))),
+        'best_iteration': int(model.best_iteration),
+        'seconds': time.perf_counter() - t0,
+        **config,
+    }
+
+
+def _holdout_rmse(params, data):
+    """A fixed configuration (no early stopping) fitted on ≤ 2019 and scored on HOLDOUT_YEARS."""
+    from xgboost import XGBRegressor
+
+    X_train, y_train, X_val, y_val = data
+    model = XGBRegressor(**params)
+    model.fit(X_train, y_train)
+    return float(np.sqrt(np.mean((model.predict(X_val) - y_val) ** 2)))
+
+
+def _arrays(train, val, target):
+    return train[FEATURES].to_numpy(), train[target].to_numpy(), val[FEATURES].to_numpy(), val[target].to_numpy()
+
+
+def run_search(features_df=None, n_trials=N_TRIALS, cpus=None, threads_per_trial=1, seed=SEED,
+               targets=TARGETS, log=print) -> pd.DataFrame:
+    """
+    Evaluate every sampled configuration for every target; returns one row
+    per trial. At most `cpus` cores are busy: cpus // threads_per_trial
+    worker processes, each trial limited to threads_per_trial threads.
+    """
+    if features_df is None:
+        from feature_store import ensure_store, load_features
+
+        ensure_store()
+        features_df = load_features()
+    cpus = cpus or os.cpu_count() or 1
+    workers = max(1, cpus // threads_per_trial)
+    train, val = temporal_split(features_df, targets=targets)
+    data = {target: _arrays(train, val, target) for target in targets}
+    configs = sample_configs(n_trials, seed)
+
+    t0 = time.perf_counter()
+    tasks = [(i, config, target, data[target], threads_per_trial)
+             for i, config in enumerate(configs) for target in targets]
+    if workers == 1:
+        results = []
+        for args in tasks:
+            results.append(_trial(*args))
+            _log_trial(results[-1], log)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_trial, *args) for args in tasks]
+            results = []
+            for future in futures:
+                results.append(future.result())
+                _log_trial(results[-1], log)
+    trials = pd.DataFrame(results).sort_values(['target', 'stop_rmse']).reset_index(drop=True)
+    seconds = time.perf_counter() - t0
+
+    # The untouched hold-out, scored once for the winner and the baseline
+    refit, holdout = temporal_split(features_df, HOLDOUT_YEARS[0] - 1, HOLDOUT_YEARS, targets=targets)
+    best = best_params(trials)
+    outer = {target: _arrays(refit, holdout, target) for target in targets}
+    trials.attrs.update(seconds=seconds, workers=workers, threads_per_trial=threads_per_trial,
+                        train_rows=len(train), val_rows=len(val),
+                        holdout_rmse={target: _holdout_rmse(best[target], outer[target]) for target in targets},
+                        baseline_rmse={target: _holdout_rmse(XGB_PARAMS, outer[target]) for target in targets})
+    return trials
+
+
+def _log_trial(row, log):
+    if log:
+        log(f"  trial {row['trial']:>3} {row['target']:<20} rmse {row['stop_rmse']:>14,.0f}  "
+            f"iters {row['best_iteration'] + 1:>4}  {row['seconds'] * 1000:6.0f} ms")
+
+
+def best_params(trials) -> dict:
+    """Lowest stopping-window RMSE configuration per target, ready for fit_needs_models (no early stopping)."""
+    best = {}
+    for target, rows in trials.groupby('target'):
+        row = rows.sort_values('stop_rmse', kind='stable').iloc[0]
+        config = {name: row[name] for name in SEARCH_SPACE if name in row and pd.notna(row[name])}
+        # Trial columns come back as floats where some configurations left them unset
+        config = {k: int(v) if all(isinstance(x, int) for x in SEARCH_SPACE[k]) else float(v)
+                  for k, v in config.items()}
+        params = {k: v for k, v in BASE_PARAMS.items() if k != 'early_stopping_rounds'}
+        params.update(config, n_estimators=int(row['best_iteration']) + 1)
+        best[target] = params
+    return best
+
+
+def save_results(trials, out_dir=OUTPUT_DIR) -> str:
+    """trials.csv plus best_params.json (params per target and the search summary)."""
+    os.makedirs(out_dir, exist_ok=True)
+    trials.to_csv(os.path.join(out_dir, 'trials.csv'), index=False)
+    best = trials.sort_values('stop_rmse', kind='stable').groupby('target').head(1).set_index('target')
+    payload = {
+        'params': best_params(trials),
+        'search': {
+            'trials': int(trials['trial'].nunique()),
+            'seconds': round(trials.attrs.get('seconds', 0.0), 2),
+            'workers': trials.attrs.get('workers'),
+            'threads_per_trial': trials.attrs.get('threads_per_trial'),
+            'split': {'train_end': TRAIN_END, 'stop_years': list(STOP_YEARS),
+                      'holdout_years': list(HOLDOUT_YEARS)},
+            'stop_rmse': {t: float(v) for t, v in best['stop_rmse'].items()},
+            'holdout_rmse': trials.attrs.get('holdout_rmse', {}),
+            'baseline_rmse': trials.attrs.get('baseline_rmse', {}),
+        },
+    }
+    path = os.path.join(out_dir, 'best_params.json')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_best_params(path=BEST_PARAMS_PATH) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Parallel XGBoost hyperparameter search for stage B.')
+    parser.add_argument('--trials', type=int, default=N_TRIALS, help='configurations to evaluate')
+    parser.add_argument('--cpus', type=int, default=None, help='CPU budget (default: all cores)')
+    parser.add_argument('--threads-per-trial', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--register', action='store_true', help='train and register a model version with the result')
+    args = parser.parse_args()
+
+    result = run_search(n_trials=args.trials, cpus=args.cpus, threads_per_trial=args.threads_per_trial,
+                        seed=args.seed)
+    path = save_results(result)
+    summary = load_best_params(path)['search']
+    print(f"\n{summary['trials']} configurations × {len(TARGETS)} targets in {summary['seconds']:.1f}s "
+          f"({summary['workers']} workers × {summary['threads_per_trial']} threads) → {path}")
+    for target in TARGETS:
+        print(f"  {target:<20} hold-out rmse {summary['holdout_rmse'][target]:>14,.0f}   "
+              f"baseline {summary['baseline_rmse'][target]:>14,.0f}")
+    if args.register:
+        import logging
+
+        from model_registry import train_and_register
+
+        logging.getLogger('streamlit.runtime.caching.cache_data_api').setLevel(logging.ERROR)
+        print(f"registered {train_and_register(tuned=load_best_params(path))}")
@@ -0,0 +1,131 @@
+"""
+Monte Carlo uncertainty for the 2026–2030 funding-gap forecast.
+
+For every forecast country-year, joint draws of requirements and funding are
+sampled in one batched NumPy pass:
+
+    requirements ~ point × lognormal(σ_req)        σ_req: XGBoost hold-out log-residual spread
+    funding      ~ point + se_fund · ε             se_fund: funding-trend predictive std. error
+    corr(requirements, funding) = RHO              (on the underlying normals)
+
+Each draw yields a gap and a neglect outcome (requirements > threshold ×
+funding), so the table gains a probability of neglect in place of the
+boolean Risk_Flag, plus quantile bands for fan charts. Parameters come from
+the registered model artifacts (model_registry); country-years without a
+funding trend keep funding fixed at its point value. A full 10,000-draw pass
+over the forecast table stays under 200 ms (tests/test_uncertainty.py).
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_versions import versioned
+from scenarios import DEFAULT_THRESHOLD
+from utils import load_forecast_data
+
+N_DRAWS = 10_000
+RHO = 0.3
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+SEED = 2026
+CHUNK_ROWS = 128   # rows evaluated at a time, bounding memory to CHUNK_ROWS × n_draws
+GAP_QUANTILE_DRAWS = 2_000
+HIGH_NEGLECT = 0.5   # country-years at or above this probability make the high-neglect list
+
+
+def uncertainty_params(forecast_df, bundle=None) -> pd.DataFrame:
+    """
+    Point forecasts and error scales per forecast row: requirements log-σ
+    from the hold-out residuals, funding standard error from the trend fit
+    of the same plan location (0 where no trend was fitted).
+    """
+    params = pd.DataFrame({
+        'requirements': forecast_df['Predicted_Requirements'].to_numpy(dtype=float),
+        'funding': forecast_df['Predicted_Funding'].to_numpy(dtype=float),
+        'req_log_sigma': 0.0,
+        'funding_se': 0.0,
+    }, index=forecast_df.index)
+    if bundle is None:
+        return params
+
+    log_sigma = bundle.residuals.get('log_sigma', {}).get('revisedRequirements')
+    if log_sigma and np.isfinite(log_sigma):
+        params['req_log_sigma'] = log_sigma
+
+    trend = bundle.funding(sorted(forecast_df['year'].unique()))
+    # Trends are keyed by the raw plan location string, kept in iso3_original
+    location = forecast_df['iso3_original'] if 'iso3_original' in forecast_df else forecast_df['iso3']
+    keyed = pd.DataFrame({'iso3': location.to_numpy(), 'year': forecast_df['year'].to_numpy()})
+    se = keyed.merge(trend[['iso3', 'year', 'Predicted_Funding_se']], on=['iso3', 'year'], how='left')
+    has_trend = (forecast_df['Predicted_Funding'] != 0).to_numpy()
+    params['funding_se'] = np.where(has_trend, se['Predicted_Funding_se'].fillna(0).to_numpy(), 0.0)
+    return params
+
+
+def simulate(params, n_draws=N_DRAWS, threshold=DEFAULT_THRESHOLD, rho=RHO, quantiles=QUANTILES,
+             seed=SEED, gap_draws=GAP_QUANTILE_DRAWS) -> dict:
+    """
+    Sample n_draws joint outcomes per row. Returns the neglect probability
+    per row and (rows × quantiles) arrays for requirements, funding and gap.
+
+    One set of standard-normal draws is shared by every row (common random
+    numbers): each row's estimates are unaffected, rows are compared on the
+    same draws, and sampling cost no longer grows with the table. The
+    requirement and funding marginals have closed-form quantiles; gap
+    quantiles come from the first `gap_draws` draws, which is plenty for
+    p10–p90 and keeps the selection step cheap.
+    """
+    from scipy.stats import norm
+
+    rng = np.random.default_rng(seed)
+    z_req, z_ind = rng.standard_normal((2, n_draws), dtype=np.float32)
+    z_fund = np.float32(rho) * z_req + np.float32(np.sqrt(1 - rho ** 2)) * z_ind
+
+    req = params['requirements'].to_numpy(dtype=np.float32)[:, None]
+    fund = params['funding'].to_numpy(dtype=np.float32)[:, None]
+    sigma = params['req_log_sigma'].to_numpy(dtype=np.float32)[:, None]
+    se = params['funding_se'].to_numpy(dtype=np.float32)[:, None]
+
+    zq = norm.ppf(np.asarray(quantiles)).astype(np.float32)[None, :]
+    out = {
+        # Mean-preserving lognormal multiplier on requirements; normal funding error
+        'requirements': req * np.exp(sigma * zq - sigma * sigma / 2),
+        'funding': fund + se * zq,
+        'neglect_probability': np.empty(len(req)),
+        'gap': np.empty((len(req), len(quantiles))),
+    }
+    k = np.clip(np.round(np.asarray(quantiles) * (min(gap_draws, n_draws) - 1)).astype(int), 0, None)
+    for start in range(0, len(req), CHUNK_ROWS):
+        sl = slice(start, start + CHUNK_ROWS)
+        s = sigma[sl]
+        req_draw = req[sl] * np.exp(s * z_req - s * s / 2)
+        fund_draw = fund[sl] + se[sl] * z_fund
+        out['neglect_probability'][sl] = (req_draw > threshold * fund_draw).mean(axis=1)
+        gap = req_draw[:, :gap_draws] - fund_draw[:, :gap_draws]
+        out['gap'][sl] = np.partition(gap, k, axis=1)[:, k]
+    return out
+
+
+def bands_frame(forecast_df, sim, quantiles=QUANTILES) -> pd.DataFrame:
+    """Flatten simulate() output into iso3/year rows with *_p10 … *_p90 columns."""
+    frame = pd.DataFrame({
+        'iso3': forecast_df['iso3'].to_numpy(),
+        'year': forecast_df['year'].to_numpy(),
+        'Neglect_Probability': sim['neglect_probability'],
+    })
+    for name, col in (('requirements', 'Requirements'), ('funding', 'Funding'), ('gap', 'Gap')):
+        for j, qv in enumerate(quantiles):
+            frame[f'{col}_p{round(qv * 100)}'] = sim[name][:, j]
+    return frame
+
+
+@versioned
+@st.cache_data(show_spinner=False)
+def get_uncertainty_bands(n_draws=N_DRAWS, threshold=DEFAULT_THRESHOLD, data_version=None) -> pd.DataFrame:
+    """Neglect probability and fan-chart bands for the cached forecast table."""
+    from model_registry import get_registry
+
+    df = load_forecast_data()
+    sim = simulate(uncertainty_params(df, get_registry()), n_draws=n_draws, threshold=threshold)
+    return bands_frame(df, sim)
+
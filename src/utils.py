@@ -2,6 +2,13 @@ import os
 import streamlit as st
 import pandas as pd
 
+from data_versions import KEEP_VERSIONS, versioned
+from hrp_plans import prefer_national
+from outliers import flagged_regions
+from shared_tables import shared_table
+from validation import clean_table
+from year_cubes import read_cubes, year_frame
+
 DATA_DIR   = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
 
@@ -28,6 +35,33 @@ FORECAST_COUNTRY_NAMES = {
     'YEM': 'Yemen', 'ZMB': 'Zambia', 'ZWE': 'Zimbabwe',
 }
 
+# OCHA-style regional grouping of every forecast country (used by donor-shock scenarios)
+REGION_COUNTRIES = {
+    'West & Central Africa': [
+        'BEN', 'BFA', 'CAF', 'CIV', 'CMR', 'COD', 'COG', 'GHA', 'GIN', 'GMB',
+        'GNB', 'LBR', 'MLI', 'MRT', 'NER', 'NGA', 'SEN', 'SLE', 'TCD', 'TGO',
+    ],
+    'East & Southern Africa': [
+        'AGO', 'BDI', 'DJI', 'ERI', 'ETH', 'KEN', 'LSO', 'MDG', 'MOZ', 'MWI',
+        'NAM', 'RWA', 'SDN', 'SOM', 'SSD', 'SWZ', 'TZA', 'UGA', 'ZMB', 'ZWE',
+    ],
+    'Middle East & North Africa': [
+        'EGY', 'IRN', 'IRQ', 'JOR', 'LBN', 'LBY', 'PSE', 'SYR', 'TUR', 'YEM',
+    ],
+    'Asia & Pacific': [
+        'AFG', 'BGD', 'FJI', 'IDN', 'LAO', 'LKA', 'MMR', 'MNG', 'NPL', 'PAK',
+        'PHL', 'PRK', 'SLB', 'TLS', 'VNM', 'VUT',
+    ],
+    'Latin America & Caribbean': [
+        'BOL', 'COL', 'CUB', 'DMA', 'DOM', 'ECU', 'GRD', 'GTM', 'GUY', 'HND',
+        'HTI', 'MEX', 'NIC', 'PAN', 'PER', 'PRY', 'SLV', 'SXM', 'VCT', 'VEN',
+    ],
+    'Europe & Central Asia': [
+        'BGR', 'EST', 'GEO', 'GRC', 'KGZ', 'LVA', 'ROU', 'RUS', 'TJK', 'UKR',
+    ],
+}
+ISO3_TO_REGION = {iso: region for region, codes in REGION_COUNTRIES.items() for iso in codes}
+
 SEVERITY_ORDER = ['Low', 'Medium', 'High', 'Critical']
 SEVERITY_COLORS = {
     'Low': '#3b82f6',
@@ -113,13 +147,12 @@ def _chart_layout(**overrides):
 
 # ── Data loaders ───────────────────────────────────────────────────────────────
 
-@st.cache_data
-def load_country_metrics():
-    path = os.path.join(DATA_DIR, 'humanitarian_analysis_country_metrics.csv')
-    df = pd.read_csv(path)
-    df = df.dropna(subset=['Population', 'In Need', 'revisedRequirements'])
-    df = df[df['Population'] > 0]
-    df = df[df['In Need'] > 0]
+@shared_table('country_metrics')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_country_metrics(data_version=None):
+    # Rows without positive Population / In Need are dropped at validation
+    df = clean_table('country_metrics')
     df['Country Name'] = df['Country ISO3'].map(ISO3_TO_NAME).fillna(df['Country ISO3'])
     df['Need Prevalence'] = df['In Need'] / df['Population']
     df['Budget per PIN'] = df['revisedRequirements'] / df['In Need']
@@ -144,31 +177,77 @@ def load_country_metrics():
     return df
 
 
-@st.cache_data
-def load_forecast_data():
-    path = os.path.join(MODELS_DIR, 'forecast_results_2026_2030.csv')
-    df = pd.read_csv(path)
-    df['iso3'] = df['iso3'].str.strip().str[:3]
-    df = df.drop_duplicates(subset=['iso3', 'year'], keep='first')
+@shared_table('forecast')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_forecast_data(data_version=None):
+    # iso3 is already the cleaned code; of several plans closing on one country,
+    # keep the country's own plan rather than a regional one
+    df = prefer_national(clean_table('forecast'))
     df['Country'] = df['iso3'].map(FORECAST_COUNTRY_NAMES).fillna(df['iso3'])
     return df
 
 
-@st.cache_data
-def load_high_risk_data():
-    path = os.path.join(MODELS_DIR, 'high_neglect_risk_2026_2030.csv')
-    df = pd.read_csv(path)
-    df['iso3'] = df['iso3'].str.strip().str[:3]
-    df = df.drop_duplicates(subset=['iso3', 'year'], keep='first')
-    df['Country'] = df['iso3'].map(FORECAST_COUNTRY_NAMES).fillna(df['iso3'])
+@shared_table('high_risk')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_high_risk_data(data_version=None):
+    # Flagged rows of the deduplicated forecast, so both tables keep the same plan
+    # for every country-year (the exported high-risk file is deduplicated apart)
+    df = load_forecast_data()
+    df = df[df['Risk_Flag'].astype(bool)]
+    return df.sort_values('Funding_Gap', ascending=False, kind='stable').reset_index(drop=True)
+
+
+@shared_table('sector_benchmarking')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_sector_benchmarking(data_version=None):
+    df = clean_table('sector_benchmarking')
+    df['Sector Name'] = df['Cluster'].map(SECTOR_TO_NAME).fillna(df['Cluster'])
     return df
 
 
-@st.cache_data
-def load_sector_benchmarking():
-    path = os.path.join(DATA_DIR, 'humanitarian_analysis_sector_benchmarking.csv')
-    df = pd.read_csv(path)
+@shared_table('sector_matrix')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_sector_matrix(data_version=None):
+    """Country × cluster cells built by sector_matrix.py; empty until the HNO cluster file is built."""
+    path = os.path.join(DATA_DIR, 'humanitarian_analysis_sector_matrix.csv')
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Country ISO3', 'Cluster', 'In Need', 'Targeted', 'Coverage',
+                                     'Cluster Mean Coverage', 'Benchmark Ratio', 'Sector Name', 'Country Name'])
+    df = clean_table('sector_matrix')
     df['Sector Name'] = df['Cluster'].map(SECTOR_TO_NAME).fillna(df['Cluster'])
+    df['Country Name'] = df['Country ISO3'].map(ISO3_TO_NAME).fillna(df['Country ISO3'])
+    return df
+
+
+@shared_table('flagged_regions')
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_flagged_regions(data_version=None):
+    """Regions flagged by the robust outlier screen (outliers.py), every level with a source file."""
+    df = flagged_regions(DATA_DIR)
+    df['Country Name'] = df['Country ISO3'].map(ISO3_TO_NAME).fillna(df['Country ISO3'])
+    df['Region Name'] = df['Region'].astype(str)
+    df.loc[df['Level'] == 'Country', 'Region Name'] = df['Country Name']
+    sectors = df['Level'] == 'Country × Sector'
+    df.loc[sectors, 'Region Name'] = df.loc[sectors, 'Region'].map(SECTOR_TO_NAME).fillna(df.loc[sectors, 'Region'])
+    return df
+
+
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS)
+def load_year_cubes(data_version=None):
+    """Per-year country cubes behind the year slider (year_cubes.py), built once per data version."""
+    return read_cubes()
+
+
+def year_metrics(year):
+    """Country metrics for one plan year: a slice of the cached cubes, with country names."""
+    df = year_frame(load_year_cubes(), year)
+    df['Country Name'] = df['Country ISO3'].map(ISO3_TO_NAME).fillna(df['Country ISO3'])
     return df
 
 
@@ -182,6 +261,28 @@ def chart_caption(text):
     )
 
 
+def filter_panel(index, key, facets, ranges=()):
+    """
+    Widgets for the facets of a BitmapIndex that have values, three to a row;
+    returns the selection for `index.select`. Facets in `ranges` get a range
+    slider, which does not filter while it spans every value.
+    """
+    facets = [f for f in facets if index.values(f)]
+    filters = {}
+    for start in range(0, len(facets), 3):
+        cols = st.columns(3)
+        for col, facet in zip(cols, facets[start:start + 3]):
+            values = index.values(facet)
+            if facet in ranges and len(values) > 1:
+                lo, hi = col.select_slider(facet, options=values, value=(values[0], values[-1]),
+                                           key=f'{key}_{facet}')
+                filters[facet] = [] if (lo, hi) == (values[0], values[-1]) else \
+                    [v for v in values if lo <= v <= hi]
+            else:
+                filters[facet] = col.multiselect(facet, values, key=f'{key}_{facet}', placeholder='All')
+    return filters
+
+
 def section_header(label, title, description):
     st.markdown(f"""
     <div style="margin-top:2rem; margin-bottom:0.5rem;">
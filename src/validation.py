@@ -0,0 +1,377 @@
+"""
+Ingest-time validation of the tables the app serves.
+
+Each table in TABLES names its source file, its key and a list of
+declarative rules (name, check, columns, action). Checks are vectorized
+column predicates from CHECKS; a row fails a rule when the predicate is
+False. What happens to failing rows depends on the action:
+
+    drop    the row is left out of the clean table
+    null    the rule's first column is blanked (e.g. a Population of 0.0)
+    warn    the row is kept and only reported
+
+Validation runs once per source version, normally in the ingest CLI below:
+`clean_table(name)` returns the clean table from data/validated/<name>.parquet
+and re-validates only when the source file's hash differs from the one in
+the table's report entry. Each table writes its own <name>.parquet,
+<name>.report.json (source hash, row counts, violations per rule) and
+<name>.violations.csv (failing rows by key); quality_report.json and
+violations.csv are rebuilt from them after every run.
+
+Writers hold a module lock plus an exclusive file lock on
+data/validated/.lock, so threads and processes (several app servers,
+the CLI) validate one at a time; every file is replaced atomically from a
+unique temp file, so readers never see a partial write.
+
+    python src/validation.py                 # validate every table, write report + clean tables
+    python src/validation.py --fetch-hno     # also download the HNO file the sector matrix is built from
+    python src/validation.py --show          # print the current report
+
+Before validating, the CLI rebuilds the sector matrix from data/hpc_hno_2025.csv
+when that file is newer (sector_matrix.ensure_matrix).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SRC_DIR, '..', 'data')
+MODELS_DIR = os.path.join(SRC_DIR, '..', 'models')
+OUTPUT_DIR = os.path.join(DATA_DIR, 'validated')
+REPORT_PATH = os.path.join(OUTPUT_DIR, 'quality_report.json')
+VIOLATIONS_PATH = os.path.join(OUTPUT_DIR, 'violations.csv')
+VIOLATION_COLUMNS = ['table', 'rule', 'action', 'key', 'values']
+
+_lock = threading.Lock()
+
+
+def _le(df, cols):
+    a, b = df[cols[0]], df[cols[1]]
+    return ~(a > b)          # passes when either side is missing
+
+
+# Check → vectorized predicate over the rule's columns (True = row passes)
+CHECKS = {
+    'required': lambda df, cols: df[cols].notna().all(axis=1),
+    'positive': lambda df, cols: ~(df[cols] <= 0).any(axis=1),
+    'non_negative': lambda df, cols: ~(df[cols] < 0).any(axis=1),
+    'at_most': _le,
+    'unique': lambda df, cols: ~df.duplicated(cols, keep='first'),
+}
+
+TABLES = {
+    'country_metrics': {
+        'source': os.path.join(DATA_DIR, 'humanitarian_analysis_country_metrics.csv'),
+        'key': ['Country ISO3'],
+        'rules': [
+            ('unique_key', 'unique', ['Country ISO3'], 'drop'),
+            ('figures_present', 'required', ['Population', 'In Need', 'revisedRequirements'], 'drop'),
+            ('population_positive', 'positive', ['Population'], 'drop'),
+            ('need_positive', 'positive', ['In Need'], 'drop'),
+            ('need_within_population', 'at_most', ['In Need', 'Population'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+            ('requirements_non_negative', 'non_negative', ['revisedRequirements'], 'warn'),
+        ],
+    },
+    'country_summary': {
+        'source': os.path.join(DATA_DIR, 'country_level_summary (1).csv'),
+        'key': ['Country ISO3'],
+        'rules': [
+            ('unique_key', 'unique', ['Country ISO3'], 'drop'),
+            ('need_present', 'required', ['In Need'], 'drop'),
+            ('population_positive', 'positive', ['Total_Population'], 'null'),
+            ('need_within_population', 'at_most', ['In Need', 'Total_Population'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+            ('requirements_non_negative', 'non_negative', ['revisedRequirements'], 'warn'),
+        ],
+    },
+    # Uncorrected summary that fix_country_summary.py repairs; validated for the report only
+    'country_summary_raw': {
+        'source': os.path.join(DATA_DIR, 'country_level_summary.csv'),
+        'key': ['Country ISO3'],
+        'rules': [
+            ('unique_key', 'unique', ['Country ISO3'], 'drop'),
+            ('need_within_population', 'at_most', ['In Need', 'Total_Population'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+            ('requirements_non_negative', 'non_negative', ['revisedRequirements'], 'warn'),
+        ],
+    },
+    'admin1_summary': {
+        'source': os.path.join(DATA_DIR, 'updated_admin1_summary_data.csv'),
+        'key': ['Country ISO3', 'Admin 1 Name'],
+        'rules': [
+            ('unique_key', 'unique', ['Country ISO3', 'Admin 1 Name'], 'drop'),
+            ('population_positive', 'positive', ['Population'], 'null'),
+            ('need_within_population', 'at_most', ['In Need', 'Population'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+        ],
+    },
+    'sector_benchmarking': {
+        'source': os.path.join(DATA_DIR, 'humanitarian_analysis_sector_benchmarking.csv'),
+        'key': ['Cluster'],
+        'rules': [
+            ('unique_key', 'unique', ['Cluster'], 'drop'),
+            ('figures_non_negative', 'non_negative', ['In Need', 'Targeted'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+        ],
+    },
+    'sector_matrix': {
+        'source': os.path.join(DATA_DIR, 'humanitarian_analysis_sector_matrix.csv'),
+        'key': ['Country ISO3', 'Cluster'],
+        'rules': [
+            ('unique_key', 'unique', ['Country ISO3', 'Cluster'], 'drop'),
+            ('figures_non_negative', 'non_negative', ['In Need', 'Targeted'], 'warn'),
+            ('targeted_within_need', 'at_most', ['Targeted', 'In Need'], 'warn'),
+        ],
+    },
+    'forecast': {
+        'source': os.path.join(MODELS_DIR, 'forecast_results_2026_2030.csv'),
+        'key': ['iso3_original', 'year'],
+        'rules': [
+            ('unique_key', 'unique', ['iso3_original', 'year'], 'drop'),
+            ('predictions_present', 'required', ['Predicted_In_Need', 'Predicted_Requirements'], 'drop'),
+            ('needs_non_negative', 'non_negative', ['Predicted_In_Need', 'Predicted_Requirements'], 'warn'),
+            ('funding_non_negative', 'non_negative', ['Predicted_Funding'], 'warn'),
+        ],
+    },
+    'high_risk': {
+        'source': os.path.join(MODELS_DIR, 'high_neglect_risk_2026_2030.csv'),
+        'key': ['iso3_original', 'year'],
+        'rules': [
+            ('unique_key', 'unique', ['iso3_original', 'year'], 'drop'),
+            ('predictions_present', 'required', ['Predicted_In_Need', 'Predicted_Requirements'], 'drop'),
+            ('needs_non_negative', 'non_negative', ['Predicted_In_Need', 'Predicted_Requirements'], 'warn'),
+            ('funding_non_negative', 'non_negative', ['Predicted_Funding'], 'warn'),
+        ],
+    },
+}
+
+
+def _sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _replace(path, write):
+    """Write `path` through `write(tmp_path)` on a unique temp file beside it, then swap it in."""
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}-', suffix='.tmp',
+                                    dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_json(path, payload):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, sort_keys=True, default=str)
+
+    _replace(path, write)
+
+
+@contextmanager
+def _locked(out_dir):
+    """Exclusive access to `out_dir`'s files: the module lock for threads, flock for processes."""
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:       # Windows: threads only
+        fcntl = None
+    with _lock, open(os.path.join(out_dir, '.lock'), 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield                 # closing the file releases the flock
+
+
+# ── Validation ───────────────────────────────────────────────────────────────
+
+def _join(rows, cols, sep, named) -> np.ndarray:
+    parts = [(f'{c}=' if named else '') + rows[c].map(str) for c in cols]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + sep + part
+    return joined.to_numpy()
+
+
+def validate(df, spec) -> tuple:
+    """
+    Apply a table's rules in order. Returns (clean frame, per-rule summary,
+    violations frame with the key of every failing row).
+    """
+    keep = np.ones(len(df), dtype=bool)
+    clean = df.copy()
+    summary, violations = [], []
+    for name, check, cols, action in spec['rules']:
+        missing = [c for c in cols if c not in df.columns]
+        if missing:
+            raise KeyError(f"rule {name!r} needs columns missing from {spec['source']}: {missing}")
+        # Rows an earlier rule dropped are not reported again
+        failed = ~CHECKS[check](clean, cols).to_numpy(dtype=bool) & keep
+        summary.append({'rule': name, 'check': check, 'columns': cols, 'action': action,
+                        'violations': int(failed.sum())})
+        if failed.any():
+            bad = clean.loc[failed]
+            violations.append(pd.DataFrame({
+                'rule': name,
+                'action': action,
+                'key': _join(bad, spec['key'], ' / ', named=False),
+                'values': _join(bad, cols, ', ', named=True),
+            }))
+        if action == 'drop':
+            keep &= ~failed
+        elif action == 'null':
+            clean.loc[failed, cols[0]] = np.nan
+    clean = clean[keep].reset_index(drop=True)
+    violations = (pd.concat(violations, ignore_index=True) if violations
+                  else pd.DataFrame(columns=['rule', 'action', 'key', 'values']))
+    return clean, summary, violations
+
+
+def read_report(path=REPORT_PATH) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'tables': {}}
+
+
+def _clean_path(name, out_dir):
+    return os.path.join(out_dir, f'{name}.parquet')
+
+
+def _entry_path(name, out_dir):
+    return os.path.join(out_dir, f'{name}.report.json')
+
+
+def _violations_path(name, out_dir):
+    return os.path.join(out_dir, f'{name}.violations.csv')
+
+
+def _read_entry(name, out_dir):
+    try:
+        with open(_entry_path(name, out_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _is_current(name, out_dir) -> bool:
+    entry = _read_entry(name, out_dir)
+    return (entry is not None and os.path.exists(_clean_path(name, out_dir))
+            and entry['sha256'] == _sha256(TABLES[name]['source']))
+
+
+def _validate_table(name, out_dir):
+    """Validate one table and write its clean table, violations and (last) its report entry. Caller holds the lock."""
+    spec = TABLES[name]
+    t0 = time.perf_counter()
+    sha = _sha256(spec['source'])
+    df = pd.read_csv(spec['source'])
+    clean, summary, violations = validate(df, spec)
+    _replace(_clean_path(name, out_dir), lambda tmp: clean.to_parquet(tmp, index=False))
+    violations = violations.assign(table=name)[VIOLATION_COLUMNS]
+    _replace(_violations_path(name, out_dir), lambda tmp: violations.to_csv(tmp, index=False))
+    _write_json(_entry_path(name, out_dir), {
+        'source': os.path.relpath(spec['source'], os.path.join(SRC_DIR, '..')),
+        'sha256': sha,
+        'validated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'rows_in': len(df),
+        'rows_out': len(clean),
+        'rules': summary,
+        'seconds': round(time.perf_counter() - t0, 4),
+    })
+
+
+def _write_summary(out_dir) -> dict:
+    """Rebuild quality_report.json and violations.csv from the per-table files. Caller holds the lock."""
+    report = {'tables': {}}
+    frames = []
+    for name in TABLES:
+        entry = _read_entry(name, out_dir)
+        if entry is None:
+            continue
+        report['tables'][name] = entry
+        if os.path.exists(_violations_path(name, out_dir)):
+            frames.append(pd.read_csv(_violations_path(name, out_dir), dtype=str, keep_default_na=False))
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=VIOLATION_COLUMNS)
+    _replace(os.path.join(out_dir, os.path.basename(VIOLATIONS_PATH)),
+             lambda tmp: combined.to_csv(tmp, index=False))
+    _write_json(os.path.join(out_dir, os.path.basename(REPORT_PATH)), report)
+    return report
+
+
+def validate_tables(names=None, out_dir=OUTPUT_DIR) -> dict:
+    """Validate `names` (default: every table with a source file); update report, violations and clean tables."""
+    names = [n for n in (names or TABLES) if os.path.exists(TABLES[n]['source'])]
+    with _locked(out_dir):
+        for name in names:
+            _validate_table(name, out_dir)
+        return _write_summary(out_dir)
+
+
+def clean_table(name, out_dir=OUTPUT_DIR) -> pd.DataFrame:
+    """
+    The validated table `name`, re-validating first when its source changed
+    since the last run (or was never validated). Another thread or process
+    may have done so while this one waited for the lock, hence the re-check.
+    """
+    if not _is_current(name, out_dir):
+        with _locked(out_dir):
+            if not _is_current(name, out_dir):
+                _validate_table(name, out_dir)
+                _write_summary(out_dir)
+    return pd.read_parquet(_clean_path(name, out_dir))
+
+
+def _print_report(report):
+    for name, entry in report['tables'].items():
+        print(f"{name:<22} {entry['rows_in']:>5} rows → {entry['rows_out']:>5} clean   ({entry['source']})")
+        for rule in entry['rules']:
+            if rule['violations']:
+                print(f"    {rule['rule']:<28} {rule['violations']:>5} {rule['action']}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate the served tables and write the quality report.')
+    parser.add_argument('tables', nargs='*', help=f"tables to validate (default: all of {', '.join(TABLES)})")
+    parser.add_argument('--show', action='store_true', help='print the current report without validating')
+    parser.add_argument('--fetch-hno', action='store_true',
+                        help='download the HNO cluster file from HDX if missing, to build the sector matrix')
+    args = parser.parse_args()
+    unknown = sorted(set(args.tables) - set(TABLES))
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+
+    if args.show:
+        _print_report(read_report())
+    else:
+        from sector_matrix import HNO_PATH, ensure_matrix
+
+        if 'sector_matrix' in (args.tables or TABLES):
+            try:
+                built = ensure_matrix(fetch=args.fetch_hno)
+            except OSError as exc:
+                parser.exit(1, f"could not fetch {os.path.basename(HNO_PATH)}: {exc}\n")
+            if not built:
+                print(f"sector_matrix: no {os.path.basename(HNO_PATH)} to build from — skipped (see --fetch-hno)")
+        t0 = time.perf_counter()
+        _print_report(validate_tables(args.tables or None))
+        print(f"report → {REPORT_PATH} ({time.perf_counter() - t0:.2f}s)")
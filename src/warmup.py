@@ -0,0 +1,137 @@
+"""
+Background cache warm-up.
+
+Runs the calls listed in warmup_manifest.json (loaders, entity table, globe
+HTML, chart figures) on a daemon thread, so the first visitor to a fresh
+replica hits warm caches. Readiness is exposed through `is_ready()` /
+`warmup_status()` and, when the H2C2_READY_FILE environment variable is set,
+a marker file that a load-balancer or Kubernetes readiness probe can check.
+
+Readiness covers the app's own caches only. The suggested Genie prompts are
+pre-asked after the replica reports ready, each bounded by
+GENIE_PREFETCH_TIMEOUT, so a slow third-party API never holds back traffic.
+"""
+
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warmup_manifest.json')
+READY_FILE = os.environ.get('H2C2_READY_FILE', '')
+
+_log = logging.getLogger('h2c2.warmup')
+
+_lock = threading.Lock()
+_thread = None
+_status = {'state': 'idle', 'started': None, 'finished': None, 'tasks': {}, 'genie': {}}
+
+
+def load_manifest(path=None) -> dict:
+    with open(path or MANIFEST_PATH, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest.setdefault('tasks', [])
+    manifest.setdefault('genie_prompts', [])
+    return manifest
+
+
+def _resolve(call):
+    module_name, func_name = call.split(':', 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _run_task(name, func, *args):
+    t0 = time.perf_counter()
+    try:
+        func(*args)
+    except Exception as exc:
+        _status['tasks'][name] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        _log.warning("warm-up task %s failed: %s", name, exc)
+        return
+    _status['tasks'][name] = {'ok': True, 'seconds': round(time.perf_counter() - t0, 3)}
+
+
+def _run_manifest_task(task):
+    args = task.get('args', [])
+    name = task['call'] + (f"({', '.join(map(str, args))})" if args else '')
+    try:
+        func = _resolve(task['call'])
+    except (ImportError, AttributeError, ValueError) as exc:
+        _status['tasks'][name] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        return
+    _run_task(name, func, *args)
+
+
+def run_warmup(manifest=None) -> dict:
+    """Run every manifest task in order (blocking). Failed tasks do not stop the run."""
+    manifest = manifest or load_manifest()
+    # Cached functions look up a ScriptRunContext and warn once per call when
+    # run off the script thread; expected here, so keep the server log clean.
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    if READY_FILE and os.path.exists(READY_FILE):
+        os.remove(READY_FILE)
+
+    _status.update(state='warming', started=time.time(), finished=None, tasks={}, genie={})
+    for task in manifest['tasks']:
+        _run_manifest_task(task)
+
+    _status.update(state='ready', finished=time.time())
+    if READY_FILE:
+        with open(READY_FILE, 'w', encoding='utf-8') as f:
+            json.dump(warmup_status(), f, indent=2)
+    failed = [n for n, t in _status['tasks'].items() if not t['ok']]
+    _log.info("warm-up finished in %.1fs (%d tasks, %d failed)",
+              _status['finished'] - _status['started'], len(_status['tasks']), len(failed))
+
+    _prefetch_genie(manifest['genie_prompts'])
+    return warmup_status()
+
+
+def _prefetch_genie(prompts):
+    """Pre-ask Genie prompts once the replica is ready; results go to status['genie'], not readiness."""
+    from genie import GENIE_PREFETCH_TIMEOUT, GENIE_PROMPTS, cached_genie_answer, genie_configured
+
+    if prompts == 'default':
+        prompts = GENIE_PROMPTS
+    if not prompts or not genie_configured():
+        return
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        try:
+            cached_genie_answer(prompt, _timeout=GENIE_PREFETCH_TIMEOUT)
+        except Exception as exc:
+            _status['genie'][prompt] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+            _log.warning("pre-asking Genie %r failed: %s", prompt, exc)
+            continue
+        _status['genie'][prompt] = {'ok': True, 'seconds': round(time.perf_counter() - t0, 3)}
+
+
+def rewarm(calls, manifest=None):
+    """Re-run only the manifest tasks whose call is in `calls` (after an invalidation)."""
+    manifest = manifest or load_manifest()
+    for task in manifest['tasks']:
+        if task['call'] in calls:
+            _run_manifest_task(task)
+
+
+def start_warmup(manifest_path=None):
+    """Start the warm-up thread once per process; later calls return the same thread."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            manifest = load_manifest(manifest_path)
+            _thread = threading.Thread(
+                target=run_warmup, args=(manifest,), name='h2c2-warmup', daemon=True,
+            )
+            _thread.start()
+    return _thread
+
+
+def is_ready() -> bool:
+    return _status['state'] == 'ready'
+
+
+def warmup_status() -> dict:
+    return {**_status, 'tasks': dict(_status['tasks']), 'genie': dict(_status['genie'])}
@@ -0,0 +1,199 @@
+"""
+Per-year country cubes for the analytics and dashboard year slider.
+
+The country metrics table is a single snapshot, but humanitarian-response-
+plans.csv covers every plan year since 2000. This builds, once per data
+release, dense year × country arrays of the analytics metrics:
+
+    requirements                 plan requirements allocated to the country-year (hrp_plans)
+    need_prevalence              In Need / Population
+    budget_per_pin               requirements / In Need
+    normalized_need / _budget    min-max scaled across the countries with a plan that year
+    mismatch                     normalized_need − normalized_budget
+    severity                     Need Prevalence quartile among that year's countries
+                                 (0 Low … 3 Critical, -1 no plan or no metrics)
+    planned                      the country had a plan that year
+
+Countries with plans but no row in the metrics table are kept as columns
+with `planned` set and NaN metrics, so the globe can still show them; the
+metrics slices (`year_frame`, `year_summary`) cover the metrics countries.
+
+In Need and Population have no history in the tree, so every year uses the
+snapshot figures; the yearly picture moves with requirements and with which
+countries had a plan. Cubes are written to data/validated/year_cubes.npz
+together with the hashes of their sources, and `read_cubes` rebuilds them
+only when a source changed. Moving the slider is then `year_frame`: one
+row of each array, no regrouping of the plans.
+
+    python src/year_cubes.py              # build and print the per-year summary
+"""
+
+import os
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_versions import file_digest
+from hrp_plans import PLANS_PATH, allocate_requirements, country_year_requirements, load_plans
+from validation import OUTPUT_DIR, TABLES, clean_table
+
+CUBES_PATH = os.path.join(OUTPUT_DIR, 'year_cubes.npz')
+SOURCES = {'plans': PLANS_PATH, 'country_metrics': TABLES['country_metrics']['source']}
+SEVERITY_LABELS = np.array(['Low', 'Medium', 'High', 'Critical'])
+# Plan year of the country metrics snapshot; the slider opens on it
+SNAPSHOT_YEAR = 2025
+# Stored with the source hashes; bump when the arrays in the file change
+FORMAT = 2
+
+
+# ── Build ────────────────────────────────────────────────────────────────────
+
+def _min_max(cube) -> np.ndarray:
+    """Scale each year's row to 0–1 over the countries present (NaN elsewhere)."""
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # Years without any country are all-NaN rows and stay NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lo = np.nanmin(cube, axis=1, keepdims=True)
+        hi = np.nanmax(cube, axis=1, keepdims=True)
+    return (cube - lo) / (hi - lo)
+
+
+def _severity(prevalence) -> np.ndarray:
+    """Quartile code per cell against its own year's quartiles, as load_country_metrics labels the snapshot."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q = np.nanquantile(prevalence, [0.25, 0.5, 0.75], axis=1)[..., None]
+    codes = (prevalence > q[0]).astype(np.int8) + (prevalence > q[1]) + (prevalence > q[2])
+    return np.where(np.isnan(prevalence), -1, codes).astype(np.int8)
+
+
+def build_cubes(requirements, metrics) -> dict:
+    """
+    Cubes from a country-year requirements index (iso3, year, revisedRequirements)
+    and the snapshot metrics (Country ISO3, Population, In Need), over every
+    country in either.
+    """
+    iso3 = np.union1d(np.asarray(metrics['Country ISO3'].unique(), dtype=str),
+                      np.asarray(requirements['iso3'].unique(), dtype=str))
+    rows = requirements
+    first, last = (int(rows['year'].min()), int(rows['year'].max())) if len(rows) else (0, -1)
+    years = np.arange(first, last + 1)
+
+    req = np.full((len(years), len(iso3)), np.nan)
+    req[rows['year'].to_numpy() - first, np.searchsorted(iso3, rows['iso3'].to_numpy())] = \
+        rows['revisedRequirements'].to_numpy(dtype=float)
+    # A plan with nothing allocated is no plan
+    req[~(req > 0)] = np.nan
+
+    snapshot = metrics.drop_duplicates('Country ISO3').set_index('Country ISO3').reindex(iso3)
+    in_need = snapshot['In Need'].to_numpy(dtype=float)
+    population = snapshot['Population'].to_numpy(dtype=float)
+    prevalence = np.where(np.isnan(req), np.nan, in_need / population)
+    budget = req / in_need
+    normalized_need, normalized_budget = _min_max(prevalence), _min_max(budget)
+    return {
+        'years': years, 'iso3': iso3, 'in_need': in_need, 'population': population,
+        'requirements': req, 'need_prevalence': prevalence, 'budget_per_pin': budget,
+        'normalized_need': normalized_need, 'normalized_budget': normalized_budget,
+        'mismatch': normalized_need - normalized_budget, 'severity': _severity(prevalence),
+        'planned': ~np.isnan(req),
+    }
+
+
+def _source_hashes() -> np.ndarray:
+    return np.array([f'format={FORMAT}'] + [f'{name}={file_digest(path)}' for name, path in SOURCES.items()])
+
+
+def write_cubes(path=CUBES_PATH, weighting='equal') -> dict:
+    """Build from the plans and the validated country metrics and write them with their source hashes."""
+    requirements = country_year_requirements(allocate_requirements(load_plans(), weighting))
+    cubes = build_cubes(requirements, clean_table('country_metrics'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp name: several threads or servers may rebuild at once, the last replace wins
+    fd, tmp_path = tempfile.mkstemp(prefix='.year_cubes-', suffix='.tmp.npz', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, sources=_source_hashes(), **cubes)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return cubes
+
+
+def read_cubes(path=CUBES_PATH) -> dict:
+    """The cubes on disk, rebuilt first when a source changed since they were written."""
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            cubes = {name: stored[name] for name in stored.files}
+        if np.array_equal(cubes.pop('sources'), _source_hashes()):
+            return cubes
+    return write_cubes(path)
+
+
+# ── Slicing ──────────────────────────────────────────────────────────────────
+
+def year_index(cubes, year) -> int:
+    years = cubes['years']
+    if not len(years) or not years[0] <= year <= years[-1]:
+        raise KeyError(f"no cube for {year}; years {years[0]}–{years[-1]}" if len(years) else "no cube years")
+    return int(year - years[0])
+
+
+def default_year(cubes) -> int:
+    """SNAPSHOT_YEAR when the cubes reach it, else their last year."""
+    return int(min(SNAPSHOT_YEAR, cubes['years'][-1]))
+
+
+def year_frame(cubes, year) -> pd.DataFrame:
+    """
+    Countries with a plan in `year`, with the columns of load_country_metrics
+    (Country ISO3, In Need, Population, revisedRequirements, Need Prevalence,
+    Budget per PIN, Normalized …, Mismatch Score, Severity Quartile).
+    """
+    i = year_index(cubes, year)
+    present = cubes['severity'][i] >= 0
+    return pd.DataFrame({
+        'Country ISO3': cubes['iso3'][present],
+        'Population': cubes['population'][present],
+        'In Need': cubes['in_need'][present],
+        'revisedRequirements': cubes['requirements'][i, present],
+        'Need Prevalence': cubes['need_prevalence'][i, present],
+        'Budget per PIN': cubes['budget_per_pin'][i, present],
+        'Normalized Need Prevalence': cubes['normalized_need'][i, present],
+        'Normalized Budget per PIN': cubes['normalized_budget'][i, present],
+        'Mismatch Score': cubes['mismatch'][i, present],
+        'Severity Quartile': SEVERITY_LABELS[cubes['severity'][i, present]],
+    })
+
+
+def year_summary(cubes) -> pd.DataFrame:
+    """One row per year over the metrics countries: countries with a plan, total requirements, critical count, worst mismatch."""
+    mismatch = cubes['mismatch']
+    present = cubes['severity'] >= 0
+    counts = present.sum(axis=1)
+    worst = np.where(counts > 0, np.argmax(np.where(present, mismatch, -np.inf), axis=1), 0)
+    return pd.DataFrame({
+        'Year': cubes['years'],
+        'Countries': counts,
+        'Requirements': np.nansum(np.where(present, cubes['requirements'], np.nan), axis=1),
+        'Critical': (cubes['severity'] == 3).sum(axis=1),
+        'Most Overlooked': np.where(counts > 0, cubes['iso3'][worst], ''),
+        'Max Mismatch': np.where(counts > 0, mismatch[np.arange(len(worst)), worst], np.nan),
+    })
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the per-year country cubes behind the year slider.')
+    args = parser.parse_args()
+
+    cubes = write_cubes()
+    summary = year_summary(cubes)
+    with pd.option_context('display.width', 160, 'display.float_format', '{:,.3f}'.format):
+        print(summary.to_string(index=False))
+    print(f"\n{len(cubes['iso3'])} countries × {len(cubes['years'])} years → {CUBES_PATH}")
@@ -0,0 +1,42 @@
+"""
+Shared fixtures for the test suite (run from the repo root: `python -m pytest`).
+
+The app modules are flat files in src/, imported the way the app imports
+them. Fixtures that read the repo's data files are session-scoped, so the
+CSVs are parsed once per run.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.normpath(SRC_DIR))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture(scope='session')
+def training_panel():
+    from forecast_model import load_training_panel
+
+    return load_training_panel()
+
+
+@pytest.fixture(scope='session')
+def training_features(training_panel):
+    from forecast_features import build_features
+
+    return build_features(training_panel)
+
+
+@pytest.fixture(scope='session')
+def plans():
+    from hrp_plans import load_plans
+
+    return load_plans()
@@ -0,0 +1,39 @@
+import pytest
+
+import backtest
+from backtest import _fit_version, _xgboost_task
+
+pytest.importorskip('xgboost')
+
+
+@pytest.fixture
+def fresh_fit_versions():
+    _fit_version.cache_clear()
+    yield
+    _fit_version.cache_clear()
+
+
+def test_xgboost_fits_are_cached_per_training_input(training_features, tmp_path, fresh_fit_versions):
+    features = training_features[training_features['year'] <= 2020]
+    first, fitted = _xgboost_task(features, 2020, [2021, 2022], str(tmp_path))
+    assert fitted == 2
+    again, fitted = _xgboost_task(features, 2020, [2021, 2022], str(tmp_path))
+    assert fitted == 0
+    assert again.equals(first)
+
+
+def test_parameter_change_invalidates_cached_xgboost_fits(training_features, tmp_path, monkeypatch,
+                                                          fresh_fit_versions):
+    features = training_features[training_features['year'] <= 2020]
+    _xgboost_task(features, 2020, [2021], str(tmp_path))
+    monkeypatch.setitem(backtest.XGB_PARAMS, 'n_estimators', 20)
+    _fit_version.cache_clear()
+    _, fitted = _xgboost_task(features, 2020, [2021], str(tmp_path))
+    assert fitted == 2
+
+
+def test_library_upgrade_changes_the_fit_version(monkeypatch, fresh_fit_versions):
+    before = _fit_version('xgboost')
+    monkeypatch.setattr(backtest, '_library_version', lambda name: '0.0-test')
+    _fit_version.cache_clear()
+    assert _fit_version('xgboost') != before
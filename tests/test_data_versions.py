@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+
+import pytest
+import streamlit as st
+
+import data_versions
+import data_watch
+from data_versions import KEEP_VERSIONS, current_version, pinned, refresh, versioned
+
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+LOADER = f'{__name__}:_loader'
+DERIVED = f'{__name__}:_derived'
+_state = {'path': None, 'loads': 0}
+
+
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS, show_spinner=False)
+def _loader(data_version=None):
+    _state['loads'] += 1
+    with open(_state['path'], encoding='utf-8') as f:
+        return f.read()
+
+
+@versioned
+@st.cache_data(max_entries=KEEP_VERSIONS, show_spinner=False)
+def _derived(data_version=None):
+    return _loader().upper()
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """A watched file read by `_loader`, with `_derived` built from it, in a fresh generation."""
+    path = data_watch._data_path(str(tmp_path / 'source.csv'))
+    monkeypatch.setattr(data_watch, 'FILE_DEPENDENTS', {path: [LOADER]})
+    monkeypatch.setattr(data_watch, 'CACHE_DEPENDENTS', {LOADER: [DERIVED]})
+    monkeypatch.setattr(data_versions, '_graph', {})
+    monkeypatch.setattr(data_versions, '_generation', {'id': 0, 'files': {}})
+    monkeypatch.setattr(data_versions, '_warm', lambda calls: None)
+    _state.update(path=path, loads=0)
+    _loader.clear()
+    _derived.clear()
+
+    def write(text):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    write('a\n1\n')
+    return path, write
+
+
+def test_version_follows_file_content_after_refresh(source):
+    path, write = source
+    before = current_version(LOADER), current_version(DERIVED)
+
+    write('a\n2\n')
+    # The generation in use keeps the content it first read until refreshed
+    assert (current_version(LOADER), current_version(DERIVED)) == before
+    assert refresh([path], warm=False, blocking=True) == [LOADER, DERIVED]
+    after = current_version(LOADER), current_version(DERIVED)
+    assert after[0] != before[0] and after[1] != before[1]
+    assert data_versions.status()['generation'] == 1
+
+    # Rewriting the same bytes is not a new version
+    write('a\n2\n')
+    assert refresh([path], warm=False, blocking=True) == []
+    assert (current_version(LOADER), current_version(DERIVED)) == after
+
+
+def test_versioned_cache_is_rekeyed_not_cleared(source):
+    path, write = source
+    assert _derived() == 'A\n1\n'
+    assert _derived() == 'A\n1\n' and _state['loads'] == 1
+
+    write('a\n2\n')
+    assert _derived() == 'A\n1\n'      # stale but consistent until the switch
+    refresh([path], warm=False, blocking=True)
+    assert _derived() == 'A\n2\n' and _state['loads'] == 2
+
+    # The previous version's entry is still held: switching back does not reload
+    write('a\n1\n')
+    refresh([path], warm=False, blocking=True)
+    assert _derived() == 'A\n1\n' and _state['loads'] == 2
+
+
+def test_only_keep_versions_entries_are_held(source):
+    path, write = source
+    contents = [f'a\n{i}\n' for i in range(KEEP_VERSIONS + 1)]
+    for text in contents:
+        write(text)
+        refresh([path], warm=False, blocking=True)
+        _loader()
+    assert _state['loads'] == len(contents)
+    # The oldest version was evicted, the newest KEEP_VERSIONS are still served from cache
+    for text in contents[1:]:
+        write(text)
+        refresh([path], warm=False, blocking=True)
+        assert _loader() == text
+    assert _state['loads'] == len(contents)
+    write(contents[0])
+    refresh([path], warm=False, blocking=True)
+    assert _loader() == contents[0] and _state['loads'] == len(contents) + 1
+
+
+def test_old_generation_is_served_while_the_new_one_warms(source, monkeypatch):
+    path, write = source
+    assert _derived() == 'A\n1\n'
+    old = current_version(DERIVED)
+    started, release = threading.Event(), threading.Event()
+    warmed = {}
+
+    def warm(calls):
+        warmed['calls'] = list(calls)
+        warmed['version'] = current_version(DERIVED)
+        warmed['value'] = _derived()
+        started.set()
+        assert release.wait(5)
+
+    monkeypatch.setattr(data_versions, '_warm', warm)
+    write('a\n2\n')
+    refresh([path])
+    assert started.wait(5)
+    # Sessions keep the previous generation while the warm-up runs
+    assert current_version(DERIVED) == old
+    assert _derived() == 'A\n1\n'
+    assert warmed['version'] != old and warmed['value'] == 'A\n2\n'
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while current_version(DERIVED) == old and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert current_version(DERIVED) == warmed['version']
+    loads = _state['loads']
+    assert _derived() == 'A\n2\n' and _state['loads'] == loads   # served from the warmed entry
+    assert warmed['calls'] == [LOADER, DERIVED]
+
+
+def test_pinned_files_apply_to_this_thread_only(source):
+    path, _ = source
+    served = current_version(LOADER)
+    seen = {}
+    with pinned({path: 'other'}):
+        pinned_version = current_version(LOADER)
+        worker = threading.Thread(target=lambda: seen.update(version=current_version(LOADER)))
+        worker.start()
+        worker.join()
+    assert pinned_version != served
+    assert seen['version'] == served == current_version(LOADER)
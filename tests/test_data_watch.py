@@ -0,0 +1,112 @@
+import importlib
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+import data_watch
+import sector_matrix
+from data_watch import CACHE_DEPENDENTS, FILE_DEPENDENTS, DataWatcher, affected_caches, invalidate
+
+
+class _Cache:
+    """Stands in for a st.cache_data function: counts clear() calls."""
+
+    def __init__(self):
+        self.cleared = 0
+
+    def clear(self):
+        self.cleared += 1
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    """Two watched CSVs in a temp dir, each read by one loader; `derived` is built from loader `a`."""
+    module = types.ModuleType('watch_fakes')
+    for name in ('load_a', 'load_b', 'derived_a'):
+        setattr(module, name, _Cache())
+    monkeypatch.setitem(sys.modules, 'watch_fakes', module)
+    paths = {name: data_watch._data_path(str(tmp_path / f'{name}.csv')) for name in ('a', 'b')}
+    for path in paths.values():
+        with open(path, 'w') as f:
+            f.write('x\n1\n')
+    monkeypatch.setattr(data_watch, 'FILE_DEPENDENTS', {paths['a']: ['watch_fakes:load_a'],
+                                                        paths['b']: ['watch_fakes:load_b']})
+    monkeypatch.setattr(data_watch, 'CACHE_DEPENDENTS', {'watch_fakes:load_a': ['watch_fakes:derived_a']})
+    return module, paths, str(tmp_path)
+
+
+def _cleared(module):
+    return {name for name in ('load_a', 'load_b', 'derived_a') if getattr(module, name).cleared}
+
+
+def test_watched_files_exist_or_are_built_at_ingest():
+    built = {data_watch._data_path(sector_matrix.OUTPUT_PATH)}
+    missing = [path for path in FILE_DEPENDENTS if not os.path.exists(path) and path not in built]
+    assert not missing
+
+
+def test_every_mapped_call_is_a_cached_function():
+    calls = {call for calls in FILE_DEPENDENTS.values() for call in calls}
+    calls |= set(CACHE_DEPENDENTS) | {call for calls in CACHE_DEPENDENTS.values() for call in calls}
+    for call in sorted(calls):
+        module_name, func_name = call.split(':', 1)
+        func = getattr(importlib.import_module(module_name), func_name)
+        assert hasattr(func, 'clear'), call
+
+
+def test_forecast_change_reaches_only_forecast_caches():
+    path = os.path.join(data_watch.MODELS_DIR, 'forecast_results_2026_2030.csv')
+    calls = affected_caches([path])
+    assert calls[0] == 'utils:load_forecast_data'
+    for downstream in ('utils:load_high_risk_data', 'uncertainty:get_uncertainty_bands',
+                       'forecast_page:get_forecast_index', 'scenarios:run_scenario'):
+        assert calls.index(downstream) > 0
+    # Each cache comes after every affected cache it is built from
+    for parent, children in CACHE_DEPENDENTS.items():
+        for child in children:
+            if parent in calls and child in calls:
+                assert calls.index(parent) < calls.index(child), (parent, child)
+    assert 'utils:load_country_metrics' not in calls
+    assert 'utils:load_sector_matrix' not in calls
+
+
+def test_a_write_settles_after_two_polls(watched):
+    _, paths, tmp_dir = watched
+    watcher = DataWatcher(dirs=[tmp_dir])
+    known, pending = data_watch._snapshot([tmp_dir]), {}
+    with open(paths['a'], 'a') as f:
+        f.write('2\n')
+    assert watcher.poll(known, pending) == []
+    with open(paths['a'], 'a') as f:
+        f.write('3\n')   # still being written: the signature moved again
+    assert watcher.poll(known, pending) == []
+    assert watcher.poll(known, pending) == [paths['a']]
+    assert watcher.poll(known, pending) == []
+
+
+def test_invalidate_clears_only_the_changed_files_dependents(watched):
+    module, paths, _ = watched
+    assert invalidate([paths['a']]) == ['watch_fakes:load_a', 'watch_fakes:derived_a']
+    assert _cleared(module) == {'load_a', 'derived_a'}
+
+
+def test_watcher_invalidates_only_the_rewritten_files_dependents(watched, monkeypatch):
+    module, paths, tmp_dir = watched
+    done = threading.Event()
+    seen = []
+    # refresh() re-keys versions; clearing directly shows which caches the watcher hands on
+    monkeypatch.setattr(data_watch, 'refresh', lambda changed, warm, blocking: invalidate(changed))
+    watcher = DataWatcher(dirs=[tmp_dir], interval=0.05, rewarm=False,
+                          on_change=lambda changed, calls: (seen.append((changed, calls)), done.set()))
+    watcher.start()
+    try:
+        with open(paths['b'], 'w') as f:
+            f.write('x\n2\n')
+        assert done.wait(5)
+    finally:
+        watcher.stop()
+    assert seen == [([paths['b']], ['watch_fakes:load_b'])]
+    assert _cleared(module) == {'load_b'}
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from feature_store import KEY_COLS, VALUE_COLS, current_version, ensure_store, load_features, read_manifest
+from forecast_features import build_features
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture(scope='module')
+def store_dir(tmp_path_factory):
+    store_dir = str(tmp_path_factory.mktemp('feature_store'))
+    ensure_store(store_dir=store_dir)
+    return store_dir
+
+
+def test_every_snapshot_equals_build_features_on_data_up_to_its_year(store_dir, training_panel):
+    snapshots = read_manifest(store_dir=store_dir)['snapshots']
+    assert snapshots
+    for as_of in sorted(snapshots, key=int):
+        expected = build_features(training_panel[training_panel['year'] <= int(as_of)])[KEY_COLS + VALUE_COLS]
+        pd.testing.assert_frame_equal(load_features(int(as_of), store_dir=store_dir),
+                                      expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_latest_snapshot_covers_every_year(store_dir, training_panel):
+    latest = load_features(store_dir=store_dir)
+    assert latest['year'].max() == training_panel['year'].max()
+    assert sum(read_manifest(store_dir=store_dir)['snapshots'][str(latest['year'].max())]['years'].values()) \
+        == len(latest)
+
+
+def test_year_partitions_are_read_selectively(store_dir):
+    latest = load_features(store_dir=store_dir)
+    subset = load_features(years=[2018, 2019], store_dir=store_dir)
+    pd.testing.assert_frame_equal(subset, latest[latest['year'].isin([2018, 2019])].reset_index(drop=True))
+
+
+def test_ensure_store_reuses_existing_snapshots(store_dir):
+    manifest = read_manifest(store_dir=store_dir)
+    assert ensure_store(store_dir=store_dir) == current_version(store_dir) == manifest['version']
+    assert read_manifest(store_dir=store_dir) == manifest
+
+
+def test_unknown_snapshot_is_a_key_error(store_dir):
+    with pytest.raises(KeyError):
+        load_features(1990, store_dir=store_dir)
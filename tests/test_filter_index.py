@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import BitmapIndex, pack, popcount, unpack
+
+FACETS = ['Region', 'Severity Quartile', 'Risk']
+
+
+@pytest.fixture
+def entities(rng):
+    """Entities with single-valued facets, a multi-valued year facet and two rankable scores."""
+    n_rows = 5_000
+    df = pd.DataFrame({
+        'Region': rng.choice([f'R{i}' for i in range(7)], n_rows),
+        'Severity Quartile': rng.choice(['Low', 'Medium', 'High', 'Critical'], n_rows),
+        'Risk': rng.random(n_rows) < 0.3,
+        'Score': rng.normal(size=n_rows),
+        'Gap': rng.lognormal(18, 1, n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.05, 'Score'] = np.nan
+    years = {year: rng.random(n_rows) < 0.4 for year in range(2000, 2026)}
+    return df, years
+
+
+@pytest.fixture
+def index(entities):
+    df, years = entities
+    return BitmapIndex(df, facets=FACETS, multi={'Year': years}, order_by=['Score', 'Gap'])
+
+
+def _random_filters(df, rng) -> dict:
+    filters = {}
+    for facet in FACETS:
+        values = sorted(df[facet].unique())
+        if rng.random() < 0.7:
+            filters[facet] = list(rng.choice(values, rng.integers(1, len(values) + 1), replace=False))
+    first = int(rng.integers(2000, 2026))
+    filters['Year'] = list(range(first, int(rng.integers(first, 2026)) + 1))
+    return filters
+
+
+def _reference(df, years, filters, col, n) -> np.ndarray:
+    """The same query with pandas boolean masks and a sort per query."""
+    mask = pd.Series(True, index=df.index)
+    for facet, picked in filters.items():
+        if facet == 'Year':
+            mask &= np.logical_or.reduce([years[y] for y in picked])
+        else:
+            mask &= df[facet].isin(picked)
+    return df[mask].sort_values(col, ascending=False, kind='stable', na_position='last').index.to_numpy()[:n]
+
+
+@pytest.mark.parametrize('n_rows', [0, 1, 63, 64, 65, 1000])
+def test_pack_round_trip(rng, n_rows):
+    mask = rng.random(n_rows) < 0.5
+    words = pack(mask)
+    assert words.dtype == np.uint64 and len(words) == -(-n_rows // 64)
+    np.testing.assert_array_equal(unpack(words, n_rows), mask)
+    assert popcount(words) == mask.sum()
+
+
+def test_filtered_top_n_matches_pandas(entities, index, rng):
+    df, years = entities
+    for i in range(200):
+        filters, col = _random_filters(df, rng), ['Score', 'Gap'][i % 2]
+        words = index.select(filters)
+        np.testing.assert_array_equal(index.top(words, col, 15), _reference(df, years, filters, col, 15))
+        assert index.count(words) == len(_reference(df, years, filters, col, None))
+
+
+def test_empty_facets_do_not_filter(entities, index):
+    df, _ = entities
+    assert index.count(index.select({'Region': [], 'Risk': []})) == len(df)
+    assert index.count(index.select({'Region': ['nowhere']})) == 0
+
+
+def test_values_are_sorted_and_skip_empty_multi_values(entities):
+    df, years = entities
+    index = BitmapIndex(df, facets=['Region'], multi={'Year': {**years, 1999: np.zeros(len(df), dtype=bool)}})
+    assert index.values('Region') == sorted(df['Region'].unique())
+    assert 1999 not in index.values('Year')
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_features import FILL_STRATEGIES, NUMERIC_COLS, build_features, fill_remaining
+
+COLS = ['iso3', 'year'] + list(FILL_STRATEGIES) + NUMERIC_COLS
+
+
+def _notebook_features(df):
+    """The notebook's feature cell, verbatim in behaviour (lambdas and all)."""
+    df = df.sort_values(['iso3', 'year']).reset_index(drop=True)
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').replace(0, np.nan)
+            df[col] = df.groupby('iso3')[col].transform(lambda x: x.ffill().bfill())
+    denom = df['Total_Population']
+    if 'Population' in df.columns:
+        denom = denom.fillna(df['Population'])
+    df['Dependency Ratio'] = df['In Need'] / denom
+    pct = df.groupby('iso3')['In Need'].pct_change(fill_method=None)
+    df['Population Velocity'] = pct.groupby(df['iso3']).transform(
+        lambda x: x.rolling(window=3, min_periods=1).mean()).fillna(0)
+    df['Lagged Requirements'] = df.groupby('iso3')['revisedRequirements'].shift(1)
+    df['Cost per Beneficiary'] = (df['revisedRequirements'] / df['Targeted']).replace([np.inf, -np.inf], np.nan)
+    df['Cost Inflation'] = df.groupby('iso3')['Cost per Beneficiary'].pct_change(fill_method=None)
+    return fill_remaining(df)
+
+
+@pytest.fixture
+def panel(rng):
+    """Shuffled (iso3, year) panel with zeros and gaps, shaped like the merged HRP frame."""
+    n_countries, n_years = 60, 30
+    iso = np.repeat([f'C{i:03d}' for i in range(n_countries)], n_years)
+    n = len(iso)
+    df = pd.DataFrame({
+        'iso3': iso,
+        'year': np.tile(np.arange(2025 - n_years + 1, 2026), n_countries),
+        'revisedRequirements': rng.lognormal(18, 1, n),
+        'In Need': rng.lognormal(14, 1, n),
+        'Targeted': rng.lognormal(13.5, 1, n),
+        'Total_Population': np.repeat(rng.lognormal(16, 1, n_countries), n_years),
+    })
+    for col in NUMERIC_COLS:
+        holes = rng.random(n) < 0.15
+        df.loc[holes, col] = rng.choice([0.0, np.nan], holes.sum())
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_matches_notebook_feature_cell(panel):
+    pd.testing.assert_frame_equal(build_features(panel)[COLS], _notebook_features(panel)[COLS],
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_scenario_keys_build_each_scenario_independently(panel):
+    scenarios = pd.concat([panel.assign(scenario=s) for s in range(3)], ignore_index=True)
+    built = build_features(scenarios, keys=('scenario', 'iso3'))
+    single = build_features(panel)[COLS]
+    for s, rows in built.groupby('scenario'):
+        pd.testing.assert_frame_equal(rows[COLS].reset_index(drop=True), single, check_dtype=False, rtol=1e-9)
+
+
+def test_does_not_modify_input(panel):
+    before = panel.copy()
+    build_features(panel)
+    pd.testing.assert_frame_equal(panel, before)
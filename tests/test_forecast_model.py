@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_model import FEATURES, HORIZON, PREDICTION_COLUMNS, fit_needs_models, score_horizon, validation_rmse
+
+pytest.importorskip('xgboost')
+
+
+def _notebook_future(models, df_merged, features=FEATURES, years=HORIZON):
+    """The notebook's per-country scoring loop."""
+    future_rows = []
+    for iso in df_merged['iso3'].unique():
+        if pd.isna(iso):
+            continue
+        country_data = df_merged[df_merged['iso3'] == iso].sort_values('year', kind='stable')
+        last_row = country_data.iloc[-1]
+        for yr in years:
+            row = {'iso3': iso, 'year': yr}
+            for feat in features:
+                if feat != 'year':
+                    row[feat] = last_row[feat]
+            future_rows.append(row)
+    df_future = pd.DataFrame(future_rows)
+    for target, model in models.items():
+        df_future[PREDICTION_COLUMNS[target]] = model.predict(df_future[features])
+    return df_future
+
+
+@pytest.fixture(scope='module')
+def models(training_features):
+    return fit_needs_models(training_features)
+
+
+def test_batch_scorer_matches_notebook_loop(models, training_features):
+    cols = ['iso3', 'year', 'Predicted_In_Need', 'Predicted_Requirements']
+    batch = score_horizon(models, training_features)
+    loop = _notebook_future(models, training_features)
+    pd.testing.assert_frame_equal(
+        batch[cols].sort_values(['iso3', 'year']).reset_index(drop=True),
+        loop[cols].sort_values(['iso3', 'year']).reset_index(drop=True),
+        check_dtype=False,
+    )
+    assert len(batch) == batch['iso3'].nunique() * len(HORIZON)
+
+
+def test_validation_rmse_is_finite(training_features):
+    rmse = validation_rmse(training_features)
+    assert set(rmse) == set(PREDICTION_COLUMNS)
+    assert all(np.isfinite(v) and v > 0 for v in rmse.values())
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hrp_plans import (WEIGHTINGS, allocate_requirements, allocation_weights, country_year_requirements,
+                       explode_plans, location_counts, population_weights, prefer_national)
+
+
+def _clean_iso3_rowwise(x):
+    """The notebook's clean_iso3: a multi-country plan goes wholesale to its last country."""
+    if isinstance(x, str):
+        parts = [p.strip() for p in x.split('|') if p.strip()]
+        return parts[-1] if parts else x
+    return x
+
+
+@pytest.fixture
+def regional_plans():
+    return pd.DataFrame({
+        'code': ['A', 'B', 'C'],
+        'locations': ['JOR | TUR | LBN', 'SYR', 'TCD|NER'],
+        'years': ['2019 | 2020', '2020', '2021'],
+        'origRequirements': [600.0, 100.0, 50.0],
+        'revisedRequirements': [900.0, 120.0, 80.0],
+    })
+
+
+@pytest.mark.parametrize('weighting', WEIGHTINGS)
+def test_allocation_preserves_located_requirements(plans, weighting):
+    located = plans['locations'].notna()
+    index = country_year_requirements(allocate_requirements(plans, weighting, population_weights()))
+    assert index['revisedRequirements'].sum() == pytest.approx(
+        plans.loc[located, 'revisedRequirements'].sum(), rel=1e-9)
+    assert not index.duplicated(['iso3', 'year']).any()
+
+
+def test_regional_plans_are_spread_over_their_members(plans):
+    multi = location_counts(plans['locations']) > 1
+    assert multi.any()
+    notebook = plans.loc[multi, 'locations'].map(_clean_iso3_rowwise).nunique()
+    assert explode_plans(plans[multi])['iso3'].nunique() > notebook
+
+
+def test_equal_weighting_splits_by_country_and_year(regional_plans):
+    index = country_year_requirements(allocate_requirements(regional_plans)).set_index(['iso3', 'year'])
+    assert index.loc[('JOR', 2019), 'revisedRequirements'] == pytest.approx(150.0)
+    assert index.loc[('SYR', 2020), 'revisedRequirements'] == pytest.approx(120.0)
+    assert index.loc[('SYR', 2020), 'regional_share'] == 0.0
+    assert index.loc[('TCD', 2021), 'regional_share'] == 1.0
+
+
+def test_population_weighting_follows_population_shares(regional_plans):
+    population = pd.Series({'JOR': 1.0, 'TUR': 2.0, 'LBN': 1.0, 'TCD': 3.0})
+    rows = explode_plans(regional_plans)
+    weights = pd.Series(allocation_weights(rows, 'population', population), index=rows.index)
+    by_plan = weights.groupby(rows['plan_row']).sum()
+    np.testing.assert_allclose(by_plan, 1.0)
+    # NER has no figure and takes the plan's mean (TCD's 3.0): an even split
+    tcd_ner = weights[rows['plan_row'] == 2]
+    np.testing.assert_allclose(tcd_ner, 0.5)
+    tur = weights[(rows['iso3'] == 'TUR') & (rows['year'] == 2019)].item()
+    assert tur == pytest.approx(0.5 / 2)
+
+
+def test_unknown_weighting_is_rejected(regional_plans):
+    with pytest.raises(ValueError):
+        allocate_requirements(regional_plans, 'gdp')
+
+
+def test_prefer_national_keeps_the_single_country_plan():
+    df = pd.DataFrame({'iso3': ['SYR', 'SYR', 'JOR'], 'year': [2020, 2020, 2020],
+                       'iso3_original': ['JOR | SYR', 'SYR', 'JOR | SYR'], 'value': [1, 2, 3]})
+    kept = prefer_national(df)
+    assert list(kept['value']) == [2, 3]
+
+
+def test_high_risk_rows_use_the_forecast_plan():
+    from utils import load_forecast_data, load_high_risk_data
+
+    forecast, risk = load_forecast_data(), load_high_risk_data()
+    assert not forecast.duplicated(['iso3', 'year']).any()
+    flagged = forecast[forecast['Risk_Flag']]
+    assert len(risk) == len(flagged)
+    merged = risk.merge(flagged, on=['iso3', 'year'], suffixes=('', '_forecast'), validate='one_to_one')
+    assert (merged['iso3_original'] == merged['iso3_original_forecast']).all()
+    assert risk['Funding_Gap'].is_monotonic_decreasing
@@ -0,0 +1,58 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_registry import MODEL_FILES, latest_version, list_versions, load_bundle, register
+
+pytest.importorskip('xgboost')
+
+
+@pytest.fixture
+def fitted(rng):
+    from xgboost import XGBRegressor
+
+    X = pd.DataFrame({'year': rng.integers(2000, 2026, 200), 'x': rng.random(200)})
+    models = {target: XGBRegressor(n_estimators=5, random_state=0).fit(X, rng.random(200)) for target in MODEL_FILES}
+    trend_params = pd.DataFrame({'iso3': ['AAA'], 'origin': [2010.0], 'intercept': [1.0], 'slope': [0.1]})
+    return models, trend_params, list(X.columns)
+
+
+def _manifest(artifacts_dir, version):
+    with open(os.path.join(artifacts_dir, version, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_register_and_load_latest(fitted, tmp_path):
+    models, trend_params, features = fitted
+    version = register(models, trend_params, features, artifacts_dir=str(tmp_path))
+    assert latest_version(str(tmp_path)) == version and list_versions(str(tmp_path)) == [version]
+    bundle = load_bundle(artifacts_dir=str(tmp_path))
+    X = pd.DataFrame({'year': [2030], 'x': [0.5]})
+    for target, model in models.items():
+        np.testing.assert_array_equal(bundle.model(target).predict(X), model.predict(X))
+
+
+def test_reregistering_identical_models_records_the_latest_metadata(fitted, tmp_path, monkeypatch):
+    models, trend_params, features = fitted
+    artifacts_dir = str(tmp_path)
+    version = register(models, trend_params, features,
+                       metadata={'training_rows': 200, 'tuning': {'trials': 4}, 'hyperparameters': {'a': 1}},
+                       artifacts_dir=artifacts_dir)
+    first = _manifest(artifacts_dir, version)
+
+    monkeypatch.setattr('time.strftime', lambda *args: '2099-01-01T00:00:00Z')
+    again = register(models, trend_params, features,
+                     metadata={'training_rows': 999, 'feature_store': 'abc', 'hyperparameters': {'a': 2}},
+                     artifacts_dir=artifacts_dir)
+    assert again == version
+    manifest = _manifest(artifacts_dir, version)
+    assert manifest['feature_store'] == 'abc'
+    assert manifest['training_rows'] == 999 and manifest['hyperparameters'] == {'a': 2}
+    # Metadata of the earlier run that this run no longer reports is dropped
+    assert 'tuning' not in manifest
+    # Fields that describe the stored files are kept
+    assert manifest['trained_at'] == first['trained_at'] and manifest['files'] == first['files']
+    assert sorted(os.listdir(artifacts_dir)) == sorted(['LATEST', version])
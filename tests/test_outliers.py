@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outliers import FLAG_COLUMNS, IQR_K, MAD_SCALE, MIN_GROUP_SIZE, add_metrics, flagged_regions, score
+
+
+@pytest.fixture
+def admin1(rng):
+    """Admin1 rows in 150 countries with per-country cost levels, a few cost spikes and missing Targeted."""
+    n_rows, n_countries = 30_000, 150
+    country = rng.integers(n_countries, size=n_rows)
+    in_need = rng.lognormal(10, 1.2, n_rows).round()
+    cost = rng.lognormal(6 + country % 5 * 0.2, 0.4, n_rows)
+    cost[rng.random(n_rows) < 0.002] *= 20
+    df = pd.DataFrame({
+        'Country ISO3': np.char.add('C', country.astype(str).astype('U3')),
+        'Admin 1 Name': np.char.add('R', np.arange(n_rows).astype(str)),
+        'In Need': in_need,
+        'Targeted': (in_need * rng.beta(3, 2, n_rows)).round(),
+        'Cost_per_Beneficiary': cost,
+    })
+    df.loc[rng.random(n_rows) < 0.01, 'Targeted'] = np.nan
+    return add_metrics(df)
+
+
+def _reference(df, by, metric):
+    """The same statistics from a per-group loop over pandas quantiles."""
+    median, low, z = (pd.Series(np.nan, index=df.index) for _ in range(3))
+    for _, rows in df.groupby(by)[metric]:
+        values = rows.dropna()
+        if len(values) < MIN_GROUP_SIZE:
+            continue
+        med = values.median()
+        q1, q3 = values.quantile([0.25, 0.75])
+        mad = (values - med).abs().median()
+        median[rows.index] = med
+        low[rows.index] = q1 - IQR_K * (q3 - q1) if q3 > q1 else np.nan
+        z[rows.index] = MAD_SCALE * (rows - med) / mad if mad > 0 else np.nan
+    return median, low, z
+
+
+@pytest.mark.parametrize('metric', ['Cost_per_Beneficiary', 'Targeting Efficiency'])
+def test_grouped_statistics_match_per_group_pandas(admin1, metric):
+    scored = score(admin1, ['Country ISO3'])
+    rows = scored[scored['Metric'] == metric].set_index('row')
+    median, low, z = _reference(admin1, ['Country ISO3'], metric)
+    for name, expected in (('Group Median', median), ('IQR Low', low), ('Robust Z', z)):
+        np.testing.assert_allclose(rows[name].to_numpy(), expected.loc[rows.index].to_numpy(),
+                                   equal_nan=True, err_msg=name)
+
+
+def test_spikes_are_flagged(admin1):
+    scored = score(admin1, ['Country ISO3'], metrics=['Cost_per_Beneficiary'])
+    assert scored['Z Flag'].any() and scored['IQR Flag'].any()
+    assert scored['Z Flag'].mean() < 0.05
+
+
+def test_small_and_constant_groups_get_no_score():
+    df = pd.DataFrame({'g': ['a'] * 3 + ['b'] * 6, 'Cost_per_Beneficiary': [1, 2, 50, 5, 5, 5, 5, 5, 5]})
+    scored = score(df, ['g'], metrics=['Cost_per_Beneficiary'])
+    assert scored['Group Median'].iloc[:3].isna().all()
+    assert scored['Robust Z'].isna().all()
+    assert not (scored['Z Flag'] | scored['IQR Flag']).any()
+
+
+def test_flagged_regions_from_repo_data():
+    result = flagged_regions()
+    assert list(result.columns) == FLAG_COLUMNS
+    assert result['Rule'].isin(['robust z + IQR', 'robust z', 'IQR']).all()
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from feature_store import load_features
+from pipeline import DATA_DIR, SOURCE_FILES, STAGES, run, stage_keys
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('xgboost')
+
+
+@pytest.fixture
+def params(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for name in SOURCE_FILES.values():
+        shutil.copy(os.path.join(DATA_DIR, name), data_dir / name)
+    return {'data_dir': str(data_dir), 'out_dir': str(tmp_path / 'out'),
+            'store_dir': str(tmp_path / 'feature_store'), 'funding_engine': 'linear'}
+
+
+def _run(params, cache_dir, **overrides):
+    """Run to `save`; returns the stages that ran."""
+    run(params={**params, **overrides}, cache_dir=str(cache_dir), log=None)
+    return {name for name, state, _ in run.last if state == 'ran'}
+
+
+def test_threshold_changes_only_the_risk_keys(params):
+    before = stage_keys(params)
+    after = stage_keys({**params, 'risk_threshold': 1.3})
+    assert {name for name in STAGES if before[name] != after[name]} == {'risk', 'save'}
+
+
+def test_threshold_change_reruns_only_risk(params, tmp_path):
+    cache = tmp_path / 'cache'
+    assert _run(params, cache) == set(STAGES)
+    assert _run(params, cache) == {'save'}
+
+    assert _run(params, cache, risk_threshold=1.3) == {'risk', 'save'}
+    # Unchanged upstream stages are served from their cache without loading their inputs
+    assert {name for name, _, _ in run.last} == {'needs', 'funding', 'risk', 'save'}
+    flagged = pd.read_csv(os.path.join(params['out_dir'], 'high_neglect_risk_2026_2030.csv'))
+    forecast = pd.read_csv(os.path.join(params['out_dir'], 'forecast_results_2026_2030.csv'))
+    assert len(flagged) == (forecast['Predicted_Requirements'] > 1.3 * forecast['Predicted_Funding']).sum()
+
+
+def test_code_change_invalidates_the_stage_and_its_downstream(params, tmp_path, monkeypatch):
+    cache = tmp_path / 'cache'
+    _run(params, cache)
+    monkeypatch.setattr(STAGES['funding'], 'code_version', lambda: 'edited')
+    assert _run(params, cache) == {'funding', 'risk', 'save'}
+
+
+def test_input_change_invalidates_everything_downstream_of_load(params, tmp_path):
+    cache = tmp_path / 'cache'
+    _run(params, cache)
+    summary = os.path.join(params['data_dir'], SOURCE_FILES['summary'])
+    df = pd.read_csv(summary)
+    df.loc[0, 'In Need'] = df.loc[0, 'In Need'] * 2
+    df.to_csv(summary, index=False)
+    assert _run(params, cache) == set(STAGES)
+
+
+def test_features_come_from_the_feature_store(params, tmp_path):
+    features = run(('features',), params=params, cache_dir=None, log=None)['features']
+    pd.testing.assert_frame_equal(features, load_features(store_dir=params['store_dir']))
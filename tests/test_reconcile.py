@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reconcile import ABS_TOL, METRICS, REL_TOL, reconcile, reconciled_summary
+
+
+@pytest.fixture
+def rollups(rng):
+    """Admin1 rows and country totals that match, drift by up to ±20% or lack some figures."""
+    n_countries, n_rows = 200, 50_000
+    iso3 = np.array([f'C{i:03d}' for i in range(n_countries)])
+    admin1 = pd.DataFrame({
+        'Country ISO3': iso3[rng.integers(n_countries, size=n_rows)],
+        'Admin 1 Name': np.arange(n_rows).astype(str),
+        'Population': rng.lognormal(12, 1, n_rows).round(),
+        'In Need': rng.lognormal(10, 1, n_rows).round(),
+        'Targeted': rng.lognormal(9, 1, n_rows).round(),
+    })
+    admin1.loc[rng.random(n_rows) < 0.001, 'Targeted'] = np.nan
+    sums = admin1.groupby('Country ISO3')[['Population', 'In Need', 'Targeted']].sum()
+    drift = np.where(rng.random(sums.shape) < 0.1, rng.uniform(0.8, 1.2, sums.shape), 1.0)
+    country = (sums * drift).rename(columns={'Population': 'Total_Population'}).reset_index()
+    return admin1, country
+
+
+def _reference(admin1, country, rel_tol=REL_TOL, abs_tol=ABS_TOL):
+    """Status per (country, metric) from a plain loop over countries."""
+    statuses = {}
+    totals = country.set_index('Country ISO3')
+    for iso3, rows in admin1.groupby('Country ISO3'):
+        for admin1_col, country_col in METRICS.items():
+            values = rows[admin1_col].dropna()
+            total = totals.loc[iso3, country_col]
+            if values.empty:
+                status = 'admin0 only'
+            elif abs(values.sum() - total) <= max(abs_tol, rel_tol * abs(total)):
+                status = 'match'
+            else:
+                status = 'admin1 incomplete' if len(values) < len(rows) else 'mismatch'
+            statuses[(iso3, admin1_col)] = status
+    return statuses
+
+
+def test_statuses_match_per_country_loop(rollups):
+    admin1, country = rollups
+    result = reconcile(admin1, country)
+    assert dict(zip(zip(result['Country ISO3'], result['Metric']), result['Status'])) == _reference(admin1, country)
+    assert {'match', 'mismatch', 'admin1 incomplete'} <= set(result['Status'])
+
+
+def test_admin1_only_totals_are_filled_from_complete_sums():
+    admin1 = pd.DataFrame({'Country ISO3': ['AAA', 'AAA', 'BBB'], 'Population': [10.0, 20.0, 5.0],
+                           'In Need': [1.0, np.nan, 2.0], 'Targeted': [1.0, 1.0, 1.0]})
+    country = pd.DataFrame({'Country ISO3': ['BBB'], 'Total_Population': [5.0], 'In Need': [2.0],
+                            'Targeted': [1.0]})
+    result = reconcile(admin1, country)
+    statuses = dict(zip(zip(result['Country ISO3'], result['Metric']), result['Status']))
+    assert statuses[('AAA', 'Population')] == 'admin1 only'
+    assert statuses[('BBB', 'Population')] == 'match'
+
+    summary = reconciled_summary(country, result).set_index('Country ISO3')
+    assert summary.loc['AAA', 'Total_Population'] == 30.0
+    # In Need is missing in one AAA region, so its partial sum does not become the total
+    assert np.isnan(summary.loc['AAA', 'In Need'])
+    assert summary.loc['AAA', 'Population Status'] == 'admin1 only'
@@ -0,0 +1,87 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+import data_versions
+import scenarios
+from scenarios import BASE_YEAR, REGIONS, apply_scenario, get_scenario_base, run_scenario, scenario_key
+from utils import load_forecast_data
+
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+
+def _synthetic_base(rng, n_countries=200, n_years=15):
+    n = n_countries * n_years
+    year = np.tile(np.arange(BASE_YEAR, BASE_YEAR + n_years), n_countries)
+    return {
+        'iso3': np.repeat(np.arange(n_countries).astype(str), n_years),
+        'year': year,
+        't': (year - BASE_YEAR).astype(float),
+        'region': rng.integers(0, len(REGIONS), n),
+        'requirements': rng.lognormal(19, 1, n),
+        'funding': rng.lognormal(18.5, 1.5, n),
+    }
+
+
+def test_baseline_reproduces_the_committed_forecast():
+    forecast = load_forecast_data()
+    out = apply_scenario(get_scenario_base(), scenario_key())
+    np.testing.assert_allclose(out['gap'], forecast['Funding_Gap'].to_numpy(dtype=float),
+                               rtol=1e-6, atol=100)   # the published gap was computed in float32
+    np.testing.assert_array_equal(out['at_risk'], forecast['Risk_Flag'].to_numpy(dtype=bool))
+
+
+@pytest.mark.parametrize('synthetic', [False, True], ids=['repo forecast', '200 countries x 15 years'])
+def test_uncached_scenario_is_well_under_100_ms(rng, synthetic):
+    base = _synthetic_base(rng) if synthetic else get_scenario_base()
+    keys = [scenario_key(g, i, th, {r: s for r in REGIONS})
+            for g, i, th, s in zip(rng.uniform(-0.3, 0.3, 50), rng.uniform(0, 0.2, 50),
+                                   rng.uniform(1, 2, 50), rng.uniform(-0.5, 0.5, 50))]
+    timings = []
+    for key in keys:
+        t0 = time.perf_counter()
+        out = apply_scenario(base, key)
+        np.argsort(-out['gap'][out['at_risk']], kind='stable')
+        timings.append(time.perf_counter() - t0)
+    assert np.median(timings) < 0.1
+
+
+def test_scenario_keys_are_normalised():
+    assert scenario_key() == scenario_key(0.0, 0.0, scenarios.DEFAULT_THRESHOLD, {r: 0.0 for r in REGIONS})
+    assert scenario_key(0.100001) == scenario_key(0.1)
+    assert scenario_key(region_shocks={REGIONS[0]: -0.2}) != scenario_key(region_shocks={REGIONS[1]: -0.2})
+    assert scenario_key(0.1) != scenario_key(requirement_inflation=0.1)
+
+
+def test_run_scenario_is_memoized_per_key_and_data_version(monkeypatch):
+    builds = []
+    real_base = get_scenario_base()
+
+    def counting_base():
+        builds.append(1)
+        return real_base
+
+    monkeypatch.setattr(scenarios, 'get_scenario_base', counting_base)
+    monkeypatch.setattr(data_versions, 'current_version', lambda call: 'test-v1')
+    key = scenario_key(0.0123, 0.0456, 1.3)
+    first = run_scenario(key)
+    again = run_scenario(scenario_key(0.01230001, 0.0456, 1.3))
+    assert len(builds) == 1
+    assert again['risk_instances'] == first['risk_instances']
+
+    other = run_scenario(scenario_key(0.0123, 0.0456, 2.5))
+    assert len(builds) == 2
+    assert other['risk_instances'] <= first['risk_instances']
+
+    monkeypatch.setattr(data_versions, 'current_version', lambda call: 'test-v2')
+    run_scenario(key)
+    assert len(builds) == 3
+
+
+def test_risk_list_is_sorted_by_gap():
+    result = run_scenario(scenario_key())
+    gaps = result['risk_list']['Funding Gap ($M)'].to_numpy()
+    assert len(gaps) == result['risk_instances']
+    assert np.all(np.diff(gaps) <= 0)
@@ -0,0 +1,114 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sector_matrix
+from sector_matrix import (MATRIX_COLUMNS, benchmark, build_matrix, country_cluster_totals, ensure_matrix,
+                           fetch_hno, underperforming)
+
+pytest.importorskip('scipy')
+
+
+@pytest.fixture
+def hno(rng):
+    """HNO-shaped rows: admin1 figures, a national total for half the pairs and a category breakdown."""
+    n_countries, n_clusters, n_admin1 = 40, 15, 20
+    rows = []
+    for c in range(n_countries):
+        for k in np.flatnonzero(rng.random(n_clusters) < 0.4):
+            need = rng.lognormal(11, 1.5, n_admin1)
+            tgt = need * rng.beta(2, 2, n_admin1)
+            base = {'Country ISO3': f'C{c:03d}', 'Cluster': f'K{k:02d}'}
+            if rng.random() < 0.5:
+                rows.append({**base, 'Admin 1 PCode': None, 'Category': None,
+                             'In Need': need.sum(), 'Targeted': tgt.sum()})
+            for a in range(n_admin1):
+                rows.append({**base, 'Admin 1 PCode': f'C{c:03d}{a:02d}', 'Category': None,
+                             'In Need': need[a], 'Targeted': tgt[a]})
+                rows.append({**base, 'Admin 1 PCode': f'C{c:03d}{a:02d}', 'Category': 'Children',
+                             'In Need': need[a] / 2, 'Targeted': tgt[a] / 2})
+    return pd.DataFrame(rows)
+
+
+def _reference(totals) -> pd.DataFrame:
+    """Benchmarking as a straightforward groupby over the totals frame."""
+    df = totals.dropna(subset=['In Need', 'Targeted'])
+    df = df[df['In Need'] > 0].copy()
+    df['Coverage'] = df['Targeted'] / df['In Need']
+    df['Cluster Mean Coverage'] = df.groupby('Cluster')['Coverage'].transform('mean')
+    df['Benchmark Ratio'] = df['Coverage'] / df['Cluster Mean Coverage']
+    return df.sort_values(['Country ISO3', 'Cluster']).reset_index(drop=True)[MATRIX_COLUMNS]
+
+
+def test_benchmark_matches_groupby_reference(hno):
+    totals = country_cluster_totals(hno)
+    pd.testing.assert_frame_equal(benchmark(build_matrix(totals)), _reference(totals), check_dtype=False)
+
+
+def test_totals_do_not_double_count_admin_levels_or_categories(hno):
+    totals = country_cluster_totals(hno).set_index(['Country ISO3', 'Cluster'])
+    admin1 = hno[hno['Admin 1 PCode'].notna() & hno['Category'].isna()]
+    expected = admin1.groupby(['Country ISO3', 'Cluster'])['In Need'].sum()
+    # National rows carry the same total as their admin1 breakdown
+    np.testing.assert_allclose(totals['In Need'].reindex(expected.index), expected)
+
+
+def test_cells_without_need_are_not_stored():
+    totals = pd.DataFrame({'Country ISO3': ['A', 'A', 'B'], 'Cluster': ['X', 'Y', 'X'],
+                           'In Need': [100.0, 0.0, 50.0], 'Targeted': [50.0, 10.0, np.nan]})
+    result = benchmark(build_matrix(totals))
+    assert list(zip(result['Country ISO3'], result['Cluster'])) == [('A', 'X')]
+    assert result['Benchmark Ratio'].item() == 1.0
+
+
+def test_underperforming_is_below_half_the_cluster_mean(hno):
+    result = benchmark(build_matrix(country_cluster_totals(hno)))
+    flagged = underperforming(result)
+    assert (flagged['Benchmark Ratio'] < 0.5).all()
+    assert len(flagged) == (result['Benchmark Ratio'] < 0.5).sum()
+
+
+def _write_hno(hno, path):
+    """The HNO file layout: header, HXL tag row, data."""
+    hxl = pd.DataFrame([{col: f'#{col.lower().replace(" ", "_")}' for col in hno.columns}])
+    pd.concat([hxl, hno.astype(object)]).to_csv(path, index=False)
+
+
+def test_ensure_matrix_builds_when_the_hno_file_is_newer(hno, tmp_path):
+    hno_path, out_path = str(tmp_path / 'hpc_hno_2025.csv'), str(tmp_path / 'matrix.csv')
+    assert not ensure_matrix(hno_path, out_path)
+    _write_hno(hno, hno_path)
+    assert ensure_matrix(hno_path, out_path)
+    expected = benchmark(build_matrix(country_cluster_totals(hno)))
+    pd.testing.assert_frame_equal(pd.read_csv(out_path), expected, check_dtype=False)
+
+    built = os.path.getmtime(out_path)
+    assert ensure_matrix(hno_path, out_path) and os.path.getmtime(out_path) == built
+    _write_hno(hno[hno['Cluster'] != 'K00'], hno_path)
+    os.utime(hno_path, (built + 10, built + 10))
+    assert ensure_matrix(hno_path, out_path)
+    assert 'K00' not in set(pd.read_csv(out_path)['Cluster'])
+
+
+def test_fetch_hno_downloads_the_named_resource(hno, tmp_path, monkeypatch):
+    buffer = io.StringIO()
+    _write_hno(hno.head(50), buffer)
+    listing = {'result': {'resources': [
+        {'name': 'hpc_hno_2024.csv', 'url': 'https://example.org/hpc_hno_2024.csv'},
+        {'name': 'hpc_hno_2025.csv', 'url': 'https://example.org/hpc_hno_2025.csv'},
+    ]}}
+    responses = {sector_matrix.HDX_DATASET_URL: json.dumps(listing).encode(),
+                 'https://example.org/hpc_hno_2025.csv': buffer.getvalue().encode()}
+    monkeypatch.setattr('urllib.request.urlopen', lambda url, timeout=None: io.BytesIO(responses[url]))
+
+    path = str(tmp_path / 'hpc_hno_2025.csv')
+    assert ensure_matrix(path, str(tmp_path / 'matrix.csv'), fetch=True)
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == buffer.getvalue()
+    with pytest.raises(FileNotFoundError):
+        fetch_hno(str(tmp_path / 'hpc_hno_2030.csv'))
+    assert sorted(os.listdir(tmp_path)) == ['hpc_hno_2025.csv', 'matrix.csv']
@@ -0,0 +1,113 @@
+import gc
+import os
+from contextlib import nullcontext
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_tables
+from shared_tables import Publisher, attach, shared_table
+
+pytest.importorskip('pyarrow')
+
+_source = {'n': 5}
+
+
+def _demo_loader():
+    n = _source['n']
+    return pd.DataFrame({'value': np.arange(n, dtype=float), 'name': [f'row{i}' for i in range(n)]})
+
+
+@pytest.fixture
+def plane(tmp_path, monkeypatch):
+    """A publisher for one demo table, with its own manifest and a settable data version."""
+    version = {'current': 'v1'}
+    monkeypatch.setattr(shared_tables, 'MANIFEST_PATH', str(tmp_path / 'manifest.json'))
+    monkeypatch.setattr(shared_tables, 'ENABLED', True)
+    monkeypatch.setattr(shared_tables, 'current_version', lambda table: version['current'])
+    monkeypatch.setitem(shared_tables.TABLES, 'demo', f'{__name__}:_demo_loader')
+    monkeypatch.setattr(shared_tables, '_manifest_cache', {'mtime': None, 'tables': {}})
+    monkeypatch.setattr(shared_tables, '_attached', {})
+    monkeypatch.setattr(shared_tables, '_superseded', [])
+    _source['n'] = 5
+    publisher = Publisher()
+    yield publisher, version
+    publisher.close()
+    # Unmap this test's attachments once no frame exports their memory
+    shared_tables._superseded.extend(shm for _, shm, _ in shared_tables._attached.values())
+    shared_tables._attached.clear()
+    gc.collect()
+    shared_tables._release_superseded()
+
+
+def test_published_table_round_trips(plane):
+    publisher, _ = plane
+    info = publisher.publish('demo')
+    assert info['rows'] == 5
+    pd.testing.assert_frame_equal(attach('demo'), _demo_loader())
+
+
+def test_callers_get_their_own_frame(plane):
+    publisher, _ = plane
+    publisher.publish('demo')
+    first = attach('demo')
+    assert first is not attach('demo')
+    first['extra'] = 1
+    first['name'] = 'changed'
+    # pandas < 3 only copies on write with the option on; without it the edit raises (read-only)
+    with pd.option_context('mode.copy_on_write', True) if pd.__version__ < '3' else nullcontext():
+        first.loc[0, 'value'] = 99.0
+    pd.testing.assert_frame_equal(attach('demo'), _demo_loader())
+
+
+def test_shared_buffers_are_read_only(plane):
+    publisher, _ = plane
+    publisher.publish('demo')
+    attach('demo')
+    assert not shared_tables._attached['demo'][2]['value'].to_numpy().flags.writeable
+
+
+def test_stale_data_version_falls_back_to_the_loader(plane):
+    publisher, version = plane
+    publisher.publish('demo')
+    local = shared_table('demo')(lambda: 'local')
+    assert isinstance(local(), pd.DataFrame)
+    version['current'] = 'v2'
+    assert attach('demo') is None
+    assert local() == 'local'
+
+
+def test_republished_version_replaces_the_attached_one(plane):
+    publisher, version = plane
+    publisher.publish('demo')
+    old_segment = publisher.tables['demo']['segment']
+    assert len(attach('demo')) == 5
+
+    _source['n'], version['current'] = 7, 'v2'
+    publisher.publish('demo')
+    assert publisher.tables['demo']['segment'] != old_segment
+    assert len(attach('demo')) == 7
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=old_segment)
+
+
+def test_same_content_is_restamped_without_a_new_segment(plane):
+    publisher, version = plane
+    first = dict(publisher.publish('demo'))
+    version['current'] = 'v2'
+    second = publisher.publish('demo')
+    assert second['segment'] == first['segment']
+    assert second['data_version'] == 'v2'
+    assert len(attach('demo')) == 5
+
+
+def test_close_removes_manifest_and_segments(plane):
+    publisher, _ = plane
+    segment = publisher.publish('demo')['segment']
+    publisher.close()
+    assert not os.path.exists(shared_tables.MANIFEST_PATH)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=segment)
+    assert attach('demo') is None
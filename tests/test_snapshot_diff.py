@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from snapshot_diff import RTOL, diff_files, diff_frames, has_changes, natural_key
+
+KEY = ['Country ISO3', 'Admin 1 Name', 'year']
+
+
+@pytest.fixture
+def releases(rng):
+    """A multi-year admin1 export and a release with edits, additions and removals."""
+    n_countries, n_admin1, years = 50, 40, np.arange(2006, 2026)
+    n = n_countries * n_admin1 * len(years)
+    old = pd.DataFrame({
+        'Country ISO3': np.repeat([f'C{i:03d}' for i in range(n_countries)], n_admin1 * len(years)),
+        'Admin 1 Name': np.tile(np.repeat([f'A{j:03d}' for j in range(n_admin1)], len(years)), n_countries),
+        'year': np.tile(years, n_countries * n_admin1),
+        'In Need': rng.lognormal(10, 1, n).round(),
+        'Targeted': rng.lognormal(9, 1, n).round(),
+        'Severity': rng.choice(['Low', 'Medium', 'High'], n),
+    })
+    new = old.sample(frac=0.999, random_state=0)
+    new.loc[rng.random(len(new)) < 0.01, 'In Need'] *= 1.1
+    new.loc[rng.random(len(new)) < 0.002, 'Severity'] = 'Critical'
+    added = old[old['year'] == years[-1]].sample(100, random_state=1).assign(year=years[-1] + 1)
+    return old, pd.concat([new, added], ignore_index=True)
+
+
+def _reference(old, new, key):
+    """Row classification via set operations on tuples of the key."""
+    o = old.set_index(key)
+    n = new.set_index(key)
+    common = o.index.intersection(n.index)
+    a, b = o.loc[common], n.loc[common, o.columns]
+    numeric = a.select_dtypes('number').columns
+    diff = ~np.isclose(a[numeric], b[numeric], rtol=RTOL, atol=0.0)
+    other = [c for c in a.columns if c not in numeric]
+    diff = diff.any(axis=1) | (a[other].to_numpy() != b[other].to_numpy()).any(axis=1)
+    return len(n.index.difference(o.index)), len(o.index.difference(n.index)), int(diff.sum())
+
+
+def test_row_classification_matches_set_reference(releases):
+    old, new = releases
+    s = diff_frames(old, new, KEY)['summary']
+    assert (s['added'], s['removed'], s['changed']) == _reference(old, new, KEY)
+    assert s['added'] + s['removed'] + s['changed'] + s['unchanged'] == len(old.merge(new[KEY], how='outer'))
+    assert set(s['changed_by_column']) == {'In Need', 'Severity'}
+
+
+def test_changed_cells_carry_deltas():
+    old = pd.DataFrame({'iso3': ['A', 'B', 'C'], 'In Need': [100.0, 0.0, 5.0], 'Severity': ['Low', 'Low', None]})
+    new = pd.DataFrame({'iso3': ['A', 'B', 'C'], 'In Need': [110.0, 3.0, 5.0 * (1 + 1e-12)],
+                        'Severity': ['Low', 'High', None]})
+    result = diff_frames(old, new, ['iso3'])
+    cells = result['cells'].set_index(['iso3', 'column'])
+    assert cells.loc[('A', 'In Need'), 'delta'] == pytest.approx(10.0)
+    assert cells.loc[('A', 'In Need'), 'rel_delta'] == pytest.approx(0.1)
+    assert np.isnan(cells.loc[('B', 'In Need'), 'rel_delta'])
+    assert cells.loc[('B', 'Severity'), 'new'] == 'High'
+    # Within RTOL and NaN == NaN: C is unchanged
+    assert result['summary']['unchanged'] == 1
+
+
+def test_identical_snapshots_have_no_changes(releases):
+    old, _ = releases
+    assert not has_changes(diff_frames(old, old.sample(frac=1, random_state=2), KEY))
+
+
+def test_column_changes_are_reported():
+    old = pd.DataFrame({'iso3': ['A'], 'x': [1]})
+    new = pd.DataFrame({'iso3': ['A'], 'y': [1]})
+    result = diff_frames(old, new, ['iso3'])
+    assert result['summary']['columns_added'] == ['y'] and result['summary']['columns_removed'] == ['x']
+    assert has_changes(result)
+
+
+def test_duplicate_keys_are_rejected():
+    df = pd.DataFrame({'iso3': ['A', 'A'], 'x': [1, 2]})
+    with pytest.raises(ValueError, match='duplicate'):
+        diff_frames(df, df, ['iso3'])
+
+
+def test_natural_key_is_inferred_from_columns():
+    df = pd.DataFrame(columns=['Country ISO3', 'Cluster', 'year', 'In Need'])
+    assert natural_key(df) == ['Country ISO3', 'Cluster', 'year']
+    with pytest.raises(ValueError):
+        natural_key(pd.DataFrame(columns=['In Need']))
+
+
+def test_diff_files_reads_hxl_csvs(tmp_path):
+    old, new = tmp_path / 'old.csv', tmp_path / 'new.csv'
+    old.write_text('iso3,In Need\n#country+code,#inneed\nAAA,1\nBBB,2\n')
+    new.write_text('iso3,In Need\n#country+code,#inneed\nAAA,1\nBBB,3\n')
+    s = diff_files(str(old), str(new))['summary']
+    assert (s['key'], s['changed'], s['unchanged']) == (['iso3'], 1, 1)
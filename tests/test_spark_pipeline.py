@@ -0,0 +1,95 @@
+"""
+Parity of the PySpark job with the pandas pipeline, on a local[*] session.
+
+Needs pyspark and a Java runtime; skipped otherwise. The job runs with the
+linear funding engine so Prophet is not required.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyspark')
+pytest.importorskip('xgboost')
+if not (os.environ.get('JAVA_HOME') or shutil.which('java')):
+    pytest.skip('pyspark needs a Java runtime', allow_module_level=True)
+
+import spark_pipeline  # noqa: E402
+from forecast_features import FEATURES, TARGETS, build_features  # noqa: E402
+from forecast_model import fit_needs_models, score_horizon  # noqa: E402
+from trend_engine import forecast_funding  # noqa: E402
+
+PANEL_COLS = ['iso3', 'year', 'revisedRequirements', 'In Need', 'Targeted', 'Total_Population']
+
+
+@pytest.fixture(scope='module')
+def spark():
+    session = spark_pipeline.get_spark('local[*]', app_name='h2c2-forecast-test')
+    session.conf.set('spark.sql.shuffle.partitions', '8')
+    yield session
+    session.stop()
+
+
+@pytest.fixture(scope='module')
+def panel(spark):
+    return spark_pipeline.load_panel(spark).cache()
+
+
+@pytest.fixture(scope='module')
+def featured(panel):
+    return spark_pipeline.engineer_features(panel).cache()
+
+
+def _in_file_order(df):
+    return df.orderBy('_row').toPandas().drop(columns='_row').reset_index(drop=True)
+
+
+def test_load_panel_matches_pandas_loader(panel, training_panel):
+    spark_pdf = _in_file_order(panel)
+    # Every plan row is kept, including the one without a plan code
+    assert len(spark_pdf) == len(training_panel)
+    pd.testing.assert_frame_equal(spark_pdf[PANEL_COLS], training_panel[PANEL_COLS].reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_features_match_build_features(featured, training_features):
+    cols = ['iso3', 'year'] + TARGETS + [c for c in FEATURES if c != 'year']
+    spark_pdf = featured.orderBy('iso3', 'year', '_row').toPandas()
+    pd.testing.assert_frame_equal(spark_pdf[cols].reset_index(drop=True),
+                                  training_features[cols].reset_index(drop=True), check_dtype=False, rtol=1e-9)
+
+
+def test_needs_scoring_matches_batch_scorer(spark, featured, training_features):
+    cols = ['iso3', 'year', 'Predicted_In_Need', 'Predicted_Requirements']
+    expected = score_horizon(fit_needs_models(training_features), training_features)[cols]
+    got = spark_pipeline.forecast_needs(spark, featured).toPandas()
+    pd.testing.assert_frame_equal(got.sort_values(['iso3', 'year']).reset_index(drop=True),
+                                  expected.sort_values(['iso3', 'year']).reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-6)
+
+
+def test_funding_matches_trend_engine_per_country(panel, training_panel):
+    got = spark_pipeline.forecast_funding(panel, 'linear').toPandas()
+    rows = training_panel[training_panel['revisedRequirements'].notna()]
+    expected = forecast_funding(rows, 'linear')[['iso3', 'year', 'Predicted_Funding']]
+    pd.testing.assert_frame_equal(got.sort_values(['iso3', 'year']).reset_index(drop=True),
+                                  expected.sort_values(['iso3', 'year']).reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-6)
+
+
+def test_full_run_reproduces_committed_forecast(spark):
+    forecast, high_risk = spark_pipeline.run(spark, engine='linear')
+    forecast_pdf = forecast.toPandas()
+    assert list(forecast_pdf.columns) == spark_pipeline.OUTPUT_COLUMNS
+    report = spark_pipeline.compare_with_reference(forecast_pdf)
+    assert report['matched_rows'] == report['reference_rows'] == report['output_rows']
+    assert report['Predicted_In_Need_max_rel_diff'] < 1e-6
+    assert report['Predicted_Requirements_max_rel_diff'] < 1e-6
+    # The committed funding column is Prophet's; the linear engine agrees on every risk flag there
+    assert report['Risk_Flag_agreement'] > 0.99
+    risk = high_risk.toPandas()
+    assert risk['Risk_Flag'].all() and len(risk) == forecast_pdf['Risk_Flag'].sum()
+    assert np.all(np.diff(risk['Funding_Gap'].to_numpy()) <= 0)
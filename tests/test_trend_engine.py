@@ -0,0 +1,55 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trend_engine import HORIZON, compare_with_published, forecast_funding, holdout_errors
+
+
+@pytest.fixture
+def straight_lines():
+    """Countries whose requirements grow exactly linearly, one with a missing year."""
+    years = np.arange(2010, 2026)
+    rows = [{'iso3': iso, 'year': y, 'revisedRequirements': base + slope * (y - 2010)}
+            for iso, base, slope in [('AAA', 1e8, 5e6), ('BBB', 4e8, -1e7), ('CCC', 2e8, 0.0)]
+            for y in years if not (iso == 'AAA' and y == 2015)]
+    return pd.DataFrame(rows)
+
+
+def test_linear_engine_extrapolates_straight_lines(straight_lines):
+    fc = forecast_funding(straight_lines, 'linear').set_index(['iso3', 'year'])
+    assert sorted(fc.index.get_level_values('year').unique()) == HORIZON
+    assert fc.loc[('AAA', 2030), 'Predicted_Funding'] == pytest.approx(1e8 + 5e6 * 20)
+    assert fc.loc[('BBB', 2026), 'Predicted_Funding'] == pytest.approx(4e8 - 1e7 * 16)
+    assert fc.loc[('CCC', 2028), 'Predicted_Funding'] == pytest.approx(2e8)
+
+
+def test_damped_engine_flattens_the_trend(straight_lines):
+    linear = forecast_funding(straight_lines, 'linear').set_index(['iso3', 'year'])['Predicted_Funding']
+    damped = forecast_funding(straight_lines, 'damped').set_index(['iso3', 'year'])['Predicted_Funding']
+    last = 1e8 + 5e6 * 15
+    assert last < damped[('AAA', 2030)] < linear[('AAA', 2030)]
+    assert damped[('CCC', 2030)] == pytest.approx(2e8)
+
+
+def test_unknown_engine_is_rejected(straight_lines):
+    with pytest.raises(ValueError):
+        forecast_funding(straight_lines, 'arima')
+
+
+def test_linear_engine_agrees_with_published_prophet_forecast(training_panel):
+    agreement = compare_with_published(forecast_funding(training_panel, 'linear'))
+    assert agreement['countries'] > 50
+    assert agreement['median_abs_pct_diff'] < 0.01
+    assert agreement['correlation'] > 0.999
+
+
+def test_holdout_errors_cover_every_engine(training_panel):
+    errors = holdout_errors(training_panel).set_index('engine')
+    for engine in ('linear', 'damped'):
+        assert errors.loc[engine, 'points'] > 0
+        assert np.isfinite(errors.loc[engine, 'rmse'])
+        assert 0 <= errors.loc[engine, 'interval_coverage'] <= 1
+    if importlib.util.find_spec('prophet') is None:
+        assert 'prophet' in errors.loc['prophet', 'skipped']
@@ -0,0 +1,27 @@
+import pytest
+
+from forecast_features import TARGETS
+from tuning import HOLDOUT_YEARS, STOP_YEARS, best_params, run_search, temporal_split
+
+pytest.importorskip('xgboost')
+
+
+def test_search_split_stays_before_the_holdout(training_features):
+    train, stop = temporal_split(training_features)
+    assert train['year'].max() < STOP_YEARS[0]
+    assert stop['year'].between(*STOP_YEARS).all()
+    assert stop['year'].max() < HOLDOUT_YEARS[0]
+
+
+def test_holdout_targets_do_not_change_the_selection(training_features):
+    search = dict(n_trials=3, cpus=1, log=None)
+    before = run_search(training_features, **search)
+    shifted = training_features.copy()
+    holdout = shifted['year'].between(*HOLDOUT_YEARS)
+    shifted.loc[holdout, list(TARGETS)] *= 10
+    after = run_search(shifted, **search)
+
+    assert best_params(after) == best_params(before)
+    assert after['stop_rmse'].tolist() == before['stop_rmse'].tolist()
+    # ...while the reported hold-out score does see them
+    assert after.attrs['holdout_rmse'] != before.attrs['holdout_rmse']
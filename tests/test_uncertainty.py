@@ -0,0 +1,80 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_registry import load_bundle
+from scenarios import DEFAULT_THRESHOLD
+from uncertainty import N_DRAWS, QUANTILES, bands_frame, simulate, uncertainty_params
+from utils import load_forecast_data
+
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+
+@pytest.fixture(scope='module')
+def forecast_params():
+    df = load_forecast_data()
+    return df, uncertainty_params(df, load_bundle())
+
+
+def _params(requirements, funding, req_log_sigma=0.0, funding_se=0.0):
+    return pd.DataFrame({'requirements': requirements, 'funding': funding,
+                         'req_log_sigma': req_log_sigma, 'funding_se': funding_se})
+
+
+def test_full_draw_fits_the_latency_budget(forecast_params):
+    _, params = forecast_params
+    simulate(params.head(8), n_draws=100)   # first call pays for the scipy import
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        sim = simulate(params, n_draws=N_DRAWS)
+        timings.append(time.perf_counter() - start)
+    assert N_DRAWS == 10_000
+    assert sim['neglect_probability'].shape == (len(params),)
+    assert np.median(timings) < 0.2
+
+
+def test_quantile_bands_are_ordered(forecast_params):
+    _, params = forecast_params
+    sim = simulate(params)
+    for name in ('requirements', 'funding', 'gap'):
+        assert sim[name].shape == (len(params), len(QUANTILES))
+        assert np.all(np.diff(sim[name], axis=1) >= 0), name
+
+
+def test_probabilities_are_bounded_and_track_the_flag(forecast_params):
+    df, params = forecast_params
+    prob = simulate(params)['neglect_probability']
+    assert np.all((prob >= 0) & (prob <= 1))
+    flagged = (params['requirements'] > DEFAULT_THRESHOLD * params['funding']).to_numpy()
+    assert prob[flagged].mean() > prob[~flagged].mean()
+    # Without funding there is nothing to fall short of: neglect is certain
+    no_funding = (df['Predicted_Funding'] == 0).to_numpy()
+    assert np.all(prob[no_funding] == 1)
+
+
+def test_zero_spread_reduces_to_the_point_flag():
+    params = _params([100.0, 100.0, 100.0], [50.0, 90.0, 200.0])
+    sim = simulate(params, n_draws=1_000)
+    np.testing.assert_array_equal(sim['neglect_probability'], [1.0, 0.0, 0.0])
+    np.testing.assert_allclose(sim['gap'], np.repeat([[50.0], [10.0], [-100.0]], len(QUANTILES), axis=1))
+
+
+def test_probability_falls_as_the_threshold_rises():
+    params = _params([100.0] * 3, [90.0] * 3, req_log_sigma=0.3, funding_se=[5.0, 10.0, 20.0])
+    low = simulate(params, threshold=1.0)['neglect_probability']
+    high = simulate(params, threshold=1.5)['neglect_probability']
+    assert np.all(high <= low)
+    assert np.all((low > 0) & (low < 1))
+
+
+def test_bands_frame_has_a_column_per_quantile(forecast_params):
+    df, params = forecast_params
+    frame = bands_frame(df.head(10), simulate(params.head(10), n_draws=500))
+    pd.testing.assert_frame_equal(frame[['iso3', 'year']], df.head(10)[['iso3', 'year']].reset_index(drop=True))
+    for col in ('Requirements', 'Funding', 'Gap'):
+        assert [f'{col}_p{round(q * 100)}' for q in QUANTILES] == \
+            [c for c in frame.columns if c.startswith(f'{col}_p')]
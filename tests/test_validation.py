@@ -0,0 +1,46 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from validation import TABLES, VIOLATION_COLUMNS, clean_table, validate, validate_tables
+
+NAMES = ['country_metrics', 'country_summary', 'sector_benchmarking']
+
+
+def _check_outputs(out_dir, names):
+    with open(os.path.join(out_dir, 'quality_report.json'), encoding='utf-8') as f:
+        report = json.load(f)
+    assert sorted(report['tables']) == sorted(names)
+    violations = pd.read_csv(os.path.join(out_dir, 'violations.csv'))
+    assert list(violations.columns) == VIOLATION_COLUMNS
+    for name in names:
+        expected = sum(rule['violations'] for rule in report['tables'][name]['rules'])
+        assert (violations['table'] == name).sum() == expected
+    assert not [f for f in os.listdir(out_dir) if f.endswith('.tmp')]
+
+
+def test_clean_table_matches_a_direct_validation(tmp_path):
+    spec = TABLES['country_metrics']
+    expected = validate(pd.read_csv(spec['source']), spec)[0]
+    pd.testing.assert_frame_equal(clean_table('country_metrics', str(tmp_path)), expected)
+    _check_outputs(str(tmp_path), ['country_metrics'])
+
+
+def test_concurrent_threads_keep_report_and_violations_whole(tmp_path):
+    out_dir = str(tmp_path)
+    calls = [(validate_tables, [name], out_dir) for name in NAMES] * 4
+    calls += [(clean_table, name, out_dir) for name in NAMES] * 4
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for future in [pool.submit(*call) for call in calls]:
+            future.result()
+    _check_outputs(out_dir, NAMES)
+
+
+def test_concurrent_processes_keep_report_and_violations_whole(tmp_path):
+    out_dir = str(tmp_path)
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        for future in [pool.submit(validate_tables, [name], out_dir) for name in NAMES * 3]:
+            future.result()
+    _check_outputs(out_dir, NAMES)
@@ -0,0 +1,33 @@
+import genie
+import warmup
+from genie import with_context
+
+
+def test_genie_prompts_are_pre_asked_after_ready(monkeypatch):
+    seen = []
+
+    def answer(prompt, _timeout=None):
+        seen.append((prompt, warmup.is_ready(), _timeout))
+        if prompt == 'slow':
+            raise TimeoutError('Genie timed out')
+        return 'ok'
+
+    monkeypatch.setattr(genie, 'genie_configured', lambda: True)
+    monkeypatch.setattr(genie, 'cached_genie_answer', answer)
+    status = warmup.run_warmup({'tasks': [], 'genie_prompts': ['fast', 'slow']})
+
+    assert [prompt for prompt, _, _ in seen] == ['fast', 'slow']
+    assert all(ready for _, ready, _ in seen)
+    assert all(timeout == genie.GENIE_PREFETCH_TIMEOUT for _, _, timeout in seen)
+    assert status['state'] == 'ready' and status['tasks'] == {}
+    assert status['genie']['fast']['ok'] and not status['genie']['slow']['ok']
+
+
+def test_follow_up_carries_cached_answers_as_text():
+    answered = [('Top crisis countries', '<b>Sudan</b><br><table><tr><td>SDN</td><td>30&nbsp;M</td></tr></table>')]
+    message = with_context('And funding?', answered)
+    assert 'Q: Top crisis countries' in message
+    assert 'Sudan' in message and 'SDN | 30\xa0M' in message
+    assert '<' not in message
+    assert message.endswith('Follow-up question: And funding?')
+    assert with_context('Hello', []) == 'Hello'
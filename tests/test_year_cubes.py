@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from year_cubes import build_cubes, default_year, read_cubes, year_frame, year_index, year_summary
+
+COLS = ['Country ISO3', 'revisedRequirements', 'Need Prevalence', 'Budget per PIN', 'Normalized Need Prevalence',
+        'Normalized Budget per PIN', 'Mismatch Score', 'Severity Quartile']
+
+
+@pytest.fixture
+def inputs(rng):
+    """A country-year requirements index with gaps and snapshot metrics for its countries."""
+    n_countries, n_years = 120, 26
+    iso3 = np.array([f'C{i:03d}' for i in range(n_countries)])
+    grid = pd.MultiIndex.from_product([iso3, np.arange(2000, 2000 + n_years)], names=['iso3', 'year'])
+    requirements = grid.to_frame(index=False)
+    requirements['revisedRequirements'] = rng.lognormal(19, 1, len(requirements))
+    requirements = requirements[rng.random(len(requirements)) < 0.7].reset_index(drop=True)
+    population = rng.lognormal(16, 1, n_countries)
+    metrics = pd.DataFrame({'Country ISO3': iso3, 'Population': population,
+                            'In Need': population * rng.uniform(0.02, 0.8, n_countries)})
+    return requirements, metrics
+
+
+def _reference(requirements, metrics, year) -> pd.DataFrame:
+    """One year regrouped from the index, with the snapshot formulas of load_country_metrics."""
+    df = requirements[requirements['year'] == year].groupby('iso3', as_index=False)['revisedRequirements'].sum()
+    df = df.rename(columns={'iso3': 'Country ISO3'}).merge(metrics, on='Country ISO3')
+    df = df[df['revisedRequirements'] > 0].sort_values('Country ISO3').reset_index(drop=True)
+    df['Need Prevalence'] = df['In Need'] / df['Population']
+    df['Budget per PIN'] = df['revisedRequirements'] / df['In Need']
+    for col, out in [('Need Prevalence', 'Normalized Need Prevalence'), ('Budget per PIN', 'Normalized Budget per PIN')]:
+        df[out] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
+    df['Mismatch Score'] = df['Normalized Need Prevalence'] - df['Normalized Budget per PIN']
+    q25, q50, q75 = df['Need Prevalence'].quantile([0.25, 0.5, 0.75])
+    df['Severity Quartile'] = np.select([df['Need Prevalence'] <= q25, df['Need Prevalence'] <= q50,
+                                         df['Need Prevalence'] <= q75], ['Low', 'Medium', 'High'], 'Critical')
+    return df
+
+
+def test_every_year_slice_matches_regrouping(inputs):
+    requirements, metrics = inputs
+    cubes = build_cubes(requirements, metrics)
+    assert list(cubes['years']) == list(range(2000, 2026))
+    for year in cubes['years']:
+        pd.testing.assert_frame_equal(year_frame(cubes, year)[COLS], _reference(requirements, metrics, year)[COLS],
+                                      check_dtype=False)
+
+
+def test_year_summary_counts_countries_per_year(inputs):
+    requirements, metrics = inputs
+    cubes = build_cubes(requirements, metrics)
+    summary = year_summary(cubes).set_index('Year')
+    counts = requirements.groupby('year')['iso3'].nunique()
+    assert summary['Countries'].to_dict() == counts.to_dict()
+    assert default_year(cubes) == 2025
+
+
+def test_years_outside_the_cubes_are_a_key_error(inputs):
+    cubes = build_cubes(*inputs)
+    with pytest.raises(KeyError):
+        year_index(cubes, 1999)
+
+
+def test_cubes_are_reused_until_a_source_changes(tmp_path):
+    path = str(tmp_path / 'year_cubes.npz')
+    cubes = read_cubes(path)
+    mtime = os.stat(path).st_mtime_ns
+    again = read_cubes(path)
+    assert os.stat(path).st_mtime_ns == mtime
+    assert all(np.array_equal(cubes[k], again[k], equal_nan=cubes[k].dtype.kind == 'f') for k in cubes)
+
+
+def test_plan_countries_without_metrics_are_planned_but_not_ranked(inputs):
+    requirements, metrics = inputs
+    unmeasured = metrics['Country ISO3'].iloc[:10]
+    cubes = build_cubes(requirements, metrics[~metrics['Country ISO3'].isin(unmeasured)])
+    assert set(unmeasured) <= set(cubes['iso3'])
+    for year in cubes['years']:
+        i = year_index(cubes, year)
+        planned = set(cubes['iso3'][cubes['planned'][i]])
+        assert planned == set(requirements.loc[requirements['year'] == year, 'iso3'])
+        assert not set(year_frame(cubes, year)['Country ISO3']) & set(unmeasured)